@@ -22,32 +22,53 @@ Versión: 2.0
 import os
 import re
 import json
-import pickle
 import time
 import asyncio
 import argparse
+import heapq
+import hashlib
+import sqlite3
+import socket
 import logging
+import multiprocessing
+import multiprocessing.connection
 from pathlib import Path
 from typing import Set, Dict, List, Optional, Union
-from urllib.parse import urlparse, urljoin, quote
+from urllib.parse import urlparse
 from dataclasses import dataclass, asdict
 from datetime import datetime
 
-# Importaciones estándar
 import requests
 from bs4 import BeautifulSoup
-import html2text
-from markdownify import markdownify as md
 import concurrent.futures
 from tqdm import tqdm
 
-# Importación opcional de Playwright
-try:
-    from playwright.async_api import async_playwright
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError:
-    PLAYWRIGHT_AVAILABLE = False
-    print("⚠️  Playwright no disponible. Instala con: pip install playwright")
+from browser_pool import BrowserPool, PLAYWRIGHT_AVAILABLE
+from dedup import ContentIndex
+from extraction import (
+    LXML_AVAILABLE, PARSER_ENGINES, PageConverter, extract_page,
+    _extract_in_worker, _init_conversion_worker, _render_in_worker
+)
+from frontier import PRIORITY_POLICIES, normalize_url
+from http_cache import HttpCache
+from http_fetch import (
+    AIOHTTP_AVAILABLE, HTTPX_AVAILABLE, FETCH_ENGINES, DEFAULT_HEADERS, DEFAULT_MAX_BODY_BYTES, STREAM_CHUNK_BYTES,
+    AsyncHttpFetcher, BodyReader, ContentRejectedError, FetchResult, HttpStatusError
+)
+from link_tracker import LinkTracker
+from markdown_processing import MarkdownCleaner
+from metrics import CrawlMetrics, METRIC_PERCENTILES
+from rate_limit import THROTTLE_STATUSES, TokenBucket
+from search_index import FTS5_AVAILABLE, SEARCH_INDEX_FILE, SearchIndex
+from sinks import OUTPUT_FORMATS, OutputWriter, create_output_sink
+from sitemap_utils import iter_site_urls
+from storage import scan_markdown_files, write_file_atomic
+from url_store import QUEUE_POLL_SECONDS, URL_STORES
+
+# Los módulos del scraper registran bajo este logger; los de utilidades compartidas
+# con docs_scraper.py usan el suyo propio
+LOGGER_NAME = 'advanced_scraper'
+SHARED_LOGGERS = ('rate_limit', 'sitemap_utils')
 
 # Configurar logging mejorado
 def setup_logging(log_file: str = "advanced_scraper.log", level: str = "INFO"):
@@ -63,7 +84,7 @@ def setup_logging(log_file: str = "advanced_scraper.log", level: str = "INFO"):
     )
 
     # Configurar logger principal
-    logger = logging.getLogger(__name__)
+    logger = logging.getLogger(LOGGER_NAME)
     logger.setLevel(log_level)
 
     # Handler para archivo (detallado)
@@ -74,8 +95,11 @@ def setup_logging(log_file: str = "advanced_scraper.log", level: str = "INFO"):
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(simple_formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    for name in (LOGGER_NAME,) + SHARED_LOGGERS:
+        module_logger = logging.getLogger(name)
+        module_logger.setLevel(log_level)
+        module_logger.addHandler(file_handler)
+        module_logger.addHandler(console_handler)
 
     return logger
 
@@ -89,6 +113,8 @@ class ScrapingStats:
     total_successful: int = 0
     total_failed: int = 0
     total_skipped: int = 0
+    total_unchanged: int = 0
+    total_duplicates: int = 0
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
 
@@ -101,254 +127,44 @@ class ScrapingStats:
             return (self.end_time - self.start_time).total_seconds()
         return None
 
-class LinkTracker:
-    """Clase para manejar el seguimiento persistente de enlaces"""
-
-    def __init__(self, base_url: str, cache_file: str = "link_cache.pkl"):
-        self.base_url = base_url
-        self.domain = urlparse(base_url).netloc
-        self.cache_file = cache_file
-
-        # Conjuntos de URLs
-        self.discovered_urls: Set[str] = set()
-        self.visited_urls: Set[str] = set()
-        self.failed_urls: Set[str] = set()
-        self.skipped_urls: Set[str] = set()
-
-        # Metadata de URLs
-        self.url_metadata: Dict[str, Dict] = {}
-
-        self.load_cache()
-
-    def load_cache(self):
-        """Carga el cache de enlaces desde archivo"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'rb') as f:
-                    data = pickle.load(f)
-                    self.discovered_urls = data.get('discovered', set())
-                    self.visited_urls = data.get('visited', set())
-                    self.failed_urls = data.get('failed', set())
-                    self.skipped_urls = data.get('skipped', set())
-                    self.url_metadata = data.get('metadata', {})
-                logger.info(f"Cache cargado: {len(self.discovered_urls)} URLs descubiertas")
-            except Exception as e:
-                logger.warning(f"Error cargando cache: {e}")
-
-    def save_cache(self):
-        """Guarda el cache de enlaces a archivo"""
-        try:
-            data = {
-                'discovered': self.discovered_urls,
-                'visited': self.visited_urls,
-                'failed': self.failed_urls,
-                'skipped': self.skipped_urls,
-                'metadata': self.url_metadata,
-                'last_update': datetime.now().isoformat()
-            }
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(data, f)
-        except Exception as e:
-            logger.error(f"Error guardando cache: {e}")
-
-    def is_valid_url(self, url: str) -> bool:
-        """Verifica si una URL es válida para scraping"""
-        try:
-            parsed = urlparse(url)
-
-            # Verificar dominio
-            if parsed.netloc != self.domain:
-                return False
-
-            # Extensiones no deseadas
-            unwanted_extensions = {
-                '.pdf', '.zip', '.rar', '.7z', '.tar', '.gz',
-                '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico',
-                '.mp4', '.mov', '.avi', '.mkv', '.mp3', '.wav',
-                '.css', '.js', '.json', '.xml', '.rss',
-                '.exe', '.msi', '.dmg', '.deb', '.rpm'
-            }
-
-            if any(url.lower().endswith(ext) for ext in unwanted_extensions):
-                return False
-
-            # Evitar parámetros problemáticos
-            if '?' in url and any(param in url.lower() for param in ['download', 'export', 'print']):
-                return False
-
-            return True
-
-        except Exception:
-            return False
-
-    def add_discovered_urls(self, urls: Set[str], source_url: str = None):
-        """Añade URLs descubiertas al tracker"""
-        new_urls = set()
-        for url in urls:
-            if self.is_valid_url(url) and url not in self.discovered_urls:
-                self.discovered_urls.add(url)
-                new_urls.add(url)
-
-                # Añadir metadata
-                self.url_metadata[url] = {
-                    'discovered_at': datetime.now().isoformat(),
-                    'source_url': source_url,
-                    'depth': self._calculate_depth(url)
-                }
-
-        if new_urls:
-            logger.info(f"Descubiertas {len(new_urls)} nuevas URLs")
-            self.save_cache()
-
-        return new_urls
-
-    def _calculate_depth(self, url: str) -> int:
-        """Calcula la profundidad de una URL relativa a la base"""
-        base_path = urlparse(self.base_url).path.strip('/')
-        url_path = urlparse(url).path.strip('/')
-
-        if not base_path:
-            return len(url_path.split('/')) if url_path else 0
-
-        return len(url_path.replace(base_path, '').strip('/').split('/')) if url_path else 0
-
-    def get_next_urls(self, limit: int = None) -> List[str]:
-        """Obtiene las próximas URLs a procesar"""
-        pending = self.discovered_urls - self.visited_urls - self.failed_urls - self.skipped_urls
-
-        # Ordenar por profundidad (menos profundo primero)
-        sorted_urls = sorted(pending, key=lambda url: self.url_metadata.get(url, {}).get('depth', 999))
-
-        return sorted_urls[:limit] if limit else sorted_urls
-
-    def mark_visited(self, url: str):
-        """Marca una URL como visitada"""
-        self.visited_urls.add(url)
-        if url in self.url_metadata:
-            self.url_metadata[url]['processed_at'] = datetime.now().isoformat()
-
-    def mark_failed(self, url: str, error: str = None):
-        """Marca una URL como fallida"""
-        self.failed_urls.add(url)
-        if url in self.url_metadata:
-            self.url_metadata[url]['error'] = error
-            self.url_metadata[url]['failed_at'] = datetime.now().isoformat()
-
-    def mark_skipped(self, url: str, reason: str = None):
-        """Marca una URL como omitida"""
-        self.skipped_urls.add(url)
-        if url in self.url_metadata:
-            self.url_metadata[url]['skip_reason'] = reason
-            self.url_metadata[url]['skipped_at'] = datetime.now().isoformat()
-
-    def get_stats(self) -> Dict:
-        """Obtiene estadísticas del tracker"""
-        return {
-            'discovered': len(self.discovered_urls),
-            'visited': len(self.visited_urls),
-            'failed': len(self.failed_urls),
-            'skipped': len(self.skipped_urls),
-            'pending': len(self.get_next_urls())
-        }
-
-class MarkdownProcessor:
-    """Clase para procesar y corregir contenido Markdown"""
-
-    def __init__(self):
-        self.html_converter = html2text.HTML2Text()
-        self.html_converter.ignore_links = False
-        self.html_converter.ignore_images = False
-        self.html_converter.body_width = 0
-        self.html_converter.protect_links = True
-        self.html_converter.unicode_snob = True
-        self.html_converter.bypass_tables = False
-
-    def html_to_markdown(self, html_content: str) -> str:
-        """Convierte HTML a Markdown usando html2text"""
-        try:
-            return self.html_converter.handle(html_content)
-        except Exception as e:
-            logger.warning(f"Error convirtiendo HTML a Markdown: {e}")
-            # Fallback usando markdownify
-            return md(html_content, strip=['script', 'style'])
-
-    def clean_markdown(self, content: str) -> str:
-        """Limpia y corrige el contenido Markdown"""
-        if not content:
-            return ""
-
-        # Correcciones comunes
-        fixes = [
-            # Eliminar líneas vacías excesivas
-            (r'\n{4,}', '\n\n\n'),
-            # Corregir espacios en enlaces
-            (r'\[\s*([^\]]+)\s*\]\s*\(\s*([^)]+)\s*\)', r'[\1](\2)'),
-            # Corregir listas mal formateadas
-            (r'\n\s*[-*+]\s*\n', '\n\n* '),
-            # Corregir código inline mal formado
-            (r'`\s+([^`]+)\s+`', r'`\1`'),
-            # Eliminar espacios al final de líneas
-            (r' +\n', '\n'),
-            # Corregir encabezados mal formados
-            (r'\n(#{1,6})\s*\n', r'\n\1 '),
-            # Corregir tablas rotas
-            (r'\|\s*\|\s*\|', '| |'),
-        ]
-
-        for pattern, replacement in fixes:
-            content = re.sub(pattern, replacement, content, flags=re.MULTILINE)
-
-        return content.strip()
-
-    def extract_metadata(self, soup: BeautifulSoup, url: str) -> Dict:
-        """Extrae metadata de la página"""
-        metadata = {
-            'url': url,
-            'title': '',
-            'description': '',
-            'keywords': [],
-            'author': '',
-            'scraped_at': datetime.now().isoformat()
-        }
-
-        # Título
-        if soup.title:
-            metadata['title'] = soup.title.get_text().strip()
-
-        # Meta tags
-        for meta in soup.find_all('meta'):
-            name = meta.get('name', '').lower()
-            content = meta.get('content', '')
-
-            if name in ['description', 'og:description']:
-                metadata['description'] = content
-            elif name in ['keywords']:
-                metadata['keywords'] = [k.strip() for k in content.split(',')]
-            elif name in ['author']:
-                metadata['author'] = content
-
-        return metadata
-
-    def add_frontmatter(self, content: str, metadata: Dict) -> str:
-        """Añade frontmatter YAML al contenido"""
-        frontmatter_lines = ['---']
-
-        for key, value in metadata.items():
-            if value:  # Solo añadir si tiene valor
-                if isinstance(value, list):
-                    if value:  # Solo si la lista no está vacía
-                        frontmatter_lines.append(f'{key}:')
-                        for item in value:
-                            frontmatter_lines.append(f'  - {item}')
-                else:
-                    # Escapar comillas en el valor
-                    safe_value = str(value).replace('"', '\\"')
-                    frontmatter_lines.append(f'{key}: "{safe_value}"')
-
-        frontmatter_lines.append('---')
-        frontmatter_lines.append('')
-
-        return '\n'.join(frontmatter_lines) + content
+class HostRateLimiter(TokenBucket):
+    """Token bucket adaptativo de un host para el rastreo asíncrono.
+
+    El ajuste del ritmo vive en `rate_limit.TokenBucket`; aquí solo se
+    serializa la espera con un lock de asyncio.
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1, max_rate: Optional[float] = None, min_rate: float = 0.05):
+        super().__init__(rate, burst, max_rate, min_rate)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Espera a que haya un token disponible para este host"""
+        async with self._lock:
+            while True:
+                wait = self.reserve()
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+class RateLimiter:
+    """Limitadores por host compartidos por todos los workers del rastreo"""
+
+    def __init__(self, delay: float = 1.0, concurrency: int = 5, max_rate: Optional[float] = None):
+        # El ritmo inicial equivale al techo anterior: concurrency páginas cada `delay` segundos
+        self.initial_rate = concurrency / delay if delay > 0 else None
+        self.burst = concurrency
+        self.max_rate = max_rate
+        self._hosts: Dict[str, HostRateLimiter] = {}
+
+    def for_host(self, url: str) -> HostRateLimiter:
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = HostRateLimiter(self.initial_rate, self.burst, self.max_rate)
+        return self._hosts[host]
+
+    def current_rate(self, url: str) -> Optional[float]:
+        return self.for_host(url).rate
 
 class AdvancedDocsScraper:
     """Scraper avanzado de documentación con múltiples métodos de extracción"""
@@ -362,10 +178,37 @@ class AdvancedDocsScraper:
         concurrency: int = 5,
         use_playwright: bool = False,
         convert_to_mdx: bool = False,
-        custom_selectors: Optional[Dict[str, str]] = None
+        custom_selectors: Optional[Dict[str, str]] = None,
+        fetch_engine: str = 'requests',
+        connections_per_host: Optional[int] = None,
+        conversion_workers: int = 0,
+        browser_recycle_after: int = 100,
+        wait_selector: Optional[str] = None,
+        priority_policy: str = 'depth',
+        use_http_cache: bool = True,
+        refresh: bool = False,
+        max_rate: Optional[float] = None,
+        max_retries: int = 3,
+        use_sitemap: bool = False,
+        sitemap_url: Optional[str] = None,
+        parser_engine: str = 'bs4',
+        dedup: bool = True,
+        near_duplicate_distance: int = 3,
+        url_store: str = 'memory',
+        metrics_file: Optional[str] = None,
+        metrics_interval: float = 0,
+        queue_path: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = 300,
+        report: bool = True,
+        output_format: str = 'files',
+        fsync: bool = True,
+        use_search_index: bool = False,
+        max_page_bytes: int = DEFAULT_MAX_BODY_BYTES,
+        graph_file: Optional[str] = None
     ):
         self.base_url = base_url
-        self.domain = urlparse(base_url).netloc
+        self.domain = urlparse(normalize_url(base_url)).netloc
         self.output_dir = Path(output_dir)
         self.max_pages = max_pages
         self.delay = delay
@@ -373,188 +216,318 @@ class AdvancedDocsScraper:
         self.use_playwright = use_playwright and PLAYWRIGHT_AVAILABLE
         self.convert_to_mdx = convert_to_mdx
         self.custom_selectors = custom_selectors or {}
+        self.fetch_engine = fetch_engine
+        self.connections_per_host = connections_per_host or concurrency
+        self.conversion_workers = max(0, conversion_workers or 0)
+        self.browser_recycle_after = browser_recycle_after
+        self.wait_selector = wait_selector
+        self.use_http_cache = use_http_cache
+        self.refresh = refresh
+        self.max_retries = max_retries
+        self.use_sitemap = use_sitemap or bool(sitemap_url)
+        self.sitemap_url = sitemap_url
+        self.metrics_file = metrics_file
+        self.metrics_interval = metrics_interval
+        self.report = report
+        self.output_format = output_format
+        self.fsync = fsync
+        self.use_search_index = use_search_index
+        self.max_page_bytes = max_page_bytes
+        self.graph_file = graph_file
+
+        if self.fetch_engine not in FETCH_ENGINES:
+            raise ValueError(f"Motor HTTP desconocido: {fetch_engine} (opciones: {', '.join(FETCH_ENGINES)})")
+        if self.output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Formato de salida desconocido: {output_format} (opciones: {', '.join(OUTPUT_FORMATS)})")
 
         # Componentes
-        self.link_tracker = LinkTracker(base_url)
-        self.markdown_processor = MarkdownProcessor()
+        self.link_tracker = LinkTracker(
+            base_url,
+            priority_policy=priority_policy,
+            store=url_store,
+            queue=queue_path,
+            worker_id=worker_id,
+            lease_seconds=lease_seconds
+        )
+        self.page_converter = PageConverter(self.domain, self.custom_selectors, parser_engine)
+        self.parser_engine = self.page_converter.parser_engine
+        self.rate_limiter = RateLimiter(delay, concurrency, max_rate)
+        self.markdown_processor = self.page_converter.markdown_processor
         self.stats = ScrapingStats()
+        self.metrics = CrawlMetrics()
+        self.content_index = self.load_content_index(near_duplicate_distance) if dedup else None
 
         # Crear directorio de salida
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Session para requests
+        # Session para requests (pool dimensionado para los hilos de trabajo)
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(self.concurrency, self.connections_per_host)
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Motores de descarga que se abren en run_async
+        self.http_fetcher: Optional[AsyncHttpFetcher] = None
+        self.fetch_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.conversion_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.browser_pool: Optional[BrowserPool] = None
+        self.http_cache: Optional[HttpCache] = None
+        self.output_writer: Optional[OutputWriter] = None
+        self.search_index: Optional[SearchIndex] = None
+
+        logger.info(f"Scraper inicializado - Motor: {self.engine_name}")
 
-        logger.info(f"Scraper inicializado - Motor: {'Playwright' if self.use_playwright else 'Requests'}")
+    @property
+    def engine_name(self) -> str:
+        """Nombre legible del motor de descarga configurado"""
+        if self.use_playwright:
+            return 'Playwright'
+        return {'requests': 'Requests', 'aiohttp': 'aiohttp', 'httpx': 'httpx'}[self.fetch_engine]
 
     def extract_content_selectors(self, soup: BeautifulSoup) -> BeautifulSoup:
         """Extrae contenido usando selectores personalizados o genéricos"""
-
-        # Selectores personalizados del usuario
-        if self.custom_selectors:
-            for name, selector in self.custom_selectors.items():
-                elements = soup.select(selector)
-                if elements:
-                    logger.debug(f"Usando selector personalizado '{name}': {selector}")
-                    return elements[0]
-
-        # Selectores genéricos comunes para documentación
-        common_selectors = [
-            'main',
-            'article',
-            '.content',
-            '.documentation',
-            '.docs',
-            '.doc-content',
-            '.main-content',
-            '.primary-content',
-            '#content',
-            '#main',
-            '.markdown-body',
-            '[role="main"]',
-            '.prose'
-        ]
-
-        for selector in common_selectors:
-            elements = soup.select(selector)
-            if elements:
-                logger.debug(f"Usando selector genérico: {selector}")
-                return elements[0]
-
-        # Si no encuentra selectores específicos, limpiar el body
-        body = soup.find('body')
-        if body:
-            # Eliminar elementos no deseados
-            unwanted_selectors = [
-                'nav', 'header', 'footer', 'aside', 'script', 'style', 'noscript',
-                '.navigation', '.nav', '.sidebar', '.menu', '.header', '.footer',
-                '.ad', '.ads', '.advertisement', '.cookie-notice', '.banner',
-                '.social', '.share', '.related', '.comments'
-            ]
-
-            for selector in unwanted_selectors:
-                for element in body.select(selector):
-                    element.decompose()
-
-            return body
-
-        return soup
+        return self.page_converter.extract_content_selectors(soup)
 
     def extract_links_from_soup(self, soup: BeautifulSoup, current_url: str) -> Set[str]:
         """Extrae enlaces de la página de forma inteligente"""
-        links = set()
-
-        # Selectores para enlaces de documentación
-        link_selectors = [
-            'nav a[href]',  # Enlaces de navegación
-            '.toc a[href]', # Tabla de contenidos
-            '.sidebar a[href]',  # Sidebar
-            '.menu a[href]',     # Menú
-            'main a[href]',      # Enlaces en contenido principal
-            '.docs a[href]',     # Enlaces en docs
-            '.documentation a[href]',  # Enlaces en documentación
-        ]
-
-        # Primero, intentar selectores específicos
-        for selector in link_selectors:
-            for link in soup.select(selector):
-                href = link.get('href')
-                if href:
-                    absolute_url = urljoin(current_url, href)
-                    # Limpiar URL (remover anchors)
-                    clean_url = absolute_url.split('#')[0]
-                    if self.link_tracker.is_valid_url(clean_url):
-                        links.add(clean_url)
-
-        # Si no encontramos suficientes enlaces, buscar todos los enlaces
-        if len(links) < 5:  # Umbral mínimo
-            for link in soup.find_all('a', href=True):
-                href = link.get('href')
-                if href:
-                    absolute_url = urljoin(current_url, href)
-                    clean_url = absolute_url.split('#')[0]
-                    if self.link_tracker.is_valid_url(clean_url):
-                        links.add(clean_url)
-
-        return links
+        return self.page_converter.extract_links_from_soup(soup, current_url)
 
-    async def scrape_with_playwright(self, url: str) -> tuple[str, Set[str]]:
-        """Scraping usando Playwright para sitios con JavaScript"""
-        try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-
-                try:
-                    page = await browser.new_page()
-                    await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+    def process_html(self, html_content: str, url: str) -> tuple[str, Set[str]]:
+        """Convierte el HTML descargado en Markdown final y extrae sus enlaces"""
+        return self.page_converter.convert(html_content, url)
 
-                    # Esperar un poco para que se cargue el JavaScript
-                    await page.wait_for_timeout(2000)
+    def load_content_index(self, max_distance: int) -> ContentIndex:
+        """Reconstruye el índice de huellas con las páginas canónicas del tracker"""
+        index = ContentIndex(max_distance)
+        for url, content_hash, simhash_value in self.link_tracker.iter_fingerprints():
+            index.add(url, content_hash, simhash_value)
+        return index
 
-                    # Obtener el HTML renderizado
-                    html_content = await page.content()
+    async def convert_page(
+        self,
+        body: bytes,
+        encoding: Optional[str],
+        url: str,
+        final_url: Optional[str] = None
+    ) -> tuple[Optional[str], Set[str]]:
+        """Convierte una página en el pool de procesos si existe, o en el propio loop.
+
+        Los enlaces se resuelven contra `final_url` (tras redirecciones). Si el
+        contenido principal duplica el de otra página ya guardada, la URL se
+        registra como alias y no se genera Markdown (contenido None).
+        """
+        with self.metrics.in_flight('conversions'), self.metrics.timer('convert'):
+            return await self._convert_page(body, encoding, url, final_url or url)
 
-                    # Procesar con BeautifulSoup
-                    soup = BeautifulSoup(html_content, 'html.parser')
+    async def _convert_page(self, body: bytes, encoding: Optional[str], url: str, page_url: str) -> tuple[Optional[str], Set[str]]:
+        fingerprint = self.content_index is not None
+        loop = asyncio.get_running_loop()
 
-                    # Extraer contenido y enlaces
-                    content_element = self.extract_content_selectors(soup)
-                    links = self.extract_links_from_soup(soup, url)
+        if self.conversion_pool is None:
+            timings = {}
+            content_html, links, metadata, fingerprints = extract_page(
+                self.page_converter, body, encoding, page_url, fingerprint, timings
+            )
+        else:
+            (content_html, links, metadata, fingerprints), timings = await loop.run_in_executor(
+                self.conversion_pool, _extract_in_worker, body, encoding, page_url, fingerprint
+            )
+        self.metrics.observe_timings(timings)
+
+        if fingerprints is not None:
+            with self.metrics.timer('dedup'):
+                # En modo distribuido se incorporan antes las páginas de otros workers
+                for other_url, content_hash, simhash_value in self.link_tracker.iter_new_fingerprints():
+                    self.content_index.add(other_url, content_hash, simhash_value)
+                canonical = self.content_index.find_duplicate(url, *fingerprints)
+            if canonical is not None:
+                logger.info(f"Duplicado de {canonical}: {url}")
+                self.link_tracker.mark_alias(url, canonical)
+                return None, links
+
+            self.content_index.add(url, *fingerprints)
+            self.link_tracker.record_fingerprint(url, *fingerprints)
+
+        if self.conversion_pool is None:
+            timings = {}
+            content = self.page_converter.render(content_html, metadata, timings)
+        else:
+            content, timings = await loop.run_in_executor(self.conversion_pool, _render_in_worker, content_html, metadata)
+        self.metrics.observe_timings(timings)
 
-                    # Extraer metadata
-                    metadata = self.markdown_processor.extract_metadata(soup, url)
+        return content, links
 
-                    # Convertir a markdown
-                    markdown_content = self.markdown_processor.html_to_markdown(str(content_element))
-                    cleaned_markdown = self.markdown_processor.clean_markdown(markdown_content)
+    def create_browser_pool(self, size: int) -> BrowserPool:
+        """Crea un pool de navegador con la configuración del scraper"""
+        return BrowserPool(
+            size=size,
+            recycle_after=self.browser_recycle_after,
+            wait_selector=self.wait_selector
+        )
 
-                    # Añadir frontmatter
-                    final_content = self.markdown_processor.add_frontmatter(cleaned_markdown, metadata)
+    async def scrape_with_playwright(self, url: str) -> tuple[str, Set[str]]:
+        """Scraping usando Playwright para sitios con JavaScript"""
+        # Fuera de run_async no hay pool compartido: se usa uno temporal
+        pool = self.browser_pool
+        owns_pool = pool is None
+        if owns_pool:
+            pool = self.create_browser_pool(size=1)
 
-                    return final_content, links
+        try:
+            host_limiter = self.rate_limiter.for_host(url)
+            with self.metrics.timer('rate_wait'):
+                await host_limiter.acquire()
+            started = time.monotonic()
+            with self.metrics.in_flight('requests'), self.metrics.timer('browser_render'):
+                html_content, final_url = await pool.render(url)
+            host_limiter.on_success(time.monotonic() - started)
+            self.metrics.record_response(200, len(html_content))
 
-                finally:
-                    await browser.close()
+            return await self.convert_page(html_content.encode('utf-8'), 'utf-8', url, final_url)
 
         except Exception as e:
             logger.error(f"Error con Playwright en {url}: {e}")
             raise
 
+        finally:
+            if owns_pool:
+                await pool.close()
+
+    def fetch_with_requests(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """Descarga una URL con la sesión de requests (bloqueante, cuerpo en streaming con límites)"""
+        started = time.perf_counter()
+        with self.session.get(url, headers=headers, timeout=30, stream=True) as response:
+            if response.status_code >= 400:
+                raise HttpStatusError(url, response.status_code, dict(response.headers))
+
+            # Una respuesta 304 no trae cuerpo
+            body, encoding = b'', None
+            if response.status_code != 304:
+                reader = BodyReader(url, response.headers, self.max_page_bytes)
+                for chunk in response.iter_content(STREAM_CHUNK_BYTES):
+                    reader.feed(chunk)
+                body, encoding = reader.finish()
+        elapsed = time.perf_counter() - started
+
+        return FetchResult(
+            url=response.url,
+            status=response.status_code,
+            headers=dict(response.headers),
+            body=body,
+            encoding=encoding,
+            # requests solo mide hasta las cabeceras (incluye DNS y conexión)
+            timings={
+                'ttfb': response.elapsed.total_seconds(),
+                'download': max(0.0, elapsed - response.elapsed.total_seconds())
+            }
+        )
+
     def scrape_with_requests(self, url: str) -> tuple[str, Set[str]]:
         """Scraping usando requests para sitios estáticos"""
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            with self.metrics.timer('fetch'):
+                result = self.fetch_with_requests(url)
+            self.metrics.record_response(result.status, len(result.body))
 
-            # Detectar encoding
-            if response.encoding is None or response.encoding == 'ISO-8859-1':
-                response.encoding = response.apparent_encoding or 'utf-8'
+            timings = dict(result.timings)
+            content, links = self.page_converter.convert(result.text, result.url, timings)
+            self.metrics.observe_timings(timings)
+            return content, links
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+        except ContentRejectedError:
+            raise
 
-            # Extraer contenido y enlaces
-            content_element = self.extract_content_selectors(soup)
-            links = self.extract_links_from_soup(soup, url)
+        except Exception as e:
+            logger.error(f"Error con requests en {url}: {e}")
+            raise
+
+    async def scrape_with_http_engine(self, url: str) -> tuple[Optional[str], Set[str]]:
+        """Scraping sin bloquear el event loop usando el motor HTTP configurado.
+
+        Devuelve contenido None cuando la página no ha cambiado desde el último
+        rastreo (304 o mismo hash) y el archivo de salida sigue existiendo.
+        """
+        try:
+            # Petición condicional solo si hay una salida previa que conservar
+            cache_entry = None
+            if self.http_cache is not None and self.output_exists(url):
+                cache_entry = self.http_cache.get(url)
+            headers = HttpCache.conditional_headers(cache_entry) or None
+
+            result = await self.fetch_with_limits(url, headers)
 
-            # Extraer metadata
-            metadata = self.markdown_processor.extract_metadata(soup, url)
+            if cache_entry is not None and result.status == 304:
+                logger.debug(f"Sin cambios (304): {url}")
+                return None, cache_entry['links']
 
-            # Convertir a markdown
-            markdown_content = self.markdown_processor.html_to_markdown(str(content_element))
-            cleaned_markdown = self.markdown_processor.clean_markdown(markdown_content)
+            body_hash = HttpCache.hash_body(result.body) if self.http_cache is not None else None
+            if cache_entry is not None and cache_entry['body_hash'] == body_hash:
+                logger.debug(f"Sin cambios (mismo hash): {url}")
+                self.http_cache.update(url, result, body_hash, cache_entry['links'])
+                return None, cache_entry['links']
 
-            # Añadir frontmatter
-            final_content = self.markdown_processor.add_frontmatter(cleaned_markdown, metadata)
+            content, links = await self.convert_page(result.body, result.encoding, url, result.url)
 
-            return final_content, links
+            if self.http_cache is not None:
+                self.http_cache.update(url, result, body_hash, links)
+
+            return content, links
+
+        except ContentRejectedError:
+            raise
 
         except Exception as e:
-            logger.error(f"Error con requests en {url}: {e}")
+            logger.error(f"Error con {self.engine_name} en {url}: {e}")
             raise
 
+    async def fetch_with_limits(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """Descarga respetando el limitador del host y reintentando ante 429/503"""
+        host_limiter = self.rate_limiter.for_host(url)
+
+        for attempt in range(self.max_retries + 1):
+            with self.metrics.timer('rate_wait'):
+                await host_limiter.acquire()
+            started = time.monotonic()
+
+            try:
+                with self.metrics.in_flight('requests'):
+                    if self.http_fetcher is not None:
+                        result = await self.http_fetcher.fetch(url, headers)
+                    else:
+                        # requests es bloqueante: solo la descarga se ejecuta en el pool de
+                        # hilos (HTML2Text no es thread-safe, la conversión va aparte)
+                        loop = asyncio.get_running_loop()
+                        result = await loop.run_in_executor(self.fetch_executor, self.fetch_with_requests, url, headers)
+
+            except HttpStatusError as e:
+                self.metrics.record_response(e.status)
+                if e.status in THROTTLE_STATUSES:
+                    # También en el último intento: el servidor pidió frenar
+                    host_limiter.on_throttled(e.retry_after())
+                    if attempt < self.max_retries:
+                        self.metrics.increment('throttled_retries')
+                        continue
+                raise
+
+            except ContentRejectedError:
+                self.metrics.increment('rejected_pages')
+                raise
+
+            except Exception:
+                self.metrics.increment('fetch_errors')
+                raise
+
+            elapsed = time.monotonic() - started
+            host_limiter.on_success(elapsed)
+            self.metrics.observe('fetch', elapsed)
+            self.metrics.observe_timings(result.timings)
+            self.metrics.record_response(result.status, len(result.body))
+            return result
+
     def get_file_path(self, url: str) -> Path:
         """Genera la ruta del archivo para una URL"""
         parsed = urlparse(url)
@@ -572,8 +545,52 @@ class AdvancedDocsScraper:
 
         return self.output_dir / f"{filename}{extension}"
 
+    def output_name(self, url: str) -> str:
+        """Ruta relativa de la página dentro de la salida (archivo, entrada del tar/zip o 'path' del corpus)"""
+        return self.get_file_path(url).relative_to(self.output_dir).as_posix()
+
+    def output_exists(self, url: str) -> bool:
+        """Indica si la página ya está en la salida configurada (o pendiente de escribirse)"""
+        if self.output_writer is not None and self.output_name(url) in self.output_writer:
+            return True
+        return self.output_format == 'files' and self.get_file_path(url).exists()
+
+    async def write_content(self, url: str, content: str):
+        """Entrega la página al escritor en segundo plano (solo espera si el disco va atrasado).
+
+        La URL se marca como visitada cuando su lote está sincronizado en disco:
+        si el proceso muere antes, o la escritura falla, sigue pendiente.
+        """
+        if self.output_writer is None:
+            self.save_content(url, content)
+            self.link_tracker.mark_visited(url)
+            return
+
+        # El timer mide solo la espera por backpressure; la escritura la hace el hilo
+        with self.metrics.timer('write'):
+            await self.output_writer.put(
+                self.output_name(url), content,
+                on_written=lambda error: self.on_page_written(url, error)
+            )
+        logger.info(f"Encolado: {self.output_name(url)}")
+
+    def on_page_written(self, url: str, error: Optional[Exception]):
+        """Resultado de la escritura de una página encolada (se llama en el event loop)"""
+        if error is None:
+            self.link_tracker.mark_visited(url)
+            return
+
+        logger.warning(f"{url} vuelve a la cola: no se pudo escribir su salida ({error})")
+        self.stats.total_successful -= 1
+        self.link_tracker.requeue(url)
+
     def save_content(self, url: str, content: str):
-        """Guarda el contenido en archivo"""
+        """Guarda el contenido en archivo (o lo encola si hay escritor en segundo plano)"""
+        if self.output_writer is not None:
+            self.output_writer.submit(self.output_name(url), content)
+            logger.info(f"Encolado: {self.output_name(url)}")
+            return
+
         file_path = self.get_file_path(url)
 
         try:
@@ -581,7 +598,7 @@ class AdvancedDocsScraper:
             file_path.parent.mkdir(parents=True, exist_ok=True)
 
             # Guardar contenido
-            with open(file_path, 'w', encoding='utf-8') as f:
+            with self.metrics.timer('write'), open(file_path, 'w', encoding='utf-8') as f:
                 f.write(content)
 
             logger.info(f"Guardado: {file_path}")
@@ -593,50 +610,256 @@ class AdvancedDocsScraper:
     async def process_page(self, url: str) -> bool:
         """Procesa una página individual"""
         if url in self.link_tracker.visited_urls:
-            self.link_tracker.mark_skipped(url, "Ya visitada")
+            # Sin marcarla: una visitada que pasara a omitida saldría de las
+            # visitadas (conteo, re-rastreo y comprobación de cambios)
+            logger.debug(f"Omitiendo {url} - ya visitada")
             return False
 
-        # Verificar si el archivo ya existe
-        file_path = self.get_file_path(url)
-        if file_path.exists():
+        # Verificar si el archivo ya existe (en modo refresh se revalida con el servidor)
+        exists = self.output_exists(url)
+        if exists and not self.refresh:
             self.link_tracker.mark_skipped(url, "Archivo ya existe")
             logger.info(f"Omitiendo {url} - archivo ya existe")
             return False
 
+        # En re-rastreos, el lastmod del sitemap evita incluso la petición condicional
+        if exists and self.link_tracker.is_unchanged_since_visit(url):
+            self.link_tracker.mark_skipped(url, "Sin cambios según sitemap")
+            self.stats.total_unchanged += 1
+            return False
+
         try:
             logger.info(f"Procesando: {url}")
 
             # Scraping según el método configurado
-            if self.use_playwright:
-                content, links = await self.scrape_with_playwright(url)
-            else:
-                content, links = self.scrape_with_requests(url)
-
-            # Guardar contenido
-            self.save_content(url, content)
+            with self.metrics.in_flight('pages'), self.metrics.timer('page'):
+                if self.use_playwright:
+                    content, links = await self.scrape_with_playwright(url)
+                else:
+                    content, links = await self.scrape_with_http_engine(url)
+
+                # Guardar contenido (None = sin cambios desde el último rastreo o duplicado)
+                if content is None:
+                    if self.link_tracker.alias_of(url):
+                        self.stats.total_duplicates += 1
+                    else:
+                        self.stats.total_unchanged += 1
+                    self.link_tracker.mark_visited(url)
+                else:
+                    # Marca la URL como visitada cuando la salida está en disco
+                    await self.write_content(url, content)
 
             # Actualizar tracker
-            self.link_tracker.mark_visited(url)
             self.link_tracker.add_discovered_urls(links, url)
 
-            # Delay entre peticiones
-            if self.delay > 0:
-                await asyncio.sleep(self.delay)
-
             self.stats.total_successful += 1
             return True
 
+        except ContentRejectedError as e:
+            # No es un fallo: la URL no es una página HTML que convertir
+            logger.info(f"Omitiendo {url} - {e.reason}")
+            self.link_tracker.mark_skipped(url, e.reason)
+            return False
+
         except Exception as e:
             logger.error(f"Error procesando {url}: {e}")
             self.link_tracker.mark_failed(url, str(e))
             self.stats.total_failed += 1
             return False
 
+    async def seed_from_sitemaps(self):
+        """Siembra el frontier con robots.txt/sitemaps antes del primer lote"""
+        entries = await asyncio.to_thread(
+            lambda: list(iter_site_urls(self.base_url, self.session, self.sitemap_url))
+        )
+        logger.info(f"Sitemaps leídos: {len(entries)} URLs")
+        self.link_tracker.add_sitemap_urls(entries)
+
+    async def start_engines(self):
+        """Abre los recursos de descarga y conversión compartidos por todo el rastreo"""
+        if self.use_search_index:
+            # Los workers de una cola compartida actualizan el mismo índice
+            self.search_index = SearchIndex(self.output_dir / SEARCH_INDEX_FILE, shared=self.link_tracker.shared)
+
+        # Con cola compartida cada worker escribe su propio archivo único
+        suffix = f".{self.link_tracker.worker_id}" if self.link_tracker.shared else ''
+        self.output_writer = OutputWriter(
+            create_output_sink(self.output_dir, self.output_format, suffix, self.fsync),
+            search_index=self.search_index
+        )
+        if self.output_format != 'files':
+            logger.info(f"Salida en un único archivo: {self.output_writer.sink.path}")
+
+        if self.conversion_workers > 0:
+            self.conversion_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.conversion_workers,
+                initializer=_init_conversion_worker,
+                initargs=(self.domain, self.custom_selectors, self.parser_engine)
+            )
+            logger.info(f"Pool de conversión iniciado con {self.conversion_workers} procesos")
+
+        if self.use_playwright:
+            self.browser_pool = self.create_browser_pool(size=self.concurrency)
+            await self.browser_pool.start()
+            return
+
+        if self.use_http_cache:
+            self.http_cache = HttpCache(self.output_dir / '.http_cache.sqlite', shared=self.link_tracker.shared)
+
+        if self.fetch_engine == 'requests':
+            self.fetch_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.concurrency,
+                thread_name_prefix='fetch'
+            )
+        else:
+            self.http_fetcher = AsyncHttpFetcher(
+                engine=self.fetch_engine,
+                concurrency=self.concurrency,
+                connections_per_host=self.connections_per_host,
+                max_body_bytes=self.max_page_bytes
+            )
+            await self.http_fetcher.start()
+
+    async def close_engines(self):
+        """Libera los recursos abiertos por start_engines"""
+        if self.output_writer is not None:
+            # Espera a que el hilo escritor vacíe lo pendiente
+            writer, self.output_writer = self.output_writer, None
+            await asyncio.to_thread(writer.close)
+
+        if self.search_index is not None:
+            logger.info(
+                f"Índice de búsqueda: {self.search_index.updated} páginas indexadas, "
+                f"{self.search_index.unchanged} sin cambios -> {self.search_index.path}"
+            )
+            self.search_index.close()
+            self.search_index = None
+
+        if self.http_cache is not None:
+            self.http_cache.close()
+            self.http_cache = None
+
+        if self.browser_pool is not None:
+            await self.browser_pool.close()
+            self.browser_pool = None
+
+        if self.http_fetcher is not None:
+            await self.http_fetcher.close()
+            self.http_fetcher = None
+
+        if self.fetch_executor is not None:
+            self.fetch_executor.shutdown(wait=True)
+            self.fetch_executor = None
+
+        if self.conversion_pool is not None:
+            self.conversion_pool.shutdown(wait=True)
+            self.conversion_pool = None
+
     async def run_async(self):
         """Ejecuta el scraping de forma asíncrona"""
         self.stats.start_time = datetime.now()
         logger.info(f"Iniciando scraping desde: {self.base_url}")
 
+        # En una cola compartida solo el coordinador re-encola (ver run_distributed_crawl)
+        if self.refresh and not self.link_tracker.shared:
+            self.link_tracker.requeue_processed()
+
+        if self.use_sitemap:
+            await self.seed_from_sitemaps()
+
+        await self.start_engines()
+        background = []
+        if self.metrics_file and self.metrics_interval > 0:
+            background.append(asyncio.create_task(self.export_metrics_periodically()))
+        if self.link_tracker.shared:
+            background.append(asyncio.create_task(self.renew_leases_periodically()))
+        try:
+            await self._crawl()
+        finally:
+            for task in background:
+                task.cancel()
+            await self.close_engines()
+
+        self.stats.end_time = datetime.now()
+        self.link_tracker.save_cache()
+        self.save_aliases()
+        if self.graph_file:
+            self.export_link_graph()
+        if self.metrics_file:
+            self.export_metrics()
+
+        # Reporte final
+        if self.report:
+            self.print_final_report()
+        else:
+            logger.info(
+                f"Worker {self.link_tracker.worker_id} terminado: {self.stats.total_successful} páginas, "
+                f"{self.stats.total_failed} fallidas, {self.stats.total_unchanged} sin cambios, "
+                f"{self.stats.total_duplicates} duplicadas"
+            )
+        self.link_tracker.close()
+
+    async def renew_leases_periodically(self):
+        """Latido del worker: renueva sus leases a un tercio de su duración"""
+        interval = self.link_tracker.store.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            self.link_tracker.renew_leases()
+
+    def metric_totals(self) -> Dict[str, int]:
+        """Totales del rastreo que acompañan a las métricas exportadas"""
+        tracker_stats = self.link_tracker.get_stats()
+        return {
+            'urls_discovered': tracker_stats['discovered'],
+            'urls_visited': tracker_stats['visited'],
+            'urls_failed': tracker_stats['failed'],
+            'urls_skipped': tracker_stats['skipped'],
+            'urls_pending': tracker_stats['pending'],
+            'pages_successful': self.stats.total_successful,
+            'pages_failed': self.stats.total_failed,
+            'pages_unchanged': self.stats.total_unchanged,
+            'pages_duplicated': self.stats.total_duplicates
+        }
+
+    def export_metrics(self):
+        """Escribe las métricas en --metrics-file (JSON o texto de Prometheus)"""
+        try:
+            self.metrics.write(self.metrics_file, self.metric_totals())
+        except OSError as e:
+            logger.warning(f"No se pudieron exportar las métricas a {self.metrics_file}: {e}")
+
+    async def export_metrics_periodically(self):
+        """Reescribe el archivo de métricas cada --metrics-interval segundos durante el rastreo"""
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            self.export_metrics()
+
+    def save_aliases(self):
+        """Escribe aliases.json: URL duplicada -> URL y archivo canónicos"""
+        aliases = self.link_tracker.get_aliases()
+        if not aliases:
+            return
+
+        data = {
+            alias: {
+                'canonical': canonical,
+                'file': self.output_name(canonical)
+            }
+            for alias, canonical in sorted(aliases.items())
+        }
+        write_file_atomic(self.output_dir / 'aliases.json', json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8'))
+
+    def export_link_graph(self):
+        """Escribe el grafo de enlaces en --export-graph (CSV o GraphML)"""
+        try:
+            edges = self.link_tracker.export_link_graph(self.graph_file)
+            logger.info(f"Grafo de enlaces: {edges} aristas -> {self.graph_file}")
+        except OSError as e:
+            logger.warning(f"No se pudo exportar el grafo de enlaces a {self.graph_file}: {e}")
+
+    async def _crawl(self):
+        """Loop principal: procesa lotes de URLs pendientes hasta agotar el frontier"""
+
         # Añadir URL base si no está en el tracker
         if self.base_url not in self.link_tracker.discovered_urls:
             self.link_tracker.add_discovered_urls({self.base_url})
@@ -650,27 +873,39 @@ class AdvancedDocsScraper:
 
         # Loop principal de scraping
         while True:
+            # Limitar por max_pages si está configurado (antes de reservar URLs de la cola)
+            limit = self.concurrency * 2
+            if self.max_pages:
+                remaining = self.max_pages - self.stats.total_processed
+                if remaining <= 0:
+                    logger.info(f"Límite de páginas alcanzado: {self.max_pages}")
+                    break
+                limit = min(limit, remaining)
+
             # Obtener próximas URLs a procesar
-            next_urls = self.link_tracker.get_next_urls(self.concurrency * 2)
+            next_urls = self.link_tracker.get_next_urls(limit)
 
             if not next_urls:
+                # Con cola compartida, otros workers aún pueden descubrir URLs
+                if self.link_tracker.leased_elsewhere():
+                    await asyncio.sleep(QUEUE_POLL_SECONDS)
+                    continue
                 break
 
-            if self.max_pages and self.stats.total_processed >= self.max_pages:
-                logger.info(f"Límite de páginas alcanzado: {self.max_pages}")
-                break
-
-            # Limitar por max_pages si está configurado
-            if self.max_pages:
-                remaining = self.max_pages - self.stats.total_processed
-                next_urls = next_urls[:remaining]
-
             # Procesar URLs en lotes
             logger.info(f"Procesando lote de {len(next_urls)} URLs...")
 
             tasks = [process_with_semaphore(url) for url in next_urls]
             results = await asyncio.gather(*tasks, return_exceptions=True)
 
+            # process_page marca cada URL; si la tarea falló antes, marcarla aquí
+            # para que no quede pendiente (y reservada) sin procesar
+            for url, result in zip(next_urls, results):
+                if isinstance(result, BaseException):
+                    logger.error(f"Error inesperado procesando {url}: {result!r}")
+                    self.stats.total_failed += 1
+                    self.link_tracker.mark_failed(url, repr(result))
+
             # Actualizar estadísticas
             self.stats.total_processed += len(next_urls)
 
@@ -678,12 +913,6 @@ class AdvancedDocsScraper:
             tracker_stats = self.link_tracker.get_stats()
             logger.info(f"Progreso: {tracker_stats}")
 
-        self.stats.end_time = datetime.now()
-        self.link_tracker.save_cache()
-
-        # Reporte final
-        self.print_final_report()
-
     def run(self):
         """Ejecuta el scraping (wrapper síncrono)"""
         if self.use_playwright:
@@ -701,14 +930,25 @@ class AdvancedDocsScraper:
         print("="*60)
         print(f"🌐 Sitio web:       {self.domain}")
         print(f"📁 Directorio:      {self.output_dir}")
-        print(f"⚙️  Motor:           {'Playwright' if self.use_playwright else 'Requests'}")
+        print(f"⚙️  Motor:           {self.engine_name}")
         print(f"📄 Formato:         {'.mdx' if self.convert_to_mdx else '.md'}")
         print("-"*60)
         print(f"🔍 URLs descubiertas:  {stats['discovered']}")
         print(f"✅ URLs procesadas:    {stats['visited']}")
         print(f"❌ URLs fallidas:      {stats['failed']}")
         print(f"⏭️  URLs omitidas:      {stats['skipped']}")
+        if self.stats.total_unchanged:
+            print(f"♻️  Sin cambios:        {self.stats.total_unchanged}")
+        if stats['aliases']:
+            # El coordinador de un rastreo distribuido no procesa páginas: solo el total
+            this_run = f" ({self.stats.total_duplicates} en esta ejecución)" if self.stats.total_processed else ''
+            print(f"🔁 Duplicados (alias): {stats['aliases']}{this_run}")
         print(f"⏳ URLs pendientes:    {stats['pending']}")
+        links = self.link_tracker.store.link_count
+        if links:
+            print(f"🔗 Enlaces internos:   {links}")
+            for url, in_degree in self.link_tracker.top_linked(3):
+                print(f"   {in_degree:>6} ← {url}")
         print("-"*60)
 
         if self.stats.duration:
@@ -717,6 +957,8 @@ class AdvancedDocsScraper:
                 avg_time = self.stats.duration / stats['visited']
                 print(f"📊 Promedio por página: {avg_time:.2f} segundos")
 
+        self.print_metrics_report()
+
         print("="*60)
 
         # Sugerencias
@@ -726,6 +968,27 @@ class AdvancedDocsScraper:
         if stats['pending'] > 0:
             print(f"💡 Quedan {stats['pending']} URLs pendientes. Ejecuta nuevamente para continuar.")
 
+    def print_metrics_report(self):
+        """Imprime percentiles por etapa, bytes descargados y máximos en curso"""
+        if not self.metrics.stages:
+            return
+
+        print("-"*60)
+        print(f"⏱️  {'Etapa':<15}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'máx':>9}  (ms)")
+        for stage, histogram in self.metrics.stages.items():
+            values = [histogram.percentile(q) for q in METRIC_PERCENTILES] + [histogram.max]
+            print(f"   {stage:<15}{histogram.count:>7}" + ''.join(f"{value * 1000:>9.1f}" for value in values))
+
+        downloaded = self.metrics.counters.get('bytes_downloaded', 0)
+        if downloaded:
+            responses = sum(self.metrics.responses.values())
+            print(f"📦 Descargado:      {downloaded / 1024 / 1024:.2f} MB en {responses} respuestas")
+        if self.metrics.gauge_peaks:
+            peaks = ', '.join(f"{name} {peak}" for name, peak in self.metrics.gauge_peaks.items())
+            print(f"🔀 Máximo en curso: {peaks}")
+        if self.metrics_file:
+            print(f"📈 Métricas:        {self.metrics_file}")
+
     def convert_md_to_mdx(self):
         """Convierte archivos .md existentes a .mdx"""
         md_files = list(self.output_dir.rglob("*.md"))
@@ -898,6 +1161,105 @@ def get_interactive_config():
         else:
             print("❌ Responde 's' para sí o 'n' para no")
 
+# Manifiesto del post-procesado (--fix-format) dentro del directorio de salida
+POSTPROCESS_MANIFEST = '.postprocess_manifest.json'
+
+class PostprocessManifest:
+    """Manifiesto (ruta, mtime, tamaño, hash) de los archivos ya post-procesados.
+
+    Se invalida entero cuando cambia la huella de las reglas de limpieza;
+    borrar el archivo fuerza un reprocesado completo.
+    """
+
+    def __init__(self, output_dir: Union[str, Path], version: str):
+        self.root = Path(output_dir)
+        self.path = self.root / POSTPROCESS_MANIFEST
+        self.version = version
+        self.files: Dict[str, List] = {}
+
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+                if data.get('version') == version:
+                    self.files = data.get('files', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Manifiesto ilegible, se reprocesará todo: {e}")
+
+    def _key(self, path: str) -> str:
+        return os.path.relpath(path, self.root)
+
+    def is_unchanged(self, path: str, size: int, mtime_ns: int) -> bool:
+        entry = self.files.get(self._key(path))
+        return entry is not None and entry[0] == size and entry[1] == mtime_ns
+
+    def known_hash(self, path: str) -> Optional[str]:
+        entry = self.files.get(self._key(path))
+        return entry[2] if entry else None
+
+    def update(self, path: str, size: int, mtime_ns: int, content_hash: str):
+        self.files[self._key(path)] = [size, mtime_ns, content_hash]
+
+    def prune(self, paths: List[str]):
+        """Olvida los archivos que ya no existen"""
+        existing = {self._key(path) for path in paths}
+        self.files = {key: entry for key, entry in self.files.items() if key in existing}
+
+    def save(self):
+        data = json.dumps({'version': self.version, 'files': self.files}, separators=(',', ':'))
+        write_file_atomic(self.path, data.encode('utf-8'))
+
+# Limpiador propio de cada proceso del pool de post-procesado
+_worker_cleaner: Optional[MarkdownCleaner] = None
+
+def _fix_markdown_file(path: str, known_hash: Optional[str]) -> tuple:
+    """Corrige un archivo markdown; devuelve (ruta, corregido, tamaño, mtime_ns, hash, error)"""
+    global _worker_cleaner
+    if _worker_cleaner is None:
+        _worker_cleaner = MarkdownCleaner()
+
+    try:
+        raw = Path(path).read_bytes()
+        content_hash = hashlib.sha256(raw).hexdigest()
+
+        # Solo cambió el mtime: el contenido ya estaba corregido
+        if content_hash == known_hash:
+            stat = os.stat(path)
+            return path, False, stat.st_size, stat.st_mtime_ns, content_hash, None
+
+        original_content = raw.decode('utf-8')
+
+        # Separar frontmatter del contenido
+        if original_content.startswith('---'):
+            parts = original_content.split('---', 2)
+            if len(parts) >= 3:
+                frontmatter = f"---{parts[1]}---"
+                content = parts[2]
+            else:
+                frontmatter = ""
+                content = original_content
+        else:
+            frontmatter = ""
+            content = original_content
+
+        # Aplicar correcciones
+        cleaned_content = _worker_cleaner.clean(content)
+
+        # Reconstruir archivo
+        final_content = frontmatter + "\n" + cleaned_content if frontmatter else cleaned_content
+
+        # Guardar solo si hay cambios
+        fixed = final_content != original_content
+        if fixed:
+            raw = final_content.encode('utf-8')
+            Path(path).write_bytes(raw)
+            content_hash = hashlib.sha256(raw).hexdigest()
+
+        stat = os.stat(path)
+        return path, fixed, stat.st_size, stat.st_mtime_ns, content_hash, None
+
+    except Exception as e:
+        return path, False, 0, 0, None, str(e)
+
 def analyze_scraped_content(output_dir: str):
     """Analiza el contenido ya scrapeado"""
     output_path = Path(output_dir)
@@ -906,93 +1268,297 @@ def analyze_scraped_content(output_dir: str):
         print(f"❌ Directorio {output_dir} no existe")
         return
 
-    # Contar archivos
-    md_files = list(output_path.rglob("*.md"))
-    mdx_files = list(output_path.rglob("*.mdx"))
+    # Contar archivos (un solo recorrido y un stat por archivo)
+    all_files = scan_markdown_files(output_path)
+    mdx_count = sum(1 for path, _, _ in all_files if path.endswith('.mdx'))
+    md_count = len(all_files) - mdx_count
 
     print("\n" + "="*50)
     print("         ANÁLISIS DE CONTENIDO SCRAPEADO")
     print("="*50)
     print(f"📁 Directorio:      {output_path.absolute()}")
-    print(f"📄 Archivos .md:    {len(md_files)}")
-    print(f"📝 Archivos .mdx:   {len(mdx_files)}")
-    print(f"📊 Total archivos:  {len(md_files) + len(mdx_files)}")
+    print(f"📄 Archivos .md:    {md_count}")
+    print(f"📝 Archivos .mdx:   {mdx_count}")
+    print(f"📊 Total archivos:  {len(all_files)}")
 
     # Analizar tamaños
-    if md_files or mdx_files:
-        all_files = md_files + mdx_files
-        total_size = sum(f.stat().st_size for f in all_files)
-        avg_size = total_size / len(all_files) if all_files else 0
+    if all_files:
+        total_size = sum(size for _, size, _ in all_files)
+        avg_size = total_size / len(all_files)
 
         print(f"💾 Tamaño total:    {total_size / 1024 / 1024:.2f} MB")
         print(f"📏 Tamaño promedio: {avg_size / 1024:.2f} KB")
 
         # Archivos más grandes
-        largest_files = sorted(all_files, key=lambda f: f.stat().st_size, reverse=True)[:5]
+        largest_files = heapq.nlargest(5, all_files, key=lambda f: f[1])
         print(f"\n📈 Archivos más grandes:")
-        for i, file in enumerate(largest_files, 1):
-            size_kb = file.stat().st_size / 1024
-            print(f"   {i}. {file.name} ({size_kb:.1f} KB)")
+        for i, (path, size, _) in enumerate(largest_files, 1):
+            print(f"   {i}. {os.path.basename(path)} ({size / 1024:.1f} KB)")
 
     print("="*50)
 
-def fix_markdown_formatting(output_dir: str):
-    """Corrige problemas de formato en archivos markdown existentes"""
+def build_search_index(output_dir: str):
+    """Crea o pone al día el índice de búsqueda de un directorio ya scrapeado"""
     output_path = Path(output_dir)
 
     if not output_path.exists():
         print(f"❌ Directorio {output_dir} no existe")
         return
 
-    processor = MarkdownProcessor()
+    if not FTS5_AVAILABLE:
+        print(f"❌ El SQLite de este Python ({sqlite3.sqlite_version}) no incluye FTS5")
+        return
+
+    start = time.perf_counter()
+    index = SearchIndex(output_path / SEARCH_INDEX_FILE)
+    index.sync_directory(output_path)
+    total = len(index)
+    index.close()
+
+    print("\n" + "="*50)
+    print("            ÍNDICE DE BÚSQUEDA")
+    print("="*50)
+    print(f"🗂️  Índice:           {index.path}")
+    print(f"📄 Páginas:          {total}")
+    print(f"✏️  Reindexadas:      {index.updated}")
+    print(f"✅ Sin cambios:      {index.unchanged}")
+    print(f"🗑️  Eliminadas:       {index.removed}")
+    print(f"⏱️  Duración:         {time.perf_counter() - start:.2f} segundos")
+    print("="*50)
+
+def search_scraped_content(output_dir: str, query: str, limit: int = 10):
+    """Busca en el índice de un directorio scrapeado y muestra los resultados por relevancia"""
+    index_path = Path(output_dir) / SEARCH_INDEX_FILE
+
+    if not index_path.exists():
+        print(f"❌ No hay índice en {output_dir}: créalo con --build-index {output_dir} o rastrea con --search-index")
+        return
+
+    index = SearchIndex(index_path)
+    start = time.perf_counter()
+    hits = index.search(query, limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    index.close()
+
+    print(f"\n🔎 {len(hits)} resultados para \"{query}\" ({elapsed:.1f} ms)")
+    for i, hit in enumerate(hits, 1):
+        print(f"\n   {i}. {hit['title'] or hit['path']}  [{hit['score']:.2f}]")
+        print(f"      {hit['url'] or hit['path']}")
+        print(f"      {hit['snippet']}")
+
+def benchmark_extraction(html_dir: str, iterations: int = 3):
+    """Compara páginas/seg de los motores de extracción sobre páginas HTML guardadas"""
+    html_path = Path(html_dir)
+    html_files = sorted(list(html_path.rglob("*.html")) + list(html_path.rglob("*.htm")))
+
+    if not html_files:
+        print(f"❌ No se encontraron archivos .html en {html_dir}")
+        return
+
+    pages = [(f.as_uri(), f.read_text(encoding='utf-8', errors='replace')) for f in html_files]
+    engines = [engine for engine in PARSER_ENGINES if engine != 'lxml' or LXML_AVAILABLE]
+
+    print(f"\n⏱️  BENCHMARK DE EXTRACCIÓN ({len(pages)} páginas x {iterations} iteraciones)")
+    print("="*50)
+
+    for engine in engines:
+        converter = PageConverter('', parser_engine=engine)
+
+        for label, step in (("extracción", converter.extract), ("conversión completa", converter.convert)):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                for url, html_content in pages:
+                    step(html_content, url)
+            elapsed = time.perf_counter() - start
+            rate = len(pages) * iterations / elapsed if elapsed > 0 else 0
+            print(f"🔧 {engine:<5} {label:<20} {rate:>8.1f} páginas/seg")
+
+    if 'lxml' not in engines:
+        print("⚠️  lxml no disponible. Instala con: pip install lxml")
+
+    print("="*50)
+
+def benchmark_cleaning(markdown_dir: str, iterations: int = 5):
+    """Compara el limpiador de una pasada con la limpieza anterior (siete re.sub)"""
+    markdown_path = Path(markdown_dir)
+    files = list(markdown_path.rglob("*.md")) + list(markdown_path.rglob("*.mdx"))
+
+    if not files:
+        print(f"❌ No se encontraron archivos markdown en {markdown_dir}")
+        return
+
+    documents = [f.read_text(encoding='utf-8', errors='replace') for f in files]
+    total_mb = sum(len(d) for d in documents) / (1024 * 1024)
+
+    # Referencia: una pasada completa de re.sub por corrección
+    legacy_fixes = [
+        (r'\n{4,}', '\n\n\n'),
+        (r'\[\s*([^\]]+)\s*\]\s*\(\s*([^)]+)\s*\)', r'[\1](\2)'),
+        (r'\n\s*[-*+]\s*\n', '\n\n* '),
+        (r'`\s+([^`]+)\s+`', r'`\1`'),
+        (r' +\n', '\n'),
+        (r'\n(#{1,6})\s*\n', r'\n\1 '),
+        (r'\|\s*\|\s*\|', '| |'),
+    ]
+
+    def legacy_clean(content: str) -> str:
+        for pattern, replacement in legacy_fixes:
+            content = re.sub(pattern, replacement, content, flags=re.MULTILINE)
+        return content.strip()
+
+    cleaner = MarkdownCleaner()
+
+    print(f"\n⏱️  BENCHMARK DE LIMPIEZA ({len(documents)} archivos, {total_mb:.2f} MB x {iterations} iteraciones)")
+    print("="*50)
+
+    rates = {}
+    for label, clean in (("multipasada", legacy_clean), ("una pasada", cleaner.clean)):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for document in documents:
+                clean(document)
+        elapsed = time.perf_counter() - start
+        rates[label] = len(documents) * iterations / elapsed if elapsed > 0 else 0
+        print(f"🧹 {label:<12} {rates[label]:>10.1f} archivos/seg  {total_mb * iterations / elapsed:>7.1f} MB/seg")
+
+    if rates["multipasada"]:
+        print(f"🚀 Aceleración: {rates['una pasada'] / rates['multipasada']:.2f}x")
+
+    print("="*50)
+
+def fix_markdown_formatting(output_dir: str, workers: Optional[int] = None):
+    """Corrige problemas de formato en archivos markdown existentes.
+
+    Solo procesa los archivos nuevos o modificados desde la última pasada
+    (según el manifiesto) y reparte el trabajo en un pool de procesos.
+    """
+    output_path = Path(output_dir)
+
+    if not output_path.exists():
+        print(f"❌ Directorio {output_dir} no existe")
+        return
 
     # Encontrar archivos markdown
-    md_files = list(output_path.rglob("*.md"))
-    mdx_files = list(output_path.rglob("*.mdx"))
-    all_files = md_files + mdx_files
+    all_files = scan_markdown_files(output_path)
 
     if not all_files:
         print("❌ No se encontraron archivos markdown")
         return
 
-    print(f"\n🔧 Corrigiendo formato en {len(all_files)} archivos...")
+    manifest = PostprocessManifest(output_path, MarkdownCleaner().fingerprint())
+    pending = [path for path, size, mtime_ns in all_files if not manifest.is_unchanged(path, size, mtime_ns)]
+    skipped = len(all_files) - len(pending)
 
-    fixed_count = 0
+    print(f"\n🔧 Corrigiendo formato en {len(pending)} archivos ({skipped} sin cambios desde la última pasada)...")
 
-    for file_path in tqdm(all_files, desc="Corrigiendo"):
-        try:
-            # Leer contenido
-            original_content = file_path.read_text(encoding='utf-8')
-
-            # Separar frontmatter del contenido
-            if original_content.startswith('---'):
-                parts = original_content.split('---', 2)
-                if len(parts) >= 3:
-                    frontmatter = f"---{parts[1]}---"
-                    content = parts[2]
-                else:
-                    frontmatter = ""
-                    content = original_content
-            else:
-                frontmatter = ""
-                content = original_content
-
-            # Aplicar correcciones
-            cleaned_content = processor.clean_markdown(content)
+    fixed_count = 0
+    known_hashes = [manifest.known_hash(path) for path in pending]
+    workers = workers or os.cpu_count() or 1
 
-            # Reconstruir archivo
-            final_content = frontmatter + "\n" + cleaned_content if frontmatter else cleaned_content
+    # El pool solo compensa con suficientes archivos pendientes
+    if workers > 1 and len(pending) >= 64:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_fix_markdown_file, pending, known_hashes, chunksize=max(1, min(64, len(pending) // (workers * 4))))
+    else:
+        executor = None
+        results = map(_fix_markdown_file, pending, known_hashes)
 
-            # Guardar solo si hay cambios
-            if final_content != original_content:
-                file_path.write_text(final_content, encoding='utf-8')
+    try:
+        for path, fixed, size, mtime_ns, content_hash, error in tqdm(results, total=len(pending), desc="Corrigiendo"):
+            if error:
+                logger.error(f"Error corrigiendo {path}: {error}")
+                continue
+            if fixed:
                 fixed_count += 1
+            manifest.update(path, size, mtime_ns, content_hash)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-        except Exception as e:
-            logger.error(f"Error corrigiendo {file_path}: {e}")
+    manifest.prune([path for path, _, _ in all_files])
+    manifest.save()
 
     print(f"✅ {fixed_count} archivos corregidos")
 
+def _run_crawl_worker(config: Dict):
+    """Punto de entrada de cada worker lanzado por el coordinador"""
+    AdvancedDocsScraper(**config).run()
+
+def run_distributed_crawl(config: Dict, processes: int, monitor_interval: float = 10):
+    """Coordina un rastreo distribuido sobre una cola SQLite compartida.
+
+    Siembra la cola (URL base, sitemaps y re-rastreo), lanza `processes`
+    workers locales y vigila su progreso; si un worker muere, sus URLs vuelven
+    a la cola sin esperar a que caduque el lease. Otros hosts pueden unirse
+    con `--queue` apuntando a la misma ruta en un sistema de archivos compartido.
+    """
+    queue_path = config.get('queue_path') or str(Path(config['output_dir']) / 'crawl_queue.sqlite')
+
+    coordinator = AdvancedDocsScraper(**dict(config, queue_path=queue_path, worker_id='coordinator'))
+    tracker = coordinator.link_tracker
+    coordinator.stats.start_time = datetime.now()
+
+    if coordinator.refresh:
+        tracker.requeue_processed()
+    if coordinator.use_sitemap:
+        asyncio.run(coordinator.seed_from_sitemaps())
+    tracker.add_discovered_urls({coordinator.base_url})
+
+    max_pages = config.get('max_pages')
+    worker_config = dict(
+        config,
+        queue_path=queue_path,
+        use_sitemap=False,
+        sitemap_url=None,
+        report=False,
+        graph_file=None,
+        # El límite de páginas se reparte entre los workers
+        max_pages=-(-max_pages // processes) if max_pages else None
+    )
+
+    # spawn: cada worker abre sus propias conexiones SQLite (nada heredado por fork)
+    context = multiprocessing.get_context('spawn')
+    workers = {}
+    for index in range(processes):
+        worker_id = f"{socket.gethostname()}-{os.getpid()}-w{index}"
+        settings = dict(worker_config, worker_id=worker_id)
+        if config.get('metrics_file'):
+            metrics_path = Path(config['metrics_file'])
+            settings['metrics_file'] = str(metrics_path.with_name(f"{metrics_path.stem}.{worker_id}{metrics_path.suffix}"))
+
+        process = context.Process(target=_run_crawl_worker, args=(settings,), name=worker_id)
+        process.start()
+        workers[process.sentinel] = (process, worker_id)
+
+    logger.info(f"Coordinador: {processes} workers sobre {queue_path}")
+
+    try:
+        while workers:
+            for sentinel in multiprocessing.connection.wait(list(workers), timeout=monitor_interval):
+                process, worker_id = workers.pop(sentinel)
+                process.join()
+                if process.exitcode != 0:
+                    released = tracker.store.release(worker_id)
+                    logger.warning(f"Worker {worker_id} terminó con código {process.exitcode}: {released} URLs devueltas a la cola")
+
+            logger.info(
+                f"Progreso: {tracker.get_stats()} | workers activos: {len(workers)}, "
+                f"leases caducados: {tracker.store.expired_count()}"
+            )
+    except KeyboardInterrupt:
+        for process, worker_id in workers.values():
+            process.terminate()
+            process.join()
+            tracker.store.release(worker_id)
+        raise
+
+    coordinator.stats.end_time = datetime.now()
+    coordinator.save_aliases()
+    if coordinator.graph_file:
+        coordinator.export_link_graph()
+    coordinator.print_final_report()
+    tracker.close()
+
 def main():
     """Función principal con interfaz mejorada"""
     parser = argparse.ArgumentParser(
@@ -1003,7 +1569,18 @@ Ejemplos de uso:
   python advanced_docs_scraper.py                                    # Modo interactivo
   python advanced_docs_scraper.py https://docs.example.com           # Scraping básico
   python advanced_docs_scraper.py https://docs.example.com -p        # Con Playwright
+  python advanced_docs_scraper.py https://docs.example.com -e aiohttp -c 20  # Descargas async en paralelo
+  python advanced_docs_scraper.py https://docs.example.com -e aiohttp -w 4   # Conversión en 4 procesos
+  python advanced_docs_scraper.py https://docs.example.com --parser lxml    # Extracción rápida con lxml
+  python advanced_docs_scraper.py https://docs.example.com --metrics-file metrics.prom  # Tiempos por etapa
+  python advanced_docs_scraper.py https://docs.example.com --processes 4     # 4 workers sobre una cola compartida
+  python advanced_docs_scraper.py https://docs.example.com --output-format jsonl  # Un único corpus.jsonl
+  python advanced_docs_scraper.py https://docs.example.com --queue /nfs/cola.sqlite  # Unirse desde otro host
+  python advanced_docs_scraper.py https://docs.example.com -m 200 --priority pagerank --export-graph grafo.graphml
+  python advanced_docs_scraper.py --benchmark ./fixtures             # Comparar bs4 vs lxml
   python advanced_docs_scraper.py --analyze ./docs_output            # Analizar contenido
+  python advanced_docs_scraper.py --build-index ./docs_output        # Indexar para búsqueda
+  python advanced_docs_scraper.py --search ./docs_output "rate limit"  # Buscar en lo scrapeado
   python advanced_docs_scraper.py --fix-format ./docs_output         # Corregir formato
   python advanced_docs_scraper.py --convert-mdx ./docs_output        # Convertir a MDX
         """
@@ -1016,7 +1593,9 @@ Ejemplos de uso:
     parser.add_argument('-m', '--max-pages', type=int,
                        help='Número máximo de páginas')
     parser.add_argument('-d', '--delay', type=float, default=1.0,
-                       help='Delay entre peticiones (default: 1.0)')
+                       help='Delay entre peticiones: el ritmo inicial por host es concurrencia/delay (default: 1.0)')
+    parser.add_argument('--max-rate', type=float,
+                       help='Peticiones por segundo máximas por host al acelerar (default: 4x el ritmo inicial)')
     parser.add_argument('-c', '--concurrency', type=int, default=5,
                        help='Páginas en paralelo (default: 5)')
 
@@ -1029,14 +1608,73 @@ Ejemplos de uso:
                        help='Modo interactivo')
     parser.add_argument('-s', '--selectors',
                        help='Selectores CSS personalizados (formato: name=selector,name2=selector2)')
+    parser.add_argument('-e', '--engine', choices=FETCH_ENGINES, default='requests',
+                       help='Motor HTTP sin Playwright: requests (hilos), aiohttp o httpx (async) (default: requests)')
+    parser.add_argument('--connections-per-host', type=int,
+                       help='Conexiones simultáneas por host en el pool HTTP (default: igual a --concurrency)')
+    parser.add_argument('-w', '--workers', type=int, default=0,
+                       help='Procesos para convertir HTML a Markdown (default: 0 = en el proceso principal; con --fix-format, todos los núcleos)')
+    parser.add_argument('--priority', choices=list(PRIORITY_POLICIES), default='depth',
+                       help='Orden de rastreo: depth (BFS), locality (por ruta), freshness (más recientes), '
+                            'indegree (más enlazadas) o pagerank (más importantes; útil con --max-pages) (default: depth)')
+    parser.add_argument('--export-graph', metavar='PATH',
+                       help='Exportar el grafo de enlaces al terminar: .csv (origen,destino) o .graphml (con grado de entrada y PageRank)')
+    parser.add_argument('--sitemap', nargs='?', const='auto', metavar='URL',
+                       help='Sembrar URLs desde robots.txt/sitemap.xml (o desde la URL de sitemap indicada)')
+    parser.add_argument('--refresh', action='store_true',
+                       help='Re-rastrear páginas ya descargadas con peticiones condicionales (ETag/Last-Modified)')
+    parser.add_argument('--no-http-cache', action='store_true',
+                       help='No guardar validadores HTTP para re-rastreos')
+    parser.add_argument('--recycle-after', type=int, default=100,
+                       help='Páginas renderizadas antes de reciclar cada contexto de Playwright (default: 100)')
+    parser.add_argument('--wait-selector',
+                       help='Selector CSS que indica que el contenido JS está listo (default: esperar red inactiva)')
+    parser.add_argument('--max-page-size', type=float, default=DEFAULT_MAX_BODY_BYTES / 1024 / 1024, metavar='MB',
+                       help='Tamaño máximo de una página; las mayores y las respuestas no HTML se descartan sin descargarlas enteras (default: 10)')
+    parser.add_argument('--no-dedup', action='store_true',
+                       help='No detectar páginas duplicadas (se guarda cada URL aunque repita contenido)')
+    parser.add_argument('--near-dup-distance', type=int, default=3,
+                       help='Distancia simhash máxima para casi duplicados (default: 3, 0 = solo idénticos)')
+    parser.add_argument('--url-store', choices=URL_STORES, default='memory',
+                       help='Estado de URLs: memory (arrays compactos + snapshot) o sqlite (en disco, para millones de URLs) (default: memory)')
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='files',
+                       help='Salida: files (un .md por página), jsonl (corpus con el frontmatter como claves), tar (.tar.zst) o zip (default: files)')
+    parser.add_argument('--search-index', action='store_true',
+                       help=f'Indexar cada página guardada para búsqueda de texto completo ({SEARCH_INDEX_FILE} en la salida)')
+    parser.add_argument('--no-fsync', action='store_true',
+                       help='No forzar cada lote de salida a disco (más rápido; un corte de luz puede perder las últimas páginas)')
+    parser.add_argument('--queue', metavar='PATH',
+                       help='Cola SQLite compartida: cada proceso (o host) con la misma ruta actúa como worker del rastreo')
+    parser.add_argument('--processes', type=int, default=0,
+                       help='Coordinar N workers locales sobre la cola compartida (default: --queue o <output>/crawl_queue.sqlite)')
+    parser.add_argument('--worker-id',
+                       help='Identificador de este worker en la cola compartida (default: host-pid)')
+    parser.add_argument('--lease-seconds', type=float, default=300,
+                       help='Segundos que un worker reserva sus URLs antes de que vuelvan a la cola (default: 300)')
+    parser.add_argument('--metrics-file', metavar='PATH',
+                       help='Exportar métricas por etapa al terminar: JSON si termina en .json, si no texto de Prometheus')
+    parser.add_argument('--metrics-interval', type=float, default=0,
+                       help='Reescribir --metrics-file cada N segundos durante el rastreo (default: 0 = solo al final)')
+    parser.add_argument('--parser', choices=PARSER_ENGINES, default='bs4',
+                       help='Motor de extracción HTML: bs4 o lxml (una sola pasada, más rápido) (default: bs4)')
 
     # Utilidades
     parser.add_argument('--analyze', metavar='DIR',
                        help='Analizar contenido existente')
+    parser.add_argument('--build-index', metavar='DIR',
+                       help='Crear o actualizar el índice de búsqueda de un directorio scrapeado (solo archivos cambiados)')
+    parser.add_argument('--search', nargs=2, metavar=('DIR', 'CONSULTA'),
+                       help='Buscar en el índice de un directorio (sintaxis FTS5: "frase exacta", OR, prefijo*)')
+    parser.add_argument('--limit', type=int, default=10,
+                       help='Número máximo de resultados de --search (default: 10)')
     parser.add_argument('--fix-format', metavar='DIR',
                        help='Corregir formato de archivos existentes')
     parser.add_argument('--convert-mdx', metavar='DIR',
                        help='Convertir archivos .md a .mdx')
+    parser.add_argument('--benchmark', metavar='DIR',
+                       help='Comparar páginas/seg de los motores de extracción sobre archivos .html guardados')
+    parser.add_argument('--benchmark-clean', metavar='DIR',
+                       help='Comparar la limpieza de Markdown de una pasada con la anterior sobre archivos .md')
 
     args = parser.parse_args()
 
@@ -1046,8 +1684,24 @@ Ejemplos de uso:
             analyze_scraped_content(args.analyze)
             return 0
 
+        if args.build_index:
+            build_search_index(args.build_index)
+            return 0
+
+        if args.search:
+            search_scraped_content(*args.search, limit=args.limit)
+            return 0
+
         if args.fix_format:
-            fix_markdown_formatting(args.fix_format)
+            fix_markdown_formatting(args.fix_format, args.workers or None)
+            return 0
+
+        if args.benchmark:
+            benchmark_extraction(args.benchmark)
+            return 0
+
+        if args.benchmark_clean:
+            benchmark_cleaning(args.benchmark_clean)
             return 0
 
         if args.convert_mdx:
@@ -1084,7 +1738,32 @@ Ejemplos de uso:
                 'concurrency': args.concurrency,
                 'use_playwright': args.playwright,
                 'convert_to_mdx': args.mdx,
-                'custom_selectors': custom_selectors
+                'custom_selectors': custom_selectors,
+                'fetch_engine': args.engine,
+                'connections_per_host': args.connections_per_host,
+                'conversion_workers': args.workers,
+                'browser_recycle_after': args.recycle_after,
+                'wait_selector': args.wait_selector,
+                'priority_policy': args.priority,
+                'use_http_cache': not args.no_http_cache,
+                'refresh': args.refresh,
+                'max_rate': args.max_rate,
+                'use_sitemap': bool(args.sitemap),
+                'sitemap_url': args.sitemap if args.sitemap and args.sitemap != 'auto' else None,
+                'parser_engine': args.parser,
+                'dedup': not args.no_dedup,
+                'near_duplicate_distance': args.near_dup_distance,
+                'url_store': args.url_store,
+                'metrics_file': args.metrics_file,
+                'metrics_interval': args.metrics_interval,
+                'queue_path': args.queue,
+                'worker_id': args.worker_id,
+                'lease_seconds': args.lease_seconds,
+                'output_format': args.output_format,
+                'fsync': not args.no_fsync,
+                'use_search_index': args.search_index,
+                'max_page_bytes': int(args.max_page_size * 1024 * 1024),
+                'graph_file': args.export_graph
             }
 
         # Verificar Playwright si se solicita
@@ -1093,9 +1772,31 @@ Ejemplos de uso:
             print("   Luego ejecuta: playwright install")
             return 1
 
-        # Crear y ejecutar scraper
-        scraper = AdvancedDocsScraper(**config)
-        scraper.run()
+        # Verificar lxml si se solicita
+        if config.get('parser_engine') == 'lxml' and not LXML_AVAILABLE:
+            print("❌ lxml no disponible. Instala con: pip install lxml")
+            return 1
+
+        # Verificar FTS5 si se solicita el índice de búsqueda
+        if config.get('use_search_index') and not FTS5_AVAILABLE:
+            print(f"❌ El SQLite de este Python ({sqlite3.sqlite_version}) no incluye FTS5, necesario para --search-index")
+            return 1
+
+        # Verificar el motor HTTP asíncrono si se solicita
+        fetch_engine = config.get('fetch_engine', 'requests')
+        if fetch_engine == 'aiohttp' and not AIOHTTP_AVAILABLE:
+            print("❌ aiohttp no disponible. Instala con: pip install aiohttp")
+            return 1
+        if fetch_engine == 'httpx' and not HTTPX_AVAILABLE:
+            print("❌ httpx no disponible. Instala con: pip install 'httpx[http2]'")
+            return 1
+
+        # Crear y ejecutar scraper (o coordinar varios workers sobre una cola compartida)
+        if args.processes > 0:
+            run_distributed_crawl(config, args.processes)
+        else:
+            scraper = AdvancedDocsScraper(**config)
+            scraper.run()
 
         print("\n🎉 ¡Scraping completado exitosamente!")
         print(f"📁 Archivos guardados en: {os.path.abspath(config['output_dir'])}")
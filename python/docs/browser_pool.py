@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Pool de páginas de Playwright sobre un único navegador compartido por el rastreo
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from http_fetch import DEFAULT_HEADERS
+
+# Importación opcional de Playwright
+try:
+    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+    print("⚠️  Playwright no disponible. Instala con: pip install playwright")
+
+logger = logging.getLogger('advanced_scraper.browser_pool')
+
+class BrowserPool:
+    """Pool de páginas Playwright reutilizables sobre un único navegador.
+
+    El navegador se lanza una sola vez; cada slot es un contexto con su página
+    que se recicla tras `recycle_after` usos para contener el consumo de memoria.
+    """
+
+    # Recursos que no aportan al HTML renderizado
+    BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font'}
+
+    def __init__(
+        self,
+        size: int = 5,
+        recycle_after: int = 100,
+        wait_selector: Optional[str] = None,
+        navigation_timeout: int = 30000,
+        ready_timeout: int = 5000,
+        block_resources: bool = True
+    ):
+        self.size = max(1, size)
+        self.recycle_after = max(1, recycle_after)
+        self.wait_selector = wait_selector
+        self.navigation_timeout = navigation_timeout
+        self.ready_timeout = ready_timeout
+        self.block_resources = block_resources
+
+        self._playwright = None
+        self._browser = None
+        self._slots: Optional[asyncio.Queue] = None
+        self._all_slots: List[Dict] = []
+
+    async def start(self):
+        """Lanza el navegador y prepara los slots del pool"""
+        if self._browser is not None:
+            return
+
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self._slots = asyncio.Queue()
+
+        for _ in range(self.size):
+            self._slots.put_nowait(await self._new_slot())
+
+        logger.info(f"Navegador iniciado con {self.size} páginas (reciclado cada {self.recycle_after})")
+
+    async def _new_slot(self) -> Dict:
+        """Crea un contexto aislado con su página"""
+        context = await self._browser.new_context(user_agent=DEFAULT_HEADERS['User-Agent'])
+        if self.block_resources:
+            await context.route('**/*', self._route_request)
+        page = await context.new_page()
+
+        slot = {'context': context, 'page': page, 'uses': 0}
+        self._all_slots.append(slot)
+        return slot
+
+    async def _close_slot(self, slot: Dict):
+        """Cierra el contexto de un slot ignorando errores"""
+        if slot in self._all_slots:
+            self._all_slots.remove(slot)
+        try:
+            await slot['context'].close()
+        except Exception as e:
+            logger.debug(f"Error cerrando contexto de Playwright: {e}")
+
+    async def _recycle(self, slot: Dict) -> Dict:
+        """Sustituye un slot gastado o roto por uno nuevo"""
+        await self._close_slot(slot)
+        try:
+            return await self._new_slot()
+        except Exception as e:
+            logger.error(f"No se pudo crear un nuevo contexto de Playwright: {e}")
+            raise
+
+    async def _route_request(self, route):
+        """Aborta la descarga de recursos pesados que no cambian el HTML"""
+        if route.request.resource_type in self.BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _wait_until_ready(self, page):
+        """Espera al selector de contenido o a que la red quede inactiva"""
+        try:
+            if self.wait_selector:
+                await page.wait_for_selector(self.wait_selector, timeout=self.ready_timeout)
+            else:
+                await page.wait_for_load_state('networkidle', timeout=self.ready_timeout)
+        except PlaywrightTimeoutError:
+            # La página sigue siendo utilizable: se toma el HTML disponible
+            logger.debug(f"Tiempo de espera agotado esperando contenido en {page.url}")
+
+    async def render(self, url: str) -> tuple[str, str]:
+        """Navega a una URL con una página del pool y devuelve (HTML renderizado, URL final)"""
+        if self._browser is None:
+            await self.start()
+
+        slot = await self._slots.get()
+        broken = False
+        try:
+            page = slot['page']
+            await page.goto(url, wait_until='domcontentloaded', timeout=self.navigation_timeout)
+            await self._wait_until_ready(page)
+            return await page.content(), page.url
+
+        except Exception:
+            broken = True
+            raise
+
+        finally:
+            slot['uses'] += 1
+            if broken or slot['uses'] >= self.recycle_after:
+                try:
+                    slot = await self._recycle(slot)
+                except Exception:
+                    # Sin un contexto nuevo el slot se pierde; el pool sigue con los demás
+                    slot = None
+            if slot is not None:
+                self._slots.put_nowait(slot)
+
+    async def close(self):
+        """Cierra todos los contextos, el navegador y Playwright"""
+        for slot in list(self._all_slots):
+            await self._close_slot(slot)
+
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+        self._slots = None
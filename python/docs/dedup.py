@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Detección de contenido duplicado o casi duplicado (hash exacto + simhash)
+"""
+
+import re
+import html
+import hashlib
+from typing import Dict, List, Optional
+
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Por debajo de estos tokens el simhash no es fiable y solo se usa el hash exacto
+SIMHASH_MIN_TOKENS = 50
+
+# Tablas de bytes.translate: 1 si el bit indicado del byte está activo
+_BIT_TABLES = [bytes(1 if byte & (1 << bit) else 0 for byte in range(256)) for bit in range(8)]
+
+def simhash(features: List[str]) -> int:
+    """Simhash de 64 bits de una lista de rasgos (shingles)"""
+    blake2b = hashlib.blake2b
+    data = b''.join([blake2b(feature.encode('utf-8'), digest_size=8).digest() for feature in features])
+    threshold = len(features) / 2
+
+    # Bit a 1 si la mayoría de rasgos lo tiene a 1. Se cuenta por columnas
+    # sobre los bytes (slice + translate + count) en vez de bit a bit en Python
+    value = 0
+    for byte_index in range(8):
+        lane = data[byte_index::8]
+        for bit in range(7, -1, -1):
+            value = (value << 1) | (lane.translate(_BIT_TABLES[bit]).count(1) > threshold)
+    return value
+
+def content_fingerprint(content_html: str) -> tuple[str, Optional[int]]:
+    """Huella del contenido principal: hash exacto del texto normalizado y simhash"""
+    tokens = html.unescape(_TAG_RE.sub(' ', content_html)).split()
+    content_hash = hashlib.blake2b(' '.join(tokens).encode('utf-8'), digest_size=16).hexdigest()
+
+    if len(tokens) < SIMHASH_MIN_TOKENS:
+        return content_hash, None
+
+    words = [token.lower() for token in tokens]
+    shingles = [' '.join(words[i:i + 3]) for i in range(len(words) - 2)]
+    return content_hash, simhash(shingles)
+
+class ContentIndex:
+    """Índice de huellas de contenido para detectar páginas duplicadas.
+
+    Los duplicados exactos se buscan por hash. Los casi duplicados se buscan
+    por simhash partido en `max_distance + 1` bandas: dos huellas a distancia
+    de Hamming <= max_distance coinciden al menos en una banda, así que solo
+    se comparan los candidatos de esas bandas.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max(0, max_distance)
+        self.band_count = self.max_distance + 1
+        self.band_width = 64 // self.band_count
+        self.by_hash: Dict[str, str] = {}
+        self.bands: Dict[tuple, List[str]] = {}
+        self.fingerprints: Dict[str, tuple] = {}
+
+    def _band_keys(self, value: int) -> List[tuple]:
+        keys = []
+        for band in range(self.band_count):
+            shift = band * self.band_width
+            # La última banda se queda con los bits sobrantes
+            width = 64 - shift if band == self.band_count - 1 else self.band_width
+            keys.append((band, (value >> shift) & ((1 << width) - 1)))
+        return keys
+
+    def find_duplicate(self, url: str, content_hash: str, simhash_value: Optional[int]) -> Optional[str]:
+        """Devuelve la URL canónica con el mismo contenido (o casi), si existe"""
+        canonical = self.by_hash.get(content_hash)
+        if canonical is not None and canonical != url:
+            return canonical
+
+        if simhash_value is None or not self.max_distance:
+            return None
+
+        for key in self._band_keys(simhash_value):
+            for candidate in self.bands.get(key, ()):
+                if candidate == url:
+                    continue
+                if bin(self.fingerprints[candidate][1] ^ simhash_value).count('1') <= self.max_distance:
+                    return candidate
+        return None
+
+    def add(self, url: str, content_hash: str, simhash_value: Optional[int]):
+        """Registra la huella de una página canónica (reemplaza la anterior)"""
+        self.remove(url)
+        self.fingerprints[url] = (content_hash, simhash_value)
+        self.by_hash.setdefault(content_hash, url)
+        if simhash_value is not None:
+            for key in self._band_keys(simhash_value):
+                self.bands.setdefault(key, []).append(url)
+
+    def remove(self, url: str):
+        fingerprint = self.fingerprints.pop(url, None)
+        if fingerprint is None:
+            return
+
+        content_hash, simhash_value = fingerprint
+        if self.by_hash.get(content_hash) == url:
+            del self.by_hash[content_hash]
+        if simhash_value is not None:
+            for key in self._band_keys(simhash_value):
+                bucket = self.bands.get(key)
+                if bucket and url in bucket:
+                    bucket.remove(url)
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
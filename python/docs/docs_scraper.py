@@ -8,11 +8,16 @@ from urllib.parse import urlparse, urljoin
 import time
 import argparse
 import logging
+import threading
 from markdownify import markdownify as md
 import concurrent.futures
+from collections import deque
 import tqdm
 import html2text
 
+from rate_limit import THROTTLE_STATUSES, TokenBucket, parse_retry_after
+from sitemap_utils import iter_site_urls
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,12 +29,112 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Cada cuántos segundos se informa del progreso durante el rastreo
+PROGRESS_INTERVAL = 5.0
+
+
+class HostRateLimiter(TokenBucket):
+    """
+    Token bucket adaptativo compartido por todos los hilos de trabajo.
+
+    Empieza a `concurrency / delay` peticiones por segundo; el ajuste del ritmo
+    vive en `rate_limit.TokenBucket` y aquí solo se añade el lock y la espera.
+    """
+
+    def __init__(self, delay=1.0, concurrency=5, max_rate=None, min_rate=0.05):
+        super().__init__(concurrency / delay if delay > 0 else None, concurrency, max_rate, min_rate)
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea el hilo hasta que haya un token disponible"""
+        while True:
+            with self.lock:
+                wait = self.reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def on_success(self, latency):
+        with self.lock:
+            super().on_success(latency)
+
+    def on_throttled(self, retry_after=None):
+        with self.lock:
+            return super().on_throttled(retry_after)
+
+
+class UrlFrontier:
+    """
+    Cola de URLs compartida por el planificador y los hilos de trabajo.
+
+    Cada URL entra una sola vez: `add` la registra y encola de forma atómica y
+    `claim` entrega cada URL pendiente a un único hilo. Las consultas de
+    pertenencia leen el conjunto de URLs vistas sin bloquear (lecturas seguras
+    en CPython) y solo las inserciones toman el lock.
+    """
+
+    def __init__(self, urls=()):
+        self.seen = set()
+        self.pending = deque()
+        self.in_progress = set()
+        self.done_count = 0
+        self.lock = threading.Lock()
+        self.add_many(urls)
+
+    def __contains__(self, url):
+        return url in self.seen
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, url):
+        """Encola la URL si nunca se ha visto; devuelve True si se añadió"""
+        if url in self.seen:
+            return False
+        with self.lock:
+            if url in self.seen:
+                return False
+            self.seen.add(url)
+            self.pending.append(url)
+            return True
+
+    def add_many(self, urls):
+        """Encola las URLs nuevas y devuelve las que se añadieron"""
+        fresh = [url for url in urls if url not in self.seen]
+        if not fresh:
+            return []
+        added = []
+        with self.lock:
+            for url in fresh:
+                if url not in self.seen:
+                    self.seen.add(url)
+                    self.pending.append(url)
+                    added.append(url)
+        return added
+
+    def claim(self):
+        """Reserva la siguiente URL pendiente (None si la cola está vacía)"""
+        with self.lock:
+            if not self.pending:
+                return None
+            url = self.pending.popleft()
+            self.in_progress.add(url)
+            return url
+
+    def mark_done(self, url):
+        """Marca como terminada una URL reservada"""
+        with self.lock:
+            self.in_progress.discard(url)
+            self.done_count += 1
+
+
 class DocsScraperToMarkdown:
     """
     Clase para hacer scraping de páginas de documentación y convertirlas a markdown
     """
     
-    def __init__(self, base_url, output_dir="./docs_output", max_pages=None, delay=1.0, concurrency=5):
+    def __init__(self, base_url, output_dir="./docs_output", max_pages=None, delay=1.0, concurrency=5, max_retries=3,
+                 use_sitemap=False):
         """
         Inicializa el scraper con la URL base y configuración.
         
@@ -38,7 +143,10 @@ class DocsScraperToMarkdown:
             output_dir: Directorio donde se guardarán los archivos markdown
             max_pages: Número máximo de páginas a procesar (None para ilimitado)
             delay: Tiempo de espera entre solicitudes para no sobrecargar el servidor
+                   (el ritmo inicial es concurrency/delay y se adapta al servidor)
             concurrency: Número de páginas a procesar en paralelo
+            max_retries: Reintentos ante respuestas 429/503
+            use_sitemap: Sembrar la cola con las URLs de robots.txt/sitemap.xml
         """
         self.base_url = base_url
         self.domain = urlparse(base_url).netloc
@@ -46,14 +154,13 @@ class DocsScraperToMarkdown:
         self.max_pages = max_pages
         self.delay = delay
         self.concurrency = concurrency
-        self.visited_urls = set()
-        self.to_visit = set([base_url])
-        self.html_converter = html2text.HTML2Text()
-        self.html_converter.ignore_links = False
-        self.html_converter.ignore_images = False
-        self.html_converter.body_width = 0  # No wrapping
-        self.html_converter.protect_links = True
-        self.html_converter.unicode_snob = True
+        self.max_retries = max_retries
+        self.use_sitemap = use_sitemap
+        self.rate_limiter = HostRateLimiter(delay, concurrency)
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self.frontier = UrlFrontier([base_url])
         
         # Asegurarse de que el directorio de salida exista
         os.makedirs(output_dir, exist_ok=True)
@@ -75,10 +182,6 @@ class DocsScraperToMarkdown:
             if parsed_url.netloc != self.domain:
                 return False
                 
-            # Evitar anchors dentro de la misma página
-            if '#' in url and url.split('#')[0] in self.visited_urls:
-                return False
-                
             return True
         except Exception as e:
             logger.error(f"Error validando URL {url}: {e}")
@@ -94,7 +197,7 @@ class DocsScraperToMarkdown:
             # Eliminar el fragmento de la URL (parte después del #)
             absolute_url = absolute_url.split('#')[0]
             
-            if self.is_valid_url(absolute_url) and absolute_url not in self.visited_urls:
+            if absolute_url not in self.frontier and self.is_valid_url(absolute_url):
                 links.add(absolute_url)
         
         return links
@@ -113,6 +216,20 @@ class DocsScraperToMarkdown:
         
         return soup
     
+    @property
+    def html_converter(self):
+        """Conversor HTML2Text del hilo actual (no es seguro compartirlo entre hilos)"""
+        converter = getattr(self._local, 'html_converter', None)
+        if converter is None:
+            converter = html2text.HTML2Text()
+            converter.ignore_links = False
+            converter.ignore_images = False
+            converter.body_width = 0  # No wrapping
+            converter.protect_links = True
+            converter.unicode_snob = True
+            self._local.html_converter = converter
+        return converter
+
     def html_to_markdown(self, html_content):
         """Convierte el contenido HTML a markdown"""
         return self.html_converter.handle(str(html_content))
@@ -145,16 +262,57 @@ class DocsScraperToMarkdown:
         
         logger.info(f"Guardado: {file_path}")
     
+    def get_session(self):
+        """Devuelve la sesión HTTP del hilo actual (conexiones keep-alive reutilizables)"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            # Cada hilo descarga una página a la vez: basta un pool pequeño por host
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=1)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def close_sessions(self):
+        """Cierra las sesiones abiertas por los hilos de trabajo"""
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+
+    def fetch(self, url):
+        """Descarga una URL respetando el limitador y reintentando ante 429/503"""
+        session = self.get_session()
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            started = time.monotonic()
+            response = session.get(url, timeout=10)
+
+            if response.status_code in THROTTLE_STATUSES:
+                # También en el último intento: el servidor pidió frenar
+                self.rate_limiter.on_throttled(parse_retry_after(response.headers.get('Retry-After')))
+                if attempt < self.max_retries:
+                    continue
+                return response
+
+            # Solo las respuestas sin error cuentan como latencia sana
+            if response.status_code < 400:
+                self.rate_limiter.on_success(time.monotonic() - started)
+            return response
+
     def process_page(self, url):
-        """Procesa una página: descarga, extrae contenido y guarda en markdown"""
-        if url in self.visited_urls:
-            return set()
-        
-        self.visited_urls.add(url)
-        
+        """
+        Procesa una página: descarga, extrae contenido y guarda en markdown.
+
+        La URL debe haberse reservado con `frontier.claim()`; los enlaces nuevos se
+        encolan directamente en la frontera y se devuelven los que se añadieron.
+        """
         try:
             logger.info(f"Procesando: {url}")
-            response = requests.get(url, timeout=10)
+            response = self.fetch(url)
             if response.status_code != 200:
                 logger.warning(f"No se pudo acceder a {url}, código: {response.status_code}")
                 return set()
@@ -178,60 +336,79 @@ class DocsScraperToMarkdown:
             # Guardar el contenido
             self.save_markdown(url, markdown_content)
             
-            # Encontrar nuevos enlaces
-            new_links = self.extract_links(soup, url)
-            
-            time.sleep(self.delay)  # Ser amable con el servidor
-            return new_links
+            # Encontrar nuevos enlaces y encolarlos
+            return set(self.frontier.add_many(self.extract_links(soup, url)))
             
         except Exception as e:
             logger.error(f"Error procesando {url}: {e}")
             return set()
+        finally:
+            self.frontier.mark_done(url)
     
+    def seed_from_sitemaps(self):
+        """Añade a la cola las URLs válidas encontradas en los sitemaps del sitio"""
+        added = 0
+        for url, _lastmod in iter_site_urls(self.base_url):
+            if self.is_valid_url(url) and self.frontier.add(url):
+                added += 1
+        logger.info(f"Sitemap: {added} URLs añadidas a la cola")
+
     def run(self):
-        """Ejecuta el scraping completo"""
+        """
+        Ejecuta el scraping completo.
+
+        Mantiene siempre `concurrency` páginas en curso: en cuanto termina una se
+        encola la siguiente, sin esperar a que acabe el resto de descargas.
+        """
         logger.info(f"Iniciando scraping desde {self.base_url}")
         logger.info(f"Los archivos se guardarán en {os.path.abspath(self.output_dir)}")
         
         processed_count = 0
+        submitted_count = 0
         
-        # Usar ThreadPoolExecutor para procesar múltiples páginas en paralelo
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
-            while self.to_visit and (self.max_pages is None or processed_count < self.max_pages):
-                # Tomar un lote de URLs para procesar en paralelo
-                batch_size = min(self.concurrency, len(self.to_visit))
-                if self.max_pages:
-                    batch_size = min(batch_size, self.max_pages - processed_count)
-                
-                current_batch = []
-                for _ in range(batch_size):
-                    if not self.to_visit:
+        if self.use_sitemap:
+            self.seed_from_sitemaps()
+        
+        started = time.monotonic()
+        last_report = started
+        in_flight = {}
+        
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                while True:
+                    # Rellenar hasta tener `concurrency` páginas en curso
+                    while len(in_flight) < self.concurrency and (self.max_pages is None or submitted_count < self.max_pages):
+                        url = self.frontier.claim()
+                        if url is None:
+                            break
+                        in_flight[executor.submit(self.process_page, url)] = url
+                        submitted_count += 1
+                    
+                    if not in_flight:
                         break
-                    url = self.to_visit.pop()
-                    current_batch.append(url)
-                
-                if not current_batch:
-                    break
-                
-                # Procesar el lote en paralelo
-                future_to_url = {executor.submit(self.process_page, url): url for url in current_batch}
-                
-                for future in concurrent.futures.as_completed(future_to_url):
-                    url = future_to_url[future]
-                    try:
-                        new_links = future.result()
-                        # Añadir enlaces nuevos a la lista por visitar
-                        for link in new_links:
-                            if link not in self.visited_urls and link not in self.to_visit:
-                                self.to_visit.add(link)
-                    except Exception as e:
-                        logger.error(f"Error en el procesamiento futuro de {url}: {e}")
-                
-                processed_count += len(current_batch)
-                logger.info(f"Progreso: {processed_count} páginas procesadas, {len(self.to_visit)} en cola")
+                    
+                    done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        url = in_flight.pop(future)
+                        processed_count += 1
+                        try:
+                            future.result()
+                        except Exception as e:
+                            logger.error(f"Error en el procesamiento futuro de {url}: {e}")
+                    
+                    now = time.monotonic()
+                    if now - last_report >= PROGRESS_INTERVAL:
+                        last_report = now
+                        rate = processed_count / (now - started)
+                        logger.info(f"Progreso: {processed_count} páginas procesadas ({rate:.1f} págs/s), "
+                                    f"{len(in_flight)} en curso, {len(self.frontier)} en cola")
+        finally:
+            self.close_sessions()
         
-        logger.info(f"Scraping completado. Páginas procesadas: {processed_count}")
-
+        elapsed = time.monotonic() - started
+        rate = processed_count / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Scraping completado. Páginas procesadas: {processed_count} "
+                    f"en {elapsed:.1f}s ({rate:.1f} págs/s)")
 
 def get_user_input():
     """Obtiene la configuración del usuario de forma interactiva"""
@@ -335,6 +512,7 @@ def main():
         parser.add_argument('-d', '--delay', type=float, help='Delay entre peticiones en segundos (default: 1.0)')
         parser.add_argument('-c', '--concurrency', type=int, help='Número de páginas a procesar en paralelo (default: 5)')
         parser.add_argument('-i', '--interactive', action='store_true', help='Modo interactivo')
+        parser.add_argument('--sitemap', action='store_true', help='Sembrar la cola desde robots.txt/sitemap.xml')
         
         args = parser.parse_args()
         
@@ -360,7 +538,8 @@ def main():
             output_dir=output_dir,
             max_pages=max_pages,
             delay=delay,
-            concurrency=concurrency
+            concurrency=concurrency,
+            use_sitemap=args.sitemap
         )
         scraper.run()
         
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Extracción de contenido, enlaces y metadata de una página (BeautifulSoup o lxml)
+y funciones del pool de procesos de conversión
+"""
+
+import re
+import time
+import logging
+from typing import Set, Dict, List, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from dedup import content_fingerprint
+from frontier import is_valid_doc_url, normalize_url
+from markdown_processing import MarkdownProcessor
+
+try:
+    import lxml.html
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger('advanced_scraper.extraction')
+
+# Selectores genéricos comunes para el contenido principal de documentación
+COMMON_CONTENT_SELECTORS = [
+    'main',
+    'article',
+    '.content',
+    '.documentation',
+    '.docs',
+    '.doc-content',
+    '.main-content',
+    '.primary-content',
+    '#content',
+    '#main',
+    '.markdown-body',
+    '[role="main"]',
+    '.prose'
+]
+
+# Contenedores cuyos enlaces se consideran navegación de la documentación
+LINK_CONTEXT_SELECTORS = [
+    'nav',             # Enlaces de navegación
+    '.toc',            # Tabla de contenidos
+    '.sidebar',        # Sidebar
+    '.menu',           # Menú
+    'main',            # Enlaces en contenido principal
+    '.docs',           # Enlaces en docs
+    '.documentation',  # Enlaces en documentación
+]
+
+# Elementos que se eliminan del body cuando no hay contenedor principal
+UNWANTED_SELECTORS = [
+    'nav', 'header', 'footer', 'aside', 'script', 'style', 'noscript',
+    '.navigation', '.nav', '.sidebar', '.menu', '.header', '.footer',
+    '.ad', '.ads', '.advertisement', '.cookie-notice', '.banner',
+    '.social', '.share', '.related', '.comments'
+]
+
+# Motores de parseo/extracción de HTML
+PARSER_ENGINES = ('bs4', 'lxml')
+
+_SELECTOR_TOKEN_RE = re.compile(r'\*|[.#][\w-]+|\[[^\]]+\]|[\w-]+')
+_SELECTOR_ATTR_RE = re.compile(r'\[\s*([\w-]+)\s*(?:=\s*(["\']?)([^"\'\]]*)\2)?\s*\]')
+
+def compile_css_selector(selector: str) -> Optional[tuple]:
+    """Compila un selector CSS simple (tag, .clase, #id, [attr=valor] y
+    descendientes) a una cadena de predicados; None si no está soportado"""
+    chain = []
+    for part in selector.split():
+        tag, element_id, classes, attrs = None, None, [], []
+        position = 0
+        for match in _SELECTOR_TOKEN_RE.finditer(part):
+            if match.start() != position:
+                return None
+            token = match.group(0)
+            position = match.end()
+
+            if token.startswith('.'):
+                classes.append(token[1:])
+            elif token.startswith('#'):
+                element_id = token[1:]
+            elif token.startswith('['):
+                attr = _SELECTOR_ATTR_RE.fullmatch(token)
+                if not attr:
+                    return None
+                attrs.append((attr.group(1), attr.group(3) if '=' in token else None))
+            elif token == '*':
+                continue
+            elif match.start() == 0:
+                tag = token.lower()
+            else:
+                return None
+
+        if position != len(part):
+            return None
+        chain.append((tag, frozenset(classes), element_id, tuple(attrs)))
+
+    return tuple(chain) if chain else None
+
+def _matches_compound(element, compound: tuple) -> bool:
+    """Comprueba un selector compuesto (sin combinadores) contra un elemento lxml"""
+    tag, classes, element_id, attrs = compound
+    if tag and element.tag != tag:
+        return False
+    if classes and not classes.issubset((element.get('class') or '').split()):
+        return False
+    if element_id and element.get('id') != element_id:
+        return False
+    for name, value in attrs:
+        current = element.get(name)
+        if current is None or (value is not None and current != value):
+            return False
+    return True
+
+def _matches_chain(element, ancestors: List, chain: tuple) -> bool:
+    """Comprueba un selector con descendientes usando la pila de ancestros"""
+    if not _matches_compound(element, chain[-1]):
+        return False
+
+    index = len(chain) - 2
+    for ancestor in reversed(ancestors):
+        if index < 0:
+            break
+        if _matches_compound(ancestor, chain[index]):
+            index -= 1
+    return index < 0
+
+class FastPageExtractor:
+    """Extracción con lxml en una sola pasada por el árbol.
+
+    Los selectores se compilan una vez al construir el extractor; durante el
+    recorrido se obtienen a la vez el contenedor principal, los enlaces
+    (de navegación y todos), el título y las etiquetas meta.
+    """
+
+    def __init__(self, custom_selectors: Optional[Dict[str, str]] = None):
+        if not LXML_AVAILABLE:
+            raise RuntimeError("lxml no disponible. Instala con: pip install lxml")
+
+        selectors = list((custom_selectors or {}).values()) + COMMON_CONTENT_SELECTORS
+        self.content_chains = [compile_css_selector(selector) for selector in selectors]
+        unsupported = [s for s, chain in zip(selectors, self.content_chains) if chain is None]
+        if unsupported:
+            raise ValueError(f"Selectores no soportados por el motor lxml: {unsupported}")
+
+        self.link_contexts = [compile_css_selector(s)[0] for s in LINK_CONTEXT_SELECTORS]
+        self.unwanted = [compile_css_selector(s)[0] for s in UNWANTED_SELECTORS]
+
+    def extract(self, html_content: str) -> Dict:
+        """Recorre el documento una vez y devuelve contenido, enlaces y metadatos"""
+        try:
+            root = lxml.html.document_fromstring(html_content)
+        except ValueError:
+            # Documentos con declaración de encoding: lxml exige bytes
+            root = lxml.html.document_fromstring(html_content.encode('utf-8'))
+
+        best_index = len(self.content_chains)
+        content_element = None
+        body = None
+        in_body = False
+        unwanted_elements = []
+        context_depth = 0
+        context_stack: List[bool] = []
+        ancestors: List = []
+        context_hrefs: List[str] = []
+        all_hrefs: List[str] = []
+        title = None
+        metas: List[tuple] = []
+
+        for event, element in etree.iterwalk(root, events=('start', 'end')):
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue
+
+            if event == 'end':
+                ancestors.pop()
+                if context_stack.pop():
+                    context_depth -= 1
+                if element is body:
+                    in_body = False
+                continue
+
+            # Contenedor principal: el primero en orden de documento del
+            # selector más prioritario
+            for index in range(best_index):
+                if _matches_chain(element, ancestors, self.content_chains[index]):
+                    best_index, content_element = index, element
+                    break
+
+            if tag == 'a':
+                href = element.get('href')
+                if href:
+                    all_hrefs.append(href)
+                    if context_depth:
+                        context_hrefs.append(href)
+            elif tag == 'title' and title is None:
+                title = element.text_content()
+            elif tag == 'meta':
+                metas.append((element.get('name', ''), element.get('content', '')))
+            elif tag == 'body' and body is None:
+                body, in_body = element, True
+
+            if in_body and element is not body and any(_matches_compound(element, c) for c in self.unwanted):
+                unwanted_elements.append(element)
+
+            is_context = any(_matches_compound(element, c) for c in self.link_contexts)
+            context_stack.append(is_context)
+            if is_context:
+                context_depth += 1
+            ancestors.append(element)
+
+        # Sin contenedor principal: limpiar el body
+        if content_element is None:
+            if body is not None:
+                for element in unwanted_elements:
+                    element.drop_tree()
+                content_element = body
+            else:
+                content_element = root
+
+        return {
+            'content_html': lxml.html.tostring(content_element, encoding='unicode'),
+            'context_hrefs': context_hrefs,
+            'all_hrefs': all_hrefs,
+            'title': title,
+            'metas': metas
+        }
+
+class PageConverter:
+    """Convierte HTML crudo en Markdown final y enlaces descubiertos.
+
+    No depende del estado del rastreo, por lo que cada proceso del pool de
+    conversión puede tener su propia instancia (y su propio HTML2Text).
+    """
+
+    def __init__(self, domain: str, custom_selectors: Optional[Dict[str, str]] = None, parser_engine: str = 'bs4'):
+        if parser_engine not in PARSER_ENGINES:
+            raise ValueError(f"Motor de parseo desconocido: {parser_engine} (opciones: {', '.join(PARSER_ENGINES)})")
+
+        self.domain = domain.lower()
+        self.custom_selectors = custom_selectors or {}
+        self.parser_engine = parser_engine
+        self.markdown_processor = MarkdownProcessor()
+        self.fast_extractor = None
+
+        if parser_engine == 'lxml':
+            try:
+                self.fast_extractor = FastPageExtractor(self.custom_selectors)
+            except ValueError as e:
+                logger.warning(f"{e}; usando BeautifulSoup")
+                self.parser_engine = 'bs4'
+
+    def is_valid_url(self, url: str) -> bool:
+        """Verifica si una URL es válida para scraping"""
+        return is_valid_doc_url(url, self.domain)
+
+    def extract_content_selectors(self, soup: BeautifulSoup) -> BeautifulSoup:
+        """Extrae contenido usando selectores personalizados o genéricos"""
+
+        # Selectores personalizados del usuario
+        if self.custom_selectors:
+            for name, selector in self.custom_selectors.items():
+                elements = soup.select(selector)
+                if elements:
+                    logger.debug(f"Usando selector personalizado '{name}': {selector}")
+                    return elements[0]
+
+        # Selectores genéricos comunes para documentación
+        for selector in COMMON_CONTENT_SELECTORS:
+            elements = soup.select(selector)
+            if elements:
+                logger.debug(f"Usando selector genérico: {selector}")
+                return elements[0]
+
+        # Si no encuentra selectores específicos, limpiar el body
+        body = soup.find('body')
+        if body:
+            # Eliminar elementos no deseados
+            for selector in UNWANTED_SELECTORS:
+                for element in body.select(selector):
+                    element.decompose()
+
+            return body
+
+        return soup
+
+    def _resolve_links(self, hrefs: List[str], current_url: str, links: Set[str]):
+        """Convierte hrefs en URLs absolutas válidas sin anchors"""
+        for href in hrefs:
+            if href:
+                absolute_url = urljoin(current_url, href)
+                # Forma canónica (sin anchors, query ordenada, sin barra final)
+                clean_url = normalize_url(absolute_url)
+                if self.is_valid_url(clean_url):
+                    links.add(clean_url)
+
+    def extract_links_from_soup(self, soup: BeautifulSoup, current_url: str) -> Set[str]:
+        """Extrae enlaces de la página de forma inteligente"""
+        links = set()
+
+        # Primero, intentar selectores específicos
+        for context in LINK_CONTEXT_SELECTORS:
+            self._resolve_links([link.get('href') for link in soup.select(f'{context} a[href]')], current_url, links)
+
+        # Si no encontramos suficientes enlaces, buscar todos los enlaces
+        if len(links) < 5:  # Umbral mínimo
+            self._resolve_links([link.get('href') for link in soup.find_all('a', href=True)], current_url, links)
+
+        return links
+
+    def extract(self, html_content: str, url: str) -> tuple[str, Set[str], Dict]:
+        """Obtiene el HTML del contenido principal, los enlaces y la metadata"""
+        extracted = None
+        if self.fast_extractor is not None:
+            try:
+                extracted = self.fast_extractor.extract(html_content)
+            except (etree.ParserError, etree.XMLSyntaxError) as e:
+                logger.debug(f"lxml no pudo parsear {url}, usando BeautifulSoup: {e}")
+
+        if extracted is not None:
+            links = set()
+            self._resolve_links(extracted['context_hrefs'], url, links)
+            if len(links) < 5:  # Umbral mínimo
+                self._resolve_links(extracted['all_hrefs'], url, links)
+
+            metadata = self.markdown_processor.build_metadata(url, extracted['title'], extracted['metas'])
+            return extracted['content_html'], links, metadata
+
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        # Extraer contenido y enlaces
+        content_element = self.extract_content_selectors(soup)
+        links = self.extract_links_from_soup(soup, url)
+
+        # Extraer metadata
+        metadata = self.markdown_processor.extract_metadata(soup, url)
+
+        return str(content_element), links, metadata
+
+    def convert(self, html_content: str, url: str, timings: Optional[Dict[str, float]] = None) -> tuple[str, Set[str]]:
+        """Convierte el HTML descargado en Markdown final y extrae sus enlaces"""
+        started = time.perf_counter()
+        content_html, links, metadata = self.extract(html_content, url)
+        if timings is not None:
+            timings['parse'] = time.perf_counter() - started
+        return self.render(content_html, metadata, timings), links
+
+    def render(self, content_html: str, metadata: Dict, timings: Optional[Dict[str, float]] = None) -> str:
+        """Convierte el HTML del contenido principal en Markdown con frontmatter"""
+        # Convertir a markdown
+        started = time.perf_counter()
+        markdown_content = self.markdown_processor.html_to_markdown(content_html)
+        converted = time.perf_counter()
+        cleaned_markdown = self.markdown_processor.clean_markdown(markdown_content)
+
+        if timings is not None:
+            timings['html2text'] = converted - started
+            timings['clean'] = time.perf_counter() - converted
+
+        # Añadir frontmatter
+        final_content = self.markdown_processor.add_frontmatter(cleaned_markdown, metadata)
+
+        return final_content
+
+# Conversor propio de cada proceso del pool de conversión
+_worker_converter: Optional[PageConverter] = None
+
+def _init_conversion_worker(domain: str, custom_selectors: Optional[Dict[str, str]], parser_engine: str = 'bs4'):
+    """Inicializa el conversor de un proceso del pool"""
+    global _worker_converter
+    _worker_converter = PageConverter(domain, custom_selectors, parser_engine)
+
+def extract_page(
+    converter: PageConverter,
+    body: bytes,
+    encoding: Optional[str],
+    url: str,
+    fingerprint: bool,
+    timings: Optional[Dict[str, float]] = None
+) -> tuple[str, Set[str], Dict, Optional[tuple]]:
+    """Decodifica una página y extrae contenido, enlaces, metadata y (opcional) su huella"""
+    started = time.perf_counter()
+    html_content = body.decode(encoding or 'utf-8', errors='replace')
+    content_html, links, metadata = converter.extract(html_content, url)
+    parsed = time.perf_counter()
+    fingerprints = content_fingerprint(content_html) if fingerprint else None
+
+    if timings is not None:
+        timings['parse'] = parsed - started
+        if fingerprint:
+            timings['fingerprint'] = time.perf_counter() - parsed
+
+    return content_html, links, metadata, fingerprints
+
+def _extract_in_worker(body: bytes, encoding: Optional[str], url: str, fingerprint: bool):
+    """Extrae una página dentro de un proceso del pool (devuelve también sus tiempos)"""
+    timings = {}
+    return extract_page(_worker_converter, body, encoding, url, fingerprint, timings), timings
+
+def _render_in_worker(content_html: str, metadata: Dict) -> tuple[str, Dict[str, float]]:
+    """Genera el Markdown de una página dentro de un proceso del pool (con sus tiempos)"""
+    timings = {}
+    return _worker_converter.render(content_html, metadata, timings), timings
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Normalización de URLs y frontier con prioridad (profundidad, localidad, frescura,
+grado de entrada o PageRank) para decidir qué URL se rastrea a continuación
+"""
+
+import heapq
+from array import array
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, urlunparse
+from datetime import datetime
+
+def is_valid_doc_url(url: str, domain: str) -> bool:
+    """Verifica si una URL del dominio dado es válida para scraping"""
+    try:
+        parsed = urlparse(url)
+
+        # Verificar dominio
+        if parsed.netloc != domain:
+            return False
+
+        # Extensiones no deseadas
+        unwanted_extensions = {
+            '.pdf', '.zip', '.rar', '.7z', '.tar', '.gz',
+            '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico',
+            '.mp4', '.mov', '.avi', '.mkv', '.mp3', '.wav',
+            '.css', '.js', '.json', '.xml', '.rss',
+            '.exe', '.msi', '.dmg', '.deb', '.rpm'
+        }
+
+        if any(url.lower().endswith(ext) for ext in unwanted_extensions):
+            return False
+
+        # Evitar parámetros problemáticos
+        if '?' in url and any(param in url.lower() for param in ['download', 'export', 'print']):
+            return False
+
+        return True
+
+    except Exception:
+        return False
+
+# Puertos que se omiten al normalizar URLs
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def normalize_url(url: str) -> str:
+    """Forma canónica de una URL: esquema y host en minúsculas, sin puerto por
+    defecto, sin fragmento, sin barra final (salvo en la raíz) y query ordenada"""
+    try:
+        parsed = urlparse(url.strip())
+        scheme = parsed.scheme.lower()
+        netloc = parsed.netloc.lower()
+
+        if parsed.port is not None and parsed.port == DEFAULT_PORTS.get(scheme):
+            netloc = netloc.rsplit(':', 1)[0]
+
+        path = parsed.path or '/'
+        if len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/') or '/'
+
+        query = '&'.join(sorted(param for param in parsed.query.split('&') if param))
+
+        return urlunparse((scheme, netloc, path, parsed.params, query, ''))
+
+    except ValueError:
+        return url
+
+def _parse_timestamp(value: Optional[str]) -> float:
+    """Convierte una fecha ISO (o de sitemap) en epoch; 0 si no se puede"""
+    if not value:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return 0.0
+
+def _depth_priority(url: str, metadata: Dict):
+    """BFS: primero las URLs menos profundas"""
+    depth = metadata.get('depth')
+    return 999 if depth is None else depth
+
+def _locality_priority(url: str, metadata: Dict):
+    """Agrupa las URLs por ruta para procesar juntas las secciones hermanas"""
+    return tuple(urlparse(url).path.strip('/').split('/'))
+
+def _freshness_priority(url: str, metadata: Dict):
+    """Primero las páginas modificadas (o descubiertas) más recientemente"""
+    return -_parse_timestamp(metadata.get('lastmod') or metadata.get('discovered_at'))
+
+def _indegree_priority(url: str, metadata: Dict):
+    """Primero las páginas con más enlaces entrantes (a igualdad, las menos profundas)"""
+    return (-(metadata.get('in_degree') or 0), _depth_priority(url, metadata))
+
+def _pagerank_priority(url: str, metadata: Dict):
+    """Primero las páginas con mayor PageRank estimado"""
+    return (-(metadata.get('rank') or 0.0), -(metadata.get('in_degree') or 0), _depth_priority(url, metadata))
+
+# Políticas de prioridad del frontier: (url, metadata) -> clave ordenable
+PRIORITY_POLICIES = {
+    'depth': _depth_priority,
+    'locality': _locality_priority,
+    'freshness': _freshness_priority,
+    'indegree': _indegree_priority,
+    'pagerank': _pagerank_priority,
+}
+
+# Políticas que dependen del grafo de enlaces y se reordenan al crecer
+LINK_PRIORITY_POLICIES = ('indegree', 'pagerank')
+
+PAGERANK_DAMPING = 0.85
+
+def pagerank(size: int, out_links, ranks: Optional[array] = None, iterations: int = 30, tolerance: float = 1e-6) -> array:
+    """PageRank por iteración de potencia sobre listas de adyacencia por ID.
+
+    `out_links` produce tuplas (id origen, array de ids destino) con ids
+    menores que `size`. `ranks` permite arrancar desde un resultado anterior:
+    si el grafo solo ha crecido un poco converge en pocas iteraciones. La
+    masa de las páginas sin enlaces salientes se reparte entre todas.
+    """
+    if size <= 0:
+        return array('d')
+
+    adjacency = [(source, targets) for source, targets in out_links if len(targets)]
+    has_out = bytearray(size)
+    for source, _ in adjacency:
+        has_out[source] = 1
+
+    base = 1.0 / size
+    if ranks is None or not len(ranks):
+        current = array('d', [base]) * size
+    else:
+        current = array('d', ranks[:size])
+        current.extend([base] * (size - len(current)))
+        total = sum(current)
+        for node in range(size):
+            current[node] /= total
+
+    for _ in range(iterations):
+        dangling = sum(rank for rank, out in zip(current, has_out) if not out)
+        following = array('d', [(1 - PAGERANK_DAMPING + PAGERANK_DAMPING * dangling) / size]) * size
+        for source, targets in adjacency:
+            share = PAGERANK_DAMPING * current[source] / len(targets)
+            for target in targets:
+                following[target] += share
+
+        delta = sum(abs(new - old) for new, old in zip(following, current))
+        current = following
+        if delta < tolerance:
+            break
+
+    return current
+
+class CrawlFrontier:
+    """Cola de prioridad incremental de URLs pendientes.
+
+    push/pop son O(log n) y el conteo de pendientes es O(1). Las URLs que
+    salen del frontier por otra vía, o cuya prioridad cambia (`update`), se
+    eliminan de forma perezosa: cada URL recuerda la clave y el contador de su
+    entrada vigente.
+    """
+
+    def __init__(self, policy: str = 'depth'):
+        if policy not in PRIORITY_POLICIES:
+            raise ValueError(f"Política de prioridad desconocida: {policy} (opciones: {', '.join(PRIORITY_POLICIES)})")
+
+        self.policy = policy
+        self._priority = PRIORITY_POLICIES[policy]
+        self._heap: List[tuple] = []
+        self._queued: Dict[str, tuple] = {}  # url -> (clave, contador) de su entrada vigente
+        self._counter = 0
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._queued
+
+    def push(self, url: str, metadata: Optional[Dict] = None):
+        """Añade una URL pendiente"""
+        if url in self._queued:
+            return
+        self._push(url, self._priority(url, metadata or {}))
+
+    def _push(self, url: str, key):
+        self._counter += 1
+        self._queued[url] = (key, self._counter)
+        heapq.heappush(self._heap, (key, self._counter, url))
+
+    def update(self, url: str, metadata: Dict):
+        """Recalcula la prioridad de una URL encolada (p. ej. al recibir más enlaces)"""
+        key = self._priority(url, metadata)
+        if url in self._queued and self._queued[url][0] != key:
+            self._push(url, key)
+            self._compact()
+
+    def discard(self, url: str):
+        """Saca una URL del frontier (su entrada del heap se descarta al llegar arriba)"""
+        self._queued.pop(url, None)
+        self._compact()
+
+    def _is_current(self, entry: tuple) -> bool:
+        # Se compara también el contador: si la clave vuelve a un valor anterior
+        # (A -> B -> A), la entrada antigua con la clave A sigue siendo obsoleta
+        return self._queued.get(entry[2]) == entry[:2]
+
+    def _compact(self):
+        """Evita que las entradas obsoletas crezcan sin límite"""
+        if len(self._heap) > 2 * len(self._queued) + 1000:
+            self._heap = [entry for entry in self._heap if self._is_current(entry)]
+            heapq.heapify(self._heap)
+
+    def _pop_entry(self) -> Optional[tuple]:
+        """Extrae la siguiente entrada válida del heap"""
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if self._is_current(entry):
+                return entry
+        return None
+
+    def peek(self, limit: Optional[int] = None) -> List[str]:
+        """Devuelve las próximas URLs por prioridad sin sacarlas del frontier"""
+        if limit is None:
+            return [entry[2] for entry in sorted(e for e in self._heap if self._is_current(e))]
+
+        entries = []
+        while len(entries) < limit:
+            entry = self._pop_entry()
+            if entry is None:
+                break
+            entries.append(entry)
+
+        for entry in entries:
+            heapq.heappush(self._heap, entry)
+
+        return [entry[2] for entry in entries]
+
+    def pop(self, limit: Optional[int] = None) -> List[str]:
+        """Saca del frontier las próximas URLs por prioridad (las que se van a procesar)"""
+        urls = []
+        while limit is None or len(urls) < limit:
+            entry = self._pop_entry()
+            if entry is None:
+                break
+            del self._queued[entry[2]]
+            urls.append(entry[2])
+        return urls
+
+    def rebuild(self, entries):
+        """Reconstruye el frontier completo a partir de tuplas (url, metadata)"""
+        self._queued = {}
+        self._heap = []
+        for url, metadata in entries:
+            if url in self._queued:
+                continue
+            key = self._priority(url, metadata or {})
+            self._counter += 1
+            self._queued[url] = (key, self._counter)
+            self._heap.append((key, self._counter, url))
+        heapq.heapify(self._heap)
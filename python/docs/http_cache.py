@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Cache HTTP en disco (SQLite) con validadores ETag/Last-Modified para re-rastreos
+"""
+
+import json
+import hashlib
+from pathlib import Path
+from typing import Set, Dict, Optional, Union
+from datetime import datetime
+
+from http_fetch import FetchResult
+from storage import connect_sqlite
+
+class HttpCache:
+    """Cache HTTP en disco (SQLite) para re-rastreos baratos.
+
+    Por URL guarda los validadores (ETag/Last-Modified), el hash del cuerpo
+    y los enlaces extraídos, de modo que una respuesta 304 o un cuerpo
+    idéntico no necesitan reconvertirse y siguen alimentando el frontier.
+    """
+
+    def __init__(self, path: Union[str, Path], commit_every: int = 100, shared: bool = False):
+        self.path = str(path)
+        self.commit_every = commit_every
+        self._pending = 0
+        self._conn = connect_sqlite(self.path, shared)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS http_cache ('
+            'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, '
+            'body_hash TEXT, links TEXT, fetched_at TEXT)'
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def hash_body(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Devuelve la entrada cacheada de una URL, si existe"""
+        row = self._conn.execute(
+            'SELECT etag, last_modified, body_hash, links FROM http_cache WHERE url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'body_hash': row[2],
+            'links': set(json.loads(row[3] or '[]'))
+        }
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """Cabeceras If-None-Match / If-Modified-Since para una entrada"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, url: str, result: FetchResult, body_hash: str, links: Set[str]):
+        """Guarda los validadores y enlaces de una respuesta completa"""
+        self._conn.execute(
+            'INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?)',
+            (
+                url,
+                result.header('ETag'),
+                result.header('Last-Modified'),
+                body_hash,
+                json.dumps(sorted(links)),
+                datetime.now().isoformat()
+            )
+        )
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self._conn.close()
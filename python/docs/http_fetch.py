@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Descarga HTTP: clientes asíncronos (aiohttp/httpx) con pool de conexiones, lectura
+acotada del cuerpo, detección de HTML por sus primeros bytes y del encoding
+"""
+
+import re
+import codecs
+import time
+import logging
+from typing import Dict, Optional
+from dataclasses import dataclass, field
+
+import requests
+
+from rate_limit import parse_retry_after
+
+# Importación opcional de clientes HTTP asíncronos
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401 - solo se comprueba su presencia para HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger('advanced_scraper.http_fetch')
+
+# Motores HTTP disponibles para el modo sin Playwright
+FETCH_ENGINES = ('requests', 'aiohttp', 'httpx')
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+@dataclass
+class FetchResult:
+    """Respuesta HTTP ya descargada, independiente del motor usado"""
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    encoding: Optional[str] = None
+    # Fases de la petición en segundos (dns, connect, ttfb, download...) según el motor
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding or 'utf-8', errors='replace')
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Busca una cabecera sin distinguir mayúsculas (cada motor las normaliza distinto)"""
+        name = name.lower()
+        for key, value in self.headers.items():
+            if key.lower() == name:
+                return value
+        return default
+
+class HttpStatusError(Exception):
+    """Respuesta HTTP con código de error, conservando las cabeceras (p. ej. Retry-After)"""
+
+    def __init__(self, url: str, status: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"HTTP {status} para {url}")
+        self.url = url
+        self.status = status
+        self.headers = headers or {}
+
+    def retry_after(self) -> Optional[float]:
+        """Segundos indicados por Retry-After (número o fecha HTTP), si existen"""
+        return parse_retry_after(next((v for k, v in self.headers.items() if k.lower() == 'retry-after'), None))
+
+# Límites de la descarga en streaming
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+SNIFF_BYTES = 4096
+STREAM_CHUNK_BYTES = 64 * 1024
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+# Tipos que no dicen nada del contenido: se decide mirando los primeros bytes
+GENERIC_CONTENT_TYPES = ('', 'text/plain', 'application/octet-stream', 'binary/octet-stream')
+HTML_MARKERS = (b'<!doctype html', b'<html', b'<head', b'<body', b'<title', b'<meta', b'<div', b'<p>')
+BINARY_SIGNATURES = (b'%PDF', b'\x89PNG', b'GIF8', b'\xff\xd8\xff', b'PK\x03\x04', b'\x1f\x8b', b'RIFF', b'\x00\x00\x01\x00')
+
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+_BOM_ENCODINGS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+MULTIBYTE_ENCODINGS = {
+    codecs.lookup(name).name
+    for name in ('shift_jis', 'cp932', 'euc_jp', 'iso2022_jp', 'gb2312', 'gbk', 'gb18030', 'big5', 'big5hkscs', 'euc_kr', 'cp949')
+}
+
+class ContentRejectedError(Exception):
+    """Respuesta descartada antes de convertirla (no es HTML o supera el tamaño máximo)"""
+
+    def __init__(self, url: str, reason: str):
+        super().__init__(f"{reason}: {url}")
+        self.url = url
+        self.reason = reason
+
+def _content_type(headers: Dict[str, str]) -> tuple[str, Optional[str]]:
+    """Tipo MIME y charset declarados en Content-Type"""
+    value = next((v for k, v in headers.items() if k.lower() == 'content-type'), '') or ''
+    media_type, _, params = value.partition(';')
+    charset = None
+    for param in params.split(';'):
+        key, _, param_value = param.partition('=')
+        if key.strip().lower() == 'charset' and param_value.strip():
+            charset = param_value.strip().strip('"\'')
+    return media_type.strip().lower(), charset
+
+def sniff_html(media_type: str, head: bytes) -> Optional[str]:
+    """Motivo para descartar una respuesta según su tipo y primeros bytes (None = es HTML)"""
+    utf16 = head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE))
+    if head.startswith(BINARY_SIGNATURES) or (b'\x00' in head[:512] and not utf16):
+        return f"Contenido binario ({media_type or 'sin Content-Type'})"
+
+    if media_type in HTML_CONTENT_TYPES:
+        return None
+    if media_type not in GENERIC_CONTENT_TYPES:
+        return f"Content-Type no HTML ({media_type})"
+
+    # Sin tipo útil: aceptar solo si el inicio parece marcado HTML
+    start = head.lstrip(b'\xef\xbb\xbf \t\r\n')[:1024].lower()
+    if any(marker in start for marker in HTML_MARKERS):
+        return None
+    return f"No parece HTML ({media_type or 'sin Content-Type'})"
+
+def detect_encoding(declared: Optional[str], head: bytes) -> str:
+    """Encoding del documento a partir de la cabecera o, si falta, de sus primeros bytes"""
+    candidates = [declared]
+    candidates += [encoding for bom, encoding in _BOM_ENCODINGS if head.startswith(bom)]
+
+    match = _META_CHARSET_RE.search(head)
+    if match:
+        candidates.append(match.group(1).decode('ascii', 'ignore'))
+
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+
+    try:
+        # Decodificador incremental: un carácter multibyte cortado al final del prefijo no es error
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    # Detección estadística solo sobre el prefijo: fiable para encodings multibyte (CJK);
+    # para el resto se usa windows-1252, el valor por defecto del estándar HTML
+    detected = requests.compat.chardet.detect(head).get('encoding') if requests.compat.chardet else None
+    try:
+        detected = codecs.lookup(detected).name if detected else None
+    except LookupError:
+        detected = None
+    return detected if detected in MULTIBYTE_ENCODINGS else 'cp1252'
+
+class BodyReader:
+    """Acumula el cuerpo de una respuesta en streaming aplicando los límites.
+
+    Descarta la respuesta antes de leer el cuerpo si las cabeceras ya
+    indican un tipo no HTML o un Content-Length excesivo, y en cuanto
+    llegan los primeros SNIFF_BYTES si no parecen HTML; nunca acumula más
+    de `max_bytes`. El encoding se detecta solo con ese prefijo.
+    """
+
+    def __init__(self, url: str, headers: Dict[str, str], max_bytes: int = DEFAULT_MAX_BODY_BYTES):
+        self.url = url
+        self.max_bytes = max_bytes
+        self.media_type, self.charset = _content_type(headers)
+        self.body = bytearray()
+        self._sniffed = False
+
+        length = next((v for k, v in headers.items() if k.lower() == 'content-length'), None)
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise ContentRejectedError(url, f"Cuerpo de {int(length) / 1024 / 1024:.1f} MB supera el máximo")
+        if self.media_type not in HTML_CONTENT_TYPES and self.media_type not in GENERIC_CONTENT_TYPES:
+            raise ContentRejectedError(url, f"Content-Type no HTML ({self.media_type})")
+
+    def feed(self, chunk: bytes):
+        self.body += chunk
+        if len(self.body) > self.max_bytes:
+            raise ContentRejectedError(self.url, f"Cuerpo de más de {self.max_bytes / 1024 / 1024:.1f} MB")
+        if not self._sniffed and len(self.body) >= SNIFF_BYTES:
+            self._sniff()
+
+    def _sniff(self):
+        self._sniffed = True
+        reason = sniff_html(self.media_type, bytes(self.body[:SNIFF_BYTES]))
+        if reason:
+            raise ContentRejectedError(self.url, reason)
+
+    def finish(self) -> tuple[bytes, str]:
+        """Cuerpo completo y su encoding"""
+        if not self._sniffed and self.body:
+            self._sniff()
+        head = bytes(self.body[:SNIFF_BYTES])
+        return bytes(self.body), detect_encoding(self.charset, head)
+
+# Eventos de traza de httpcore (sin el prefijo connection./http11./http2.) -> marca de tiempo
+HTTPX_TRACE_MARKS = {
+    'connect_tcp.started': 'connect_start',
+    'connect_tcp.complete': 'connect_end',
+    'start_tls.complete': 'connect_end',
+    'send_request_body.complete': 'request_sent',
+    'receive_response_headers.complete': 'headers'
+}
+
+def _phase_timings(marks: Dict[str, float], done: float) -> Dict[str, float]:
+    """Convierte las marcas de una petición en fases que no se solapan.
+
+    pool_wait: esperando conexión libre; dns; connect: TCP+TLS sin DNS;
+    ttfb: desde enviar la petición hasta las cabeceras; download: el cuerpo.
+    """
+    timings = {}
+    if 'queued_start' in marks and 'queued_end' in marks:
+        timings['pool_wait'] = marks['queued_end'] - marks['queued_start']
+
+    dns = 0.0
+    if 'dns_start' in marks and 'dns_end' in marks:
+        dns = timings['dns'] = marks['dns_end'] - marks['dns_start']
+
+    if 'connect_start' in marks and 'connect_end' in marks:
+        timings['connect'] = max(0.0, marks['connect_end'] - marks['connect_start'] - dns)
+
+    headers = marks.get('headers')
+    if headers is not None:
+        sent = marks.get('request_sent', marks.get('connect_end', marks.get('request_start', headers)))
+        timings['ttfb'] = max(0.0, headers - sent)
+        timings['download'] = max(0.0, done - headers)
+
+    return timings
+
+class AsyncHttpFetcher:
+    """Cliente HTTP asíncrono con un pool de conexiones compartido por todo el rastreo"""
+
+    def __init__(
+        self,
+        engine: str = 'aiohttp',
+        concurrency: int = 5,
+        connections_per_host: Optional[int] = None,
+        timeout: float = 30,
+        headers: Optional[Dict[str, str]] = None,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES
+    ):
+        if engine == 'aiohttp' and not AIOHTTP_AVAILABLE:
+            raise RuntimeError("aiohttp no disponible. Instala con: pip install aiohttp")
+        if engine == 'httpx' and not HTTPX_AVAILABLE:
+            raise RuntimeError("httpx no disponible. Instala con: pip install 'httpx[http2]'")
+        if engine not in ('aiohttp', 'httpx'):
+            raise ValueError(f"Motor HTTP asíncrono desconocido: {engine}")
+
+        self.engine = engine
+        self.concurrency = concurrency
+        self.connections_per_host = connections_per_host or concurrency
+        self.timeout = timeout
+        self.headers = headers or dict(DEFAULT_HEADERS)
+        self.max_body_bytes = max_body_bytes
+        self._client = None
+
+    async def start(self):
+        """Abre el pool de conexiones (keep-alive, límite por host y HTTP/2 si está disponible)"""
+        if self._client is not None:
+            return
+
+        if self.engine == 'aiohttp':
+            connector = aiohttp.TCPConnector(
+                limit=max(self.concurrency, self.connections_per_host),
+                limit_per_host=self.connections_per_host,
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+            self._client = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[self._trace_config()]
+            )
+        else:
+            limits = httpx.Limits(
+                max_connections=max(self.concurrency, self.connections_per_host),
+                max_keepalive_connections=self.connections_per_host,
+                keepalive_expiry=30
+            )
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=limits,
+                http2=HTTP2_AVAILABLE,
+                follow_redirects=True
+            )
+
+        logger.debug(f"Pool HTTP iniciado - motor: {self.engine}, conexiones por host: {self.connections_per_host}")
+
+    @staticmethod
+    def _trace_config() -> 'aiohttp.TraceConfig':
+        """Traza de aiohttp que anota en el dict de cada petición sus marcas de tiempo"""
+        trace_config = aiohttp.TraceConfig()
+
+        def mark(name: str):
+            async def callback(session, context, params):
+                marks = context.trace_request_ctx
+                if isinstance(marks, dict):
+                    marks[name] = time.perf_counter()
+            return callback
+
+        trace_config.on_request_start.append(mark('request_start'))
+        trace_config.on_connection_queued_start.append(mark('queued_start'))
+        trace_config.on_connection_queued_end.append(mark('queued_end'))
+        trace_config.on_connection_create_start.append(mark('connect_start'))
+        trace_config.on_connection_create_end.append(mark('connect_end'))
+        trace_config.on_dns_resolvehost_start.append(mark('dns_start'))
+        trace_config.on_dns_resolvehost_end.append(mark('dns_end'))
+        trace_config.on_request_headers_sent.append(mark('request_sent'))
+        trace_config.on_request_end.append(mark('headers'))
+        return trace_config
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """Descarga una URL sin bloquear el event loop (cuerpo en streaming, con límites)"""
+        if self._client is None:
+            await self.start()
+
+        marks: Dict[str, float] = {}
+        if self.engine == 'aiohttp':
+            async with self._client.get(url, headers=headers, trace_request_ctx=marks) as response:
+                response_headers = dict(response.headers)
+                if response.status >= 400:
+                    raise HttpStatusError(url, response.status, response_headers)
+                body, encoding = await self._read_body(
+                    url, response.status, response_headers, response.content.iter_chunked(STREAM_CHUNK_BYTES)
+                )
+                result = FetchResult(
+                    url=str(response.url),
+                    status=response.status,
+                    headers=response_headers,
+                    body=body,
+                    encoding=encoding
+                )
+        else:
+            async def trace(event_name: str, info: Dict):
+                name = HTTPX_TRACE_MARKS.get(event_name.split('.', 1)[-1])
+                if name is not None:
+                    marks[name] = time.perf_counter()
+
+            async with self._client.stream('GET', url, headers=headers, extensions={'trace': trace}) as response:
+                response_headers = dict(response.headers)
+                if response.status_code >= 400:
+                    raise HttpStatusError(url, response.status_code, response_headers)
+                body, encoding = await self._read_body(
+                    url, response.status_code, response_headers, response.aiter_bytes(STREAM_CHUNK_BYTES)
+                )
+                result = FetchResult(
+                    url=str(response.url),
+                    status=response.status_code,
+                    headers=response_headers,
+                    body=body,
+                    encoding=encoding
+                )
+
+        result.timings = _phase_timings(marks, time.perf_counter())
+        return result
+
+    async def _read_body(self, url: str, status: int, headers: Dict[str, str], chunks) -> tuple[bytes, Optional[str]]:
+        """Lee el cuerpo por bloques con BodyReader (una respuesta 304 no trae cuerpo)"""
+        if status == 304:
+            return b'', None
+
+        reader = BodyReader(url, headers, self.max_body_bytes)
+        async for chunk in chunks:
+            reader.feed(chunk)
+        return reader.finish()
+
+    async def close(self):
+        """Cierra el pool de conexiones"""
+        if self._client is None:
+            return
+
+        if self.engine == 'aiohttp':
+            await self._client.close()
+        else:
+            await self._client.aclose()
+        self._client = None
@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+"""
+Seguimiento de enlaces del rastreo: diario append-only, snapshots compactados en
+segundo plano y grafo de enlaces sobre un almacén de URLs
+"""
+
+import os
+import csv
+import json
+import pickle
+import time
+import heapq
+import itertools
+import socket
+import logging
+from array import array
+from pathlib import Path
+from typing import Set, Dict, List, Optional, Union
+from urllib.parse import urlparse
+from datetime import datetime
+from xml.sax.saxutils import escape
+import concurrent.futures
+
+from frontier import (
+    CrawlFrontier, LINK_PRIORITY_POLICIES, PAGERANK_DAMPING, is_valid_doc_url, normalize_url, pagerank, _parse_timestamp
+)
+from storage import write_file_atomic
+from url_store import (
+    MemoryUrlStore, SharedUrlStore, SqliteUrlStore, URL_PENDING, URL_VISITED, URL_FAILED, URL_SKIPPED,
+    URL_STATE_NAMES, URL_STORES
+)
+
+logger = logging.getLogger('advanced_scraper.link_tracker')
+
+class CrawlJournal:
+    """Diario append-only (JSON lines) de transiciones de estado del rastreo"""
+
+    def __init__(self, path: str, fsync_every: int = 100):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.entries = 0  # Entradas desde la última compactación
+        self._file = None
+        self._unsynced = 0
+
+    def replay(self, path: Optional[str] = None):
+        """Recorre las entradas guardadas, ignorando líneas corruptas o truncadas"""
+        path = path or self.path
+        if not os.path.exists(path):
+            return
+
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Entrada corrupta en {path}:{line_number}, se ignora")
+                    continue
+
+                self.entries += 1
+                yield record
+
+    def append(self, record: Dict):
+        """Añade una entrada al final del diario (coste O(1))"""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.entries += 1
+        self._unsynced += 1
+
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        """Fuerza las entradas pendientes a disco"""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def truncate(self):
+        """Vacía el diario tras una compactación"""
+        self.close()
+        with open(self.path, 'w', encoding='utf-8'):
+            pass
+        self.entries = 0
+
+    def rotate(self, generation: int):
+        """Aparta el diario actual como `<diario>.<generation>` y empieza uno vacío"""
+        self.close()
+        if os.path.exists(self.path):
+            os.replace(self.path, f"{self.path}.{generation}")
+        self.entries = 0
+
+    def rotated(self) -> List[tuple]:
+        """Diarios apartados pendientes de compactar, como (generación, ruta) en orden"""
+        directory, prefix = os.path.split(self.path)
+        found = []
+        for entry in os.scandir(directory or '.'):
+            generation = entry.name[len(prefix) + 1:]
+            if entry.name.startswith(prefix + '.') and generation.isdigit():
+                found.append((int(generation), entry.path))
+        return sorted(found)
+
+    def remove_rotated(self, up_to: int):
+        """Borra los diarios apartados ya cubiertos por el snapshot de generación `up_to`"""
+        for generation, path in self.rotated():
+            if generation <= up_to:
+                os.remove(path)
+
+    def close(self):
+        """Cierra el archivo del diario"""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+class _UrlStateView:
+    """Vista de solo lectura (in, len, iter) de las URLs de un estado"""
+
+    def __init__(self, store, state: Optional[int] = None):
+        self.store = store
+        self.state = state
+
+    def __contains__(self, url: str) -> bool:
+        if self.state is None:
+            return url in self.store
+        return self.store.state(url) == self.state
+
+    def __len__(self) -> int:
+        return len(self.store) if self.state is None else self.store.count(self.state)
+
+    def __iter__(self):
+        return self.store.iter_state(self.state)
+
+class LinkTracker:
+    """Clase para manejar el seguimiento persistente de enlaces.
+
+    Con el almacén en memoria, el estado completo se guarda como snapshot
+    (pickle) y cada transición intermedia se añade a un diario append-only
+    que se compacta en el snapshot cada `compact_every` entradas. Con el
+    almacén SQLite cada transición se escribe directamente en la base.
+    Las compactaciones disparadas durante el rastreo no bloquean: el diario
+    se aparta (rotación por generación) y un hilo escribe una copia del
+    estado como snapshot; al cargar se reaplican los diarios apartados que
+    el snapshot todavía no cubre.
+
+    Además del origen de cada URL se guarda el grafo de enlaces completo
+    (enlaces salientes de cada página procesada). Con las políticas
+    'indegree' y 'pagerank' las URLs pendientes se reordenan a medida que
+    reciben enlaces; el PageRank se recalcula, partiendo del anterior, cada
+    vez que el grafo crece un 10 %.
+
+    Con `queue` el tracker es un worker de un rastreo distribuido: el
+    frontier es la cola compartida (SharedUrlStore) y las URLs se reservan
+    por lotes con lease en lugar de leerse de un heap local.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        cache_file: str = "link_cache.pkl",
+        compact_every: int = 5000,
+        priority_policy: str = 'depth',
+        store: str = 'memory',
+        queue: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = 300
+    ):
+        if store not in URL_STORES:
+            raise ValueError(f"Almacén de URLs desconocido: {store} (opciones: {', '.join(URL_STORES)})")
+
+        self.base_url = base_url
+        self.domain = urlparse(normalize_url(base_url)).netloc
+        self.cache_file = cache_file
+        self.compact_every = compact_every
+        self.frontier = CrawlFrontier(priority_policy)
+        self.shared = queue is not None
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+        if self.shared:
+            self.store = SharedUrlStore(queue, self.worker_id, lease_seconds, policy=priority_policy)
+            self.journal = None
+        elif store == 'sqlite':
+            self.store = SqliteUrlStore(Path(cache_file).with_suffix('.sqlite'))
+            self.journal = None
+        else:
+            self.store = MemoryUrlStore()
+            self.journal = CrawlJournal(str(Path(cache_file).with_suffix('.journal')))
+
+        # Vistas de conjuntos de URLs (compatibles con `in` y len)
+        self.discovered_urls = _UrlStateView(self.store)
+        self.visited_urls = _UrlStateView(self.store, URL_VISITED)
+        self.failed_urls = _UrlStateView(self.store, URL_FAILED)
+        self.skipped_urls = _UrlStateView(self.store, URL_SKIPPED)
+
+        # Última huella de otros workers ya incorporada (modo distribuido)
+        self._fingerprint_seq = self.store.last_fingerprint_seq() if self.shared else 0
+
+        # URLs entregadas por get_next_urls que aún no se han marcado: siguen
+        # pendientes en el almacén, pero no deben volver al frontier local
+        self.in_flight: Set[str] = set()
+
+        # PageRank de la política 'pagerank' (por ID de URL) y aristas nuevas desde el último cálculo
+        self._ranks: Optional[array] = None
+        self._ranked_links = 0
+        self._new_links = 0
+
+        # Compactación en segundo plano: generación del último diario apartado
+        self._generation = 0
+        self._compactor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._compaction: Optional[concurrent.futures.Future] = None
+
+        self.load_cache()
+
+    def load_cache(self):
+        """Carga el snapshot de enlaces y reaplica el diario pendiente"""
+        if self.shared:
+            logger.info(f"Cola compartida {self.store.path}: {len(self.store)} URLs (worker {self.worker_id})")
+            return
+
+        migrated = False
+        snapshot_generation = 0
+        # Con SQLite el snapshot solo se lee para migrarlo a una base vacía
+        if os.path.exists(self.cache_file) and (self.journal is not None or not len(self.store)):
+            try:
+                with open(self.cache_file, 'rb') as f:
+                    data = pickle.load(f)
+
+                if 'store' in data and self.journal is not None:
+                    self.store.load_snapshot(data['store'])
+                    snapshot_generation = data.get('generation', 0)
+                elif 'store' in data:
+                    snapshot = MemoryUrlStore()
+                    snapshot.load_snapshot(data['store'])
+                    self._import_entries((url, snapshot.get(url)) for url in snapshot.urls)
+                    for source, links in itertools.groupby(snapshot.iter_links(), key=lambda edge: edge[0]):
+                        self.store.set_links(source, [target for _, target in links])
+                    migrated = True
+                else:
+                    # Formato anterior: conjuntos y dict de metadata por URL
+                    self._import_entries(self._legacy_entries(data))
+                    migrated = True
+
+                logger.info(f"Cache cargado: {len(self.store)} URLs descubiertas")
+            except Exception as e:
+                logger.warning(f"Error cargando cache: {e}")
+
+        self.frontier.rebuild(self._frontier_entries())
+
+        replayed = 0
+        if self.journal is not None:
+            # Diarios apartados cuya compactación no llegó a terminar, y después el actual
+            pending = [path for generation, path in self.journal.rotated() if generation > snapshot_generation]
+            self._generation = max([snapshot_generation] + [generation for generation, _ in self.journal.rotated()])
+            for path in pending + [self.journal.path]:
+                for record in self.journal.replay(path):
+                    self._apply(record)
+                    replayed += 1
+
+        if replayed:
+            logger.info(f"Diario reaplicado: {replayed} transiciones")
+
+        if replayed or migrated:
+            # Compactar deja el diario vacío y sin posibles líneas truncadas
+            self.save_cache()
+
+        if migrated and self.journal is None:
+            # El snapshot ya está importado en la base
+            os.replace(self.cache_file, f"{self.cache_file}.migrated")
+
+        if self.frontier.policy == 'pagerank':
+            self.update_ranks()
+
+    @staticmethod
+    def _legacy_entries(data: Dict):
+        """Convierte un snapshot del formato anterior (sets + metadata) en tuplas (url, metadata)"""
+        metadata = data.get('metadata', {})
+        states = [
+            (data.get('visited', set()), URL_VISITED),
+            (data.get('failed', set()), URL_FAILED),
+            (data.get('skipped', set()), URL_SKIPPED)
+        ]
+
+        # En orden de descubrimiento, para que las URLs de origen ya existan
+        discovered = sorted(data.get('discovered', set()), key=lambda url: metadata.get(url, {}).get('discovered_at') or '')
+        for url in discovered:
+            meta = metadata.get(url, {})
+            state = next((code for urls, code in states if url in urls), URL_PENDING)
+            yield url, {
+                'state': state,
+                'depth': meta.get('depth'),
+                'source_url': meta.get('source_url'),
+                'discovered_at': _parse_timestamp(meta.get('discovered_at')),
+                'lastmod': _parse_timestamp(meta.get('lastmod')),
+                'processed_at': _parse_timestamp(meta.get('processed_at')),
+                'content_hash': meta.get('content_hash'),
+                'simhash': meta.get('simhash'),
+                'alias_of': meta.get('alias_of'),
+                'note': meta.get('error') or meta.get('skip_reason')
+            }
+
+    def _import_entries(self, entries):
+        """Carga tuplas (url, metadata) en el almacén (migraciones)"""
+        aliases = []
+        for url, meta in entries:
+            self.store.add(url, meta['depth'], meta['source_url'], meta['discovered_at'], meta['lastmod'])
+            if meta['state'] != URL_PENDING:
+                self.store.set_state(url, meta['state'], meta['processed_at'], meta['note'])
+            if meta['content_hash']:
+                self.store.set_fingerprint(url, meta['content_hash'], meta['simhash'])
+            elif meta['alias_of']:
+                aliases.append((url, meta['alias_of']))
+
+        # Los alias apuntan a URLs que pueden aparecer después
+        for url, canonical in aliases:
+            self.store.set_alias(url, canonical)
+
+    def save_cache(self):
+        """Compacta el estado en un snapshot atómico y vacía el diario"""
+        try:
+            if self.journal is None:
+                self.store.commit()
+                return
+
+            self._wait_for_compaction()
+            data = {
+                'store': self.store.to_snapshot(),
+                'generation': self._generation,
+                'last_update': datetime.now().isoformat()
+            }
+            write_file_atomic(self.cache_file, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+            self.journal.truncate()
+            self.journal.remove_rotated(self._generation)
+        except Exception as e:
+            logger.error(f"Error guardando cache: {e}")
+
+    def compact_in_background(self):
+        """Compacta sin bloquear: aparta el diario y escribe el snapshot en otro hilo"""
+        if self._compaction is not None and not self._compaction.done():
+            # Sigue la anterior; el diario crece hasta la siguiente oportunidad
+            return
+
+        try:
+            self._generation += 1
+            data = {
+                'store': self.store.to_snapshot(copy=True),
+                'generation': self._generation,
+                'last_update': datetime.now().isoformat()
+            }
+            self.journal.rotate(self._generation)
+        except Exception as e:
+            logger.error(f"Error preparando compactación: {e}")
+            return
+
+        if self._compactor is None:
+            self._compactor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='compact')
+        self._compaction = self._compactor.submit(self._write_snapshot, data)
+
+    def _write_snapshot(self, data: Dict):
+        """Escribe un snapshot y borra los diarios que ya cubre (hilo de compactación)"""
+        try:
+            write_file_atomic(self.cache_file, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+            self.journal.remove_rotated(data['generation'])
+        except Exception as e:
+            # Los diarios apartados se conservan y se reaplican al cargar
+            logger.error(f"Error guardando cache en segundo plano: {e}")
+
+    def _wait_for_compaction(self):
+        """Espera a que termine la compactación en segundo plano, si hay una"""
+        if self._compaction is not None:
+            self._compaction.result()
+            self._compaction = None
+
+    def close(self):
+        """Libera el almacén (llamar después de save_cache)"""
+        self._wait_for_compaction()
+        if self._compactor is not None:
+            self._compactor.shutdown()
+            self._compactor = None
+        self.store.close()
+
+    def _apply(self, record: Dict):
+        """Aplica una transición de estado en el almacén"""
+        op = record.get('op')
+        url = record.get('url')
+        at = _parse_timestamp(record.get('at'))
+
+        if op == 'discovered':
+            lastmod = _parse_timestamp(record.get('lastmod'))
+            if self.store.add(url, record.get('depth'), record.get('source_url'), at, lastmod) and not self.shared:
+                self.frontier.push(url, {'depth': record.get('depth'), 'discovered_at': at, 'lastmod': lastmod})
+        elif op == 'lastmod':
+            self.store.set_lastmod(url, _parse_timestamp(record.get('lastmod')))
+        elif op == 'visited':
+            self.store.set_state(url, URL_VISITED, at)
+            self.frontier.discard(url)
+            self.in_flight.discard(url)
+        elif op == 'failed':
+            self.store.set_state(url, URL_FAILED, at, record.get('error'))
+            self.frontier.discard(url)
+            self.in_flight.discard(url)
+        elif op == 'fingerprint':
+            self.store.set_fingerprint(url, record.get('content_hash'), record.get('simhash'))
+        elif op == 'alias':
+            self.store.set_alias(url, record.get('canonical'))
+        elif op == 'skipped':
+            self.store.set_state(url, URL_SKIPPED, at, record.get('reason'))
+            self.frontier.discard(url)
+            self.in_flight.discard(url)
+        elif op == 'links':
+            source_id, added = self.store.set_links(url, record.get('targets') or [])
+            self._reprioritize(source_id, added)
+        else:
+            logger.warning(f"Transición desconocida en el diario: {op}")
+
+    def _record(self, op: str, url: str, **fields):
+        """Aplica una transición y la añade al diario"""
+        record = {'op': op, 'url': url, 'at': round(time.time(), 3), **fields}
+        self._apply(record)
+
+        # SQLite ya persiste la transición (agrupada en transacciones)
+        if self.journal is None:
+            return
+
+        self.journal.append(record)
+        if self.journal.entries >= self.compact_every:
+            self.compact_in_background()
+
+    def is_valid_url(self, url: str) -> bool:
+        """Verifica si una URL es válida para scraping"""
+        return is_valid_doc_url(url, self.domain)
+
+    def add_discovered_urls(self, urls: Set[str], source_url: str = None):
+        """Añade URLs descubiertas al tracker y guarda los enlaces de la página de origen"""
+        new_urls = set()
+        targets = set()
+        with self.store.transaction():
+            for url in urls:
+                url = normalize_url(url)
+                if not self.is_valid_url(url):
+                    continue
+                targets.add(url)
+                if url not in self.store:
+                    self._record('discovered', url, source_url=source_url, depth=self._calculate_depth(url))
+                    new_urls.add(url)
+
+            if source_url:
+                self._record('links', source_url, targets=sorted(targets))
+
+        if new_urls:
+            logger.info(f"Descubiertas {len(new_urls)} nuevas URLs")
+
+        return new_urls
+
+    def add_sitemap_urls(self, entries) -> int:
+        """Siembra el tracker con tuplas (url, lastmod) procedentes de sitemaps"""
+        new_count = 0
+        with self.store.transaction():
+            for url, lastmod in entries:
+                url = normalize_url(url)
+                if not self.is_valid_url(url):
+                    continue
+
+                metadata = self.store.get(url)
+                if metadata is None:
+                    self._record('discovered', url, source_url='sitemap', depth=self._calculate_depth(url), lastmod=lastmod)
+                    new_count += 1
+                elif lastmod and metadata['lastmod'] != _parse_timestamp(lastmod):
+                    self._record('lastmod', url, lastmod=lastmod)
+
+        if new_count:
+            logger.info(f"Sitemap: {new_count} nuevas URLs en cola")
+        return new_count
+
+    def get_metadata(self, url: str) -> Optional[Dict]:
+        """Metadata de una URL (fechas en epoch) o None si no se conoce"""
+        return self.store.get(url)
+
+    def is_unchanged_since_visit(self, url: str) -> bool:
+        """Indica si el lastmod del sitemap no es posterior al último procesado"""
+        metadata = self.store.get(url, {})
+        lastmod = metadata.get('lastmod')
+        processed_at = metadata.get('processed_at')
+        return bool(lastmod and processed_at and lastmod <= processed_at)
+
+    def _calculate_depth(self, url: str) -> int:
+        """Calcula la profundidad de una URL relativa a la base"""
+        base_path = urlparse(self.base_url).path.strip('/')
+        url_path = urlparse(url).path.strip('/')
+
+        if not base_path:
+            return len(url_path.split('/')) if url_path else 0
+
+        return len(url_path.replace(base_path, '').strip('/').split('/')) if url_path else 0
+
+    def _frontier_entries(self, state: Optional[int] = URL_PENDING):
+        """Tuplas (url, metadata) para el frontier, con el PageRank si se calcula"""
+        for url, metadata in self.store.iter_frontier_entries(state):
+            if url not in self.in_flight:
+                yield url, self._with_rank(metadata)
+
+    def _with_rank(self, metadata: Dict) -> Dict:
+        if self._ranks is not None:
+            url_id = metadata['id']
+            metadata['rank'] = self._ranks[url_id] if url_id < len(self._ranks) else 0.0
+        return metadata
+
+    def _reprioritize(self, source_id: int, added: List[tuple]):
+        """Reordena en el frontier los destinos que acaban de ganar un enlace entrante"""
+        self._new_links += len(added)
+        if self.shared or self.frontier.policy not in LINK_PRIORITY_POLICIES:
+            return
+
+        ranks = self._ranks
+        if ranks is not None:
+            # Estimación hasta el próximo cálculo: la página de origen reparte su
+            # rango entre los enlaces nuevos (todos, la primera vez que se procesa)
+            base = (1 - PAGERANK_DAMPING) / max(1, len(self.store))
+            share = PAGERANK_DAMPING * (ranks[source_id] if 0 <= source_id < len(ranks) else base) / max(1, len(added))
+
+        for target_url, target_id, in_degree in added:
+            if target_url not in self.frontier:
+                continue
+            if ranks is not None:
+                if target_id >= len(ranks):
+                    ranks.extend([0.0] * (target_id + 1 - len(ranks)))
+                ranks[target_id] = max(ranks[target_id], base) + share
+            self.frontier.update(target_url, self._with_rank(self.store.get(target_url)))
+
+        if ranks is not None and self._new_links > max(100, self._ranked_links // 10):
+            self.update_ranks()
+
+    def update_ranks(self):
+        """Recalcula el PageRank (partiendo del anterior) y reordena el frontier"""
+        started = time.perf_counter()
+        warm = self._ranks is not None
+        self._ranks = pagerank(self.store.id_limit(), self.store.iter_out_links(), self._ranks, iterations=5 if warm else 30)
+        self._ranked_links = self.store.link_count
+        self._new_links = 0
+        self.frontier.rebuild(self._frontier_entries())
+        logger.debug(f"PageRank recalculado: {self._ranked_links} enlaces en {time.perf_counter() - started:.2f}s")
+
+    def export_link_graph(self, path: Union[str, Path]) -> int:
+        """Exporta el grafo de enlaces: GraphML si la ruta acaba en .graphml, si no CSV (origen,destino)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        edges = 0
+
+        if path.suffix.lower() != '.graphml':
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('source', 'target'))
+                for edge in self.store.iter_links():
+                    writer.writerow(edge)
+                    edges += 1
+            return edges
+
+        ranks = pagerank(self.store.id_limit(), self.store.iter_out_links(), self._ranks)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                '  <key id="url" for="node" attr.name="url" attr.type="string"/>\n'
+                '  <key id="state" for="node" attr.name="state" attr.type="string"/>\n'
+                '  <key id="depth" for="node" attr.name="depth" attr.type="int"/>\n'
+                '  <key id="in_degree" for="node" attr.name="in_degree" attr.type="int"/>\n'
+                '  <key id="pagerank" for="node" attr.name="pagerank" attr.type="double"/>\n'
+                '  <graph id="links" edgedefault="directed">\n'
+            )
+            for url_id, url, state, depth, in_degree in self.store.iter_nodes():
+                f.write(
+                    f'    <node id="n{url_id}"><data key="url">{escape(url)}</data>'
+                    f'<data key="state">{URL_STATE_NAMES[state]}</data>'
+                    f'<data key="depth">{-1 if depth is None else depth}</data>'
+                    f'<data key="in_degree">{in_degree}</data>'
+                    f'<data key="pagerank">{ranks[url_id]:.6g}</data></node>\n'
+                )
+            for source_id, targets in self.store.iter_out_links():
+                for target_id in targets:
+                    f.write(f'    <edge source="n{source_id}" target="n{target_id}"/>\n')
+                    edges += 1
+            f.write('  </graph>\n</graphml>\n')
+        return edges
+
+    def top_linked(self, limit: int = 5) -> List[tuple]:
+        """Las URLs con más enlaces entrantes, como (url, grado de entrada)"""
+        nodes = heapq.nlargest(limit, self.store.iter_nodes(), key=lambda node: node[4])
+        return [(url, in_degree) for _, url, _, _, in_degree in nodes if in_degree]
+
+    def requeue_processed(self):
+        """Devuelve al frontier todas las URLs ya procesadas (re-rastreo completo)"""
+        self.store.reset_states()
+        if not self.shared:
+            self.frontier.rebuild(self._frontier_entries(None))
+        self.save_cache()
+        logger.info(f"Re-rastreo: {self.pending_count()} URLs en cola de nuevo")
+
+    def get_next_urls(self, limit: int = None) -> List[str]:
+        """Obtiene las próximas URLs a procesar según la política de prioridad.
+
+        Las URLs devueltas salen del frontier (siguen pendientes en el almacén
+        hasta que se marcan como visitadas, fallidas u omitidas, así que una
+        ejecución interrumpida las retoma). En modo distribuido quedan reservadas
+        para este worker hasta que se marcan o expira su lease.
+        """
+        urls = self.store.lease(limit or 100) if self.shared else self.frontier.pop(limit)
+        self.in_flight.update(urls)
+        return urls
+
+    def requeue(self, url: str):
+        """Devuelve a la cola una URL entregada que no llegó a completarse"""
+        if url not in self.in_flight:
+            return
+        self.in_flight.discard(url)
+        if self.shared:
+            self.store.release_url(url)
+        else:
+            self.frontier.push(url, self._with_rank(self.store.get(url)))
+
+    def pending_count(self) -> int:
+        """Número de URLs pendientes (O(1) con el frontier local)"""
+        if self.shared:
+            return self.store.count(URL_PENDING)
+        return len(self.frontier)
+
+    def leased_elsewhere(self) -> int:
+        """URLs en curso en otros workers (pueden descubrir más URLs); 0 sin cola compartida"""
+        return self.store.leased_count(exclude_owner=self.worker_id) if self.shared else 0
+
+    def renew_leases(self) -> int:
+        """Prolonga los leases de las URLs que este worker tiene en curso"""
+        return self.store.renew() if self.shared else 0
+
+    def iter_new_fingerprints(self):
+        """Tuplas (url, hash, simhash) registradas por otros workers desde la última llamada"""
+        if not self.shared:
+            return
+        for seq, url, content_hash, simhash_value in self.store.iter_fingerprints_since(self._fingerprint_seq):
+            self._fingerprint_seq = seq
+            yield url, content_hash, simhash_value
+
+    def mark_visited(self, url: str):
+        """Marca una URL como visitada"""
+        self._record('visited', url)
+
+    def mark_failed(self, url: str, error: str = None):
+        """Marca una URL como fallida"""
+        self._record('failed', url, error=error)
+
+    def mark_skipped(self, url: str, reason: str = None):
+        """Marca una URL como omitida"""
+        self._record('skipped', url, reason=reason)
+
+    def record_fingerprint(self, url: str, content_hash: str, simhash: Optional[int]):
+        """Guarda la huella del contenido de una página canónica"""
+        self._record('fingerprint', url, content_hash=content_hash, simhash=simhash)
+
+    def mark_alias(self, url: str, canonical: str):
+        """Registra una URL como alias (contenido duplicado) de otra"""
+        self._record('alias', url, canonical=canonical)
+
+    def alias_of(self, url: str) -> Optional[str]:
+        """URL canónica de la que `url` es alias, si lo es"""
+        return self.store.get(url, {}).get('alias_of')
+
+    def get_aliases(self) -> Dict[str, str]:
+        """Todas las URLs alias con su URL canónica"""
+        return dict(self.store.iter_aliases())
+
+    def iter_fingerprints(self):
+        """Tuplas (url, hash, simhash) de las páginas canónicas"""
+        return self.store.iter_fingerprints()
+
+    def get_stats(self) -> Dict:
+        """Obtiene estadísticas del tracker"""
+        return {
+            'discovered': len(self.store),
+            'visited': self.store.count(URL_VISITED),
+            'failed': self.store.count(URL_FAILED),
+            'skipped': self.store.count(URL_SKIPPED),
+            'aliases': self.store.alias_count(),
+            'pending': self.pending_count()
+        }
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Conversión de HTML a Markdown, limpieza de formato en una sola pasada y frontmatter
+"""
+
+import re
+import hashlib
+import logging
+from typing import Dict, List, Optional, Union, Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+import html2text
+from markdownify import markdownify as md
+
+logger = logging.getLogger('advanced_scraper.markdown_processing')
+
+@dataclass
+class CleanupRule:
+    """Regla de limpieza en línea: patrón regex y reemplazo (plantilla o función)"""
+    name: str
+    pattern: str
+    replacement: Union[str, Callable[[re.Match], str]]
+
+# Reglas en línea por defecto. Todas se fusionan en una sola regex, así que
+# los grupos internos deben ser con nombre (y únicos entre reglas); las
+# plantillas usan \g<nombre>.
+MARKDOWN_CLEANUP_RULES = [
+    # Corregir espacios en enlaces
+    CleanupRule('link', r'\[\s*(?P<link_text>[^\]]+?)\s*\]\s*\(\s*(?P<link_url>[^)]+?)\s*\)',
+                lambda m: f"[{m.group('link_text')}]({m.group('link_url')})"),
+    # Corregir código inline mal formado (cada span se consume entero, así
+    # no se confunde el espacio entre dos spans con uno mal formado)
+    CleanupRule('inline_code', r'`(?P<code>[^`\n]+)`',
+                lambda m: f"`{m.group('code').strip() or m.group('code')}`"),
+    # Corregir tablas rotas
+    CleanupRule('empty_cells', r'\|[ \t]*\|[ \t]*\|', '| |'),
+]
+
+_FENCE_RE = re.compile(r'^[ ]{0,3}(`{3,}|~{3,})')
+_LONE_HEADING_RE = re.compile(r'^(#{1,6})\s*$')
+
+class MarkdownCleaner:
+    """Limpiador de Markdown de una sola pasada.
+
+    Una pasada por líneas resuelve las correcciones estructurales (espacios
+    finales, líneas vacías excesivas, encabezados y viñetas sueltas) y
+    respeta los bloques de código delimitados; después, todas las reglas en
+    línea se aplican con una única regex compilada sobre el texto fuera de
+    esos bloques.
+    """
+
+    # Subir al cambiar la pasada por líneas (invalida los manifiestos)
+    VERSION = 2
+
+    def __init__(self, rules: Optional[List[CleanupRule]] = None):
+        self.rules: List[CleanupRule] = list(MARKDOWN_CLEANUP_RULES if rules is None else rules)
+        self._compile()
+
+    def add_rule(
+        self,
+        name: str,
+        pattern: str,
+        replacement: Union[str, Callable[[re.Match], str]]
+    ):
+        """Registra una regla en línea; se fusiona con las demás en la misma pasada"""
+        self.rules.append(CleanupRule(name, pattern, replacement))
+        self._compile()
+
+    def _compile(self):
+        self._replacements = {}
+        for rule in self.rules:
+            if callable(rule.replacement):
+                self._replacements[rule.name] = rule.replacement
+            elif '\\' in rule.replacement:
+                self._replacements[rule.name] = lambda m, template=rule.replacement: m.expand(template)
+            else:
+                self._replacements[rule.name] = lambda m, text=rule.replacement: text
+
+        if not self.rules:
+            self._inline_re = None
+            return
+
+        # Cada alternativa termina en un grupo vacío con el nombre de la regla
+        # (lastgroup identifica la regla) y empieza por el patrón tal cual,
+        # para que re pueda saltar directamente a los caracteres iniciales
+        self._inline_re = re.compile('|'.join(f'(?:{rule.pattern})(?P<{rule.name}>)' for rule in self.rules))
+
+    def fingerprint(self) -> str:
+        """Huella de las reglas activas (cambia si cambia la limpieza)"""
+        parts = [str(self.VERSION)]
+        for rule in self.rules:
+            replacement = rule.replacement if isinstance(rule.replacement, str) else getattr(rule.replacement, '__qualname__', '')
+            parts.append(f"{rule.name}\0{rule.pattern}\0{replacement}")
+        return hashlib.sha256('\1'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+    def _apply_rule(self, match: re.Match) -> str:
+        return self._replacements[match.lastgroup](match)
+
+    def _split_blocks(self, content: str) -> List[tuple]:
+        """Normaliza las líneas y devuelve bloques (es_codigo, líneas)"""
+        blocks = []
+        prose: List[str] = []
+        code: List[str] = []
+        fence = None
+        blank_run = 0
+        prefix = ''
+
+        for line in content.split('\n'):
+            if fence is not None:
+                code.append(line)
+                stripped = line.strip()
+                if stripped.startswith(fence) and stripped.strip(fence[0]) == '':
+                    blocks.append((True, code))
+                    code, fence = [], None
+                continue
+
+            line = line.rstrip(' ')
+            stripped = line.strip()
+            if not stripped:
+                if prefix:
+                    continue
+                blank_run += 1
+                # Máximo dos líneas vacías seguidas
+                if blank_run <= 2:
+                    prose.append('')
+                continue
+
+            # Comprobaciones baratas antes de las regex de casos raros
+            first = stripped[0]
+            if first in '`~':
+                opening = _FENCE_RE.match(line)
+                if opening:
+                    if prefix:
+                        # Un encabezado o viñeta suelta no se une a la apertura del bloque
+                        prose.append(prefix.rstrip())
+                        prefix = ''
+                    blocks.append((False, prose))
+                    prose, blank_run = [], 0
+                    fence = opening.group(1)
+                    code = [line]
+                    continue
+
+            if len(stripped) <= 6:
+                heading = _LONE_HEADING_RE.match(line) if first == '#' else None
+                if heading:
+                    prefix = f"{prefix}{heading.group(1)} "
+                    continue
+
+                if len(stripped) == 1 and first in '-*+':
+                    # Viñeta sin texto: se une a la siguiente línea tras una línea vacía
+                    while prose and prose[-1] == '':
+                        prose.pop()
+                    prose.append('')
+                    prefix = f"{prefix}* "
+                    blank_run = 0
+                    continue
+
+            prose.append(prefix + line)
+            prefix = ''
+            blank_run = 0
+
+        if prefix:
+            prose.append(prefix.rstrip())
+        blocks.append((False, prose))
+        if code:
+            # Bloque sin cerrar: se conserva tal cual
+            blocks.append((True, code))
+
+        return blocks
+
+    def clean(self, content: str) -> str:
+        """Limpia y corrige el contenido Markdown"""
+        if not content:
+            return ""
+
+        parts = []
+        for is_code, lines in self._split_blocks(content):
+            if not lines:
+                continue
+            text = '\n'.join(lines)
+            if not is_code and self._inline_re is not None:
+                text = self._inline_re.sub(self._apply_rule, text)
+            parts.append(text)
+
+        return '\n'.join(parts).strip()
+
+class MarkdownProcessor:
+    """Clase para procesar y corregir contenido Markdown"""
+
+    def __init__(self):
+        self.html_converter = html2text.HTML2Text()
+        self.html_converter.ignore_links = False
+        self.html_converter.ignore_images = False
+        self.html_converter.body_width = 0
+        self.html_converter.protect_links = True
+        self.html_converter.unicode_snob = True
+        self.html_converter.bypass_tables = False
+        self.cleaner = MarkdownCleaner()
+
+    def html_to_markdown(self, html_content: str) -> str:
+        """Convierte HTML a Markdown usando html2text"""
+        try:
+            return self.html_converter.handle(html_content)
+        except Exception as e:
+            logger.warning(f"Error convirtiendo HTML a Markdown: {e}")
+            # Fallback usando markdownify
+            return md(html_content, strip=['script', 'style'])
+
+    def clean_markdown(self, content: str) -> str:
+        """Limpia y corrige el contenido Markdown"""
+        return self.cleaner.clean(content)
+
+    def extract_metadata(self, soup: BeautifulSoup, url: str) -> Dict:
+        """Extrae metadata de la página"""
+        title = soup.title.get_text() if soup.title else None
+        metas = [(meta.get('name', ''), meta.get('content', '')) for meta in soup.find_all('meta')]
+        return self.build_metadata(url, title, metas)
+
+    def build_metadata(self, url: str, title: Optional[str], metas: List[tuple]) -> Dict:
+        """Construye la metadata a partir del título y los pares (name, content) de <meta>"""
+        metadata = {
+            'url': url,
+            'title': '',
+            'description': '',
+            'keywords': [],
+            'author': '',
+            'scraped_at': datetime.now().isoformat()
+        }
+
+        # Título
+        if title:
+            metadata['title'] = title.strip()
+
+        # Meta tags
+        for name, content in metas:
+            name = (name or '').lower()
+            content = content or ''
+
+            if name in ['description', 'og:description']:
+                metadata['description'] = content
+            elif name in ['keywords']:
+                metadata['keywords'] = [k.strip() for k in content.split(',')]
+            elif name in ['author']:
+                metadata['author'] = content
+
+        return metadata
+
+    @staticmethod
+    def parse_frontmatter(content: str) -> tuple[Dict, str]:
+        """Separa el frontmatter generado por add_frontmatter del cuerpo Markdown"""
+        if not content.startswith('---\n'):
+            return {}, content
+
+        end = content.find('\n---\n', 3)
+        if end == -1:
+            return {}, content
+
+        metadata = {}
+        key = None
+        for line in content[4:end].split('\n'):
+            if line.startswith('  - ') and key:
+                metadata.setdefault(key, []).append(line[4:])
+            elif ':' in line:
+                key, _, value = line.partition(':')
+                value = value.strip()
+                if len(value) >= 2 and value[0] == value[-1] == '"':
+                    value = value[1:-1].replace('\\"', '"')
+                metadata[key] = value or []
+
+        return metadata, content[end + 5:]
+
+    def add_frontmatter(self, content: str, metadata: Dict) -> str:
+        """Añade frontmatter YAML al contenido"""
+        frontmatter_lines = ['---']
+
+        for key, value in metadata.items():
+            if value:  # Solo añadir si tiene valor
+                if isinstance(value, list):
+                    if value:  # Solo si la lista no está vacía
+                        frontmatter_lines.append(f'{key}:')
+                        for item in value:
+                            frontmatter_lines.append(f'  - {item}')
+                else:
+                    # Escapar comillas en el valor
+                    safe_value = str(value).replace('"', '\\"')
+                    frontmatter_lines.append(f'{key}: "{safe_value}"')
+
+        frontmatter_lines.append('---')
+        frontmatter_lines.append('')
+
+        return '\n'.join(frontmatter_lines) + content
@@ -5,157 +5,587 @@ Utilidades para análisis y corrección de archivos Markdown
 
 import os
 import re
+import sys
+import json
+import hashlib
 import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple
 import logging
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class MarkdownAnalyzer:
-    """Analizador de archivos Markdown para detectar problemas comunes"""
+# Máximo de números de línea que se guardan por problema (el conteo es completo)
+MAX_REPORTED_LINES = 20
 
-    def __init__(self):
-        self.issues = []
+# Extensiones analizadas
+MARKDOWN_EXTENSIONS = ('.md', '.mdx')
 
-    def analyze_file(self, file_path: Path) -> Dict:
-        """Analiza un archivo Markdown y retorna problemas encontrados"""
-        try:
-            content = file_path.read_text(encoding='utf-8')
-            issues = []
+# Archivos por tarea enviada al pool de procesos
+ANALYZE_BATCH_SIZE = 64
 
-            # Análisis de problemas comunes
-            issues.extend(self._check_broken_links(content))
-            issues.extend(self._check_malformed_headers(content))
-            issues.extend(self._check_excessive_whitespace(content))
-            issues.extend(self._check_broken_tables(content))
-            issues.extend(self._check_unescaped_characters(content))
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
 
-            return {
-                'file': str(file_path),
-                'issues': issues,
-                'line_count': len(content.splitlines()),
-                'size_kb': file_path.stat().st_size / 1024
-            }
+# Cache de resultados: fuera del árbol analizado, un archivo por directorio
+LINT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'markdown_utils'
+)
 
-        except Exception as e:
-            logger.error(f"Error analizando {file_path}: {e}")
-            return {'file': str(file_path), 'issues': [f"Error: {e}"], 'line_count': 0, 'size_kb': 0}
+# Subir al cambiar la lógica del análisis (las reglas en sí ya entran en la huella)
+RULES_VERSION = 2
 
-    def _check_broken_links(self, content: str) -> List[str]:
-        """Detecta enlaces rotos o mal formados"""
-        issues = []
 
-        # Enlaces con espacios
-        if re.search(r'\[\s+[^\]]+\s+\]', content):
-            issues.append("Enlaces con espacios extras")
+class MarkdownRule:
+    """
+    Regla de análisis evaluada línea a línea.
 
-        # Enlaces vacíos
-        if re.search(r'\[\s*\]\s*\(\s*\)', content):
-            issues.append("Enlaces vacíos")
+    `test` solo se llama sobre las líneas que contienen `trigger` (una subcadena o
+    una tupla de subcadenas; None para todas), de modo que las reglas comparten una
+    única pasada por el archivo.
+    """
 
-        # Enlaces con URLs mal formadas
-        if re.search(r'\]\s*\(\s*[^http][^)]*\s+[^)]*\)', content):
-            issues.append("URLs con espacios")
+    def __init__(self, rule_id: str, message: str, pattern: str = None, trigger=None, flags: int = 0):
+        self.id = rule_id
+        self.message = message
+        self.trigger = trigger
+        self.pattern = pattern
+        self.flags = flags
+        if pattern is not None:
+            # El método ligado del patrón compilado evita una llamada extra por línea
+            self.test = re.compile(pattern, flags).search
 
-        return issues
+    def test(self, line: str) -> bool:
+        """Indica si la línea tiene el problema"""
+        raise NotImplementedError
 
-    def _check_malformed_headers(self, content: str) -> List[str]:
-        """Detecta encabezados mal formados"""
-        issues = []
+    def finish(self, lines: List[int], content: str) -> List[int]:
+        """Ajusta las líneas encontradas con información del documento completo"""
+        return lines
 
-        # Encabezados sin espacio
-        if re.search(r'^#{1,6}[^\s#]', content, re.MULTILINE):
-            issues.append("Encabezados sin espacio después de #")
 
-        # Encabezados con múltiples espacios
-        if re.search(r'^#{1,6}\s{2,}', content, re.MULTILINE):
-            issues.append("Encabezados con múltiples espacios")
+class TrailingWhitespaceRule(MarkdownRule):
+    """Espacios al final de la línea"""
 
-        return issues
+    def test(self, line: str) -> bool:
+        return line.endswith(' ')
 
-    def _check_excessive_whitespace(self, content: str) -> List[str]:
-        """Detecta espacios en blanco excesivos"""
-        issues = []
 
-        # Múltiples líneas vacías
-        if re.search(r'\n\s*\n\s*\n\s*\n', content):
-            issues.append("Múltiples líneas vacías consecutivas")
+class PipeTableRule(MarkdownRule):
+    """Filas de tabla con un único pipe"""
 
-        # Espacios al final de líneas
-        if re.search(r' +\n', content):
-            issues.append("Espacios al final de líneas")
+    def test(self, line: str) -> bool:
+        return line.count('|') == 1
 
-        # Tabs mezclados con espacios
-        if '\t' in content and '    ' in content:
-            issues.append("Mezcla de tabs y espacios")
 
-        return issues
+class MixedIndentRule(MarkdownRule):
+    """Líneas con tabs en un documento que también indenta con espacios"""
+
+    def test(self, line: str) -> bool:
+        return True
+
+    def finish(self, lines: List[int], content: str) -> List[int]:
+        return lines if '    ' in content else []
+
+
+class BlankRunRule(MarkdownRule):
+    """Bloques de `min_run` o más líneas vacías seguidas (se reporta la primera)"""
+
+    def __init__(self, rule_id: str, message: str, min_run: int = 3):
+        super().__init__(rule_id, message)
+        self.min_run = min_run
+
+    def test(self, line: str) -> bool:
+        return False
 
-    def _check_broken_tables(self, content: str) -> List[str]:
-        """Detecta tablas mal formadas"""
-        issues = []
 
-        # Tablas con pipes desalineados
-        table_lines = [line for line in content.split('\n') if '|' in line]
-        if table_lines:
-            for line in table_lines:
-                if line.count('|') == 1:  # Línea con un solo pipe
-                    issues.append("Tabla con pipes desalineados")
-                    break
+DEFAULT_RULES = [
+    MarkdownRule('link-spaces', "Enlaces con espacios extras", r'\[\s+[^\]]+\s+\]', trigger='['),
+    MarkdownRule('empty-link', "Enlaces vacíos", r'\[\s*\]\s*\(\s*\)', trigger='['),
+    MarkdownRule('url-spaces', "URLs con espacios", r'\]\s*\(\s*[^http][^)]*\s+[^)]*\)', trigger=']'),
+    MarkdownRule('header-no-space', "Encabezados sin espacio después de #", r'^#{1,6}[^\s#]', trigger='#'),
+    MarkdownRule('header-multi-space', "Encabezados con múltiples espacios", r'^#{1,6}\s{2,}', trigger='#'),
+    BlankRunRule('blank-lines', "Múltiples líneas vacías consecutivas"),
+    TrailingWhitespaceRule('trailing-spaces', "Espacios al final de líneas"),
+    MixedIndentRule('mixed-indent', "Mezcla de tabs y espacios", trigger='\t'),
+    PipeTableRule('table-pipes', "Tabla con pipes desalineados", trigger='|'),
+    MarkdownRule('unescaped-html', "Caracteres HTML sin escapar", r'[<>&](?![a-zA-Z]+;)', trigger=('<', '>', '&')),
+]
 
-        return issues
 
-    def _check_unescaped_characters(self, content: str) -> List[str]:
-        """Detecta caracteres que deberían estar escapados"""
+
+def rules_fingerprint(rules: Optional[List[MarkdownRule]] = None) -> str:
+    """Huella del conjunto de reglas: cambia si se añade, quita o modifica alguna"""
+    parts = [str(RULES_VERSION), str(MAX_REPORTED_LINES)]
+    for rule in (DEFAULT_RULES if rules is None else rules):
+        parts.append(repr((type(rule).__name__, rule.id, rule.message, rule.trigger,
+                           rule.pattern, rule.flags, getattr(rule, 'min_run', None))))
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+class MarkdownAnalyzer:
+    """Analizador de archivos Markdown para detectar problemas comunes"""
+
+    def __init__(self, rules: List[MarkdownRule] = None):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self._compile()
+
+    def add_rule(self, rule: MarkdownRule):
+        """Añade una regla a la pasada de análisis"""
+        self.rules.append(rule)
+        self._compile()
+
+    def _compile(self):
+        """Agrupa las reglas por disparador para evaluarlas en una sola pasada"""
+        groups = {}
+        self._blank_rules = []
+        for index, rule in enumerate(self.rules):
+            if isinstance(rule, BlankRunRule):
+                self._blank_rules.append((index, rule.min_run))
+            elif isinstance(rule.trigger, tuple):
+                for trigger in rule.trigger:
+                    groups.setdefault(trigger, []).append((index, rule.test))
+            else:
+                groups.setdefault(rule.trigger, []).append((index, rule.test))
+        self._always = groups.pop(None, [])
+        self._triggered = list(groups.items())
+
+    def scan(self, content: str) -> Tuple[List[Dict], int]:
+        """Recorre el contenido una vez y devuelve (problemas, número de líneas)"""
+        if not content:
+            return [], 0
+
+        hits = [[] for _ in self.rules]
+        always = self._always
+        triggered = self._triggered
+        blank_rules = self._blank_rules
+        blank_start = blank_run = 0
+        line_no = 0
+
+        for line in content.split('\n'):
+            line_no += 1
+            if not line or line.isspace():
+                if not blank_run:
+                    blank_start = line_no
+                blank_run += 1
+                if not line:
+                    continue
+            elif blank_run:
+                for index, min_run in blank_rules:
+                    if blank_run >= min_run:
+                        hits[index].append(blank_start)
+                blank_run = 0
+
+            for index, test in always:
+                if test(line):
+                    hits[index].append(line_no)
+            for trigger, tests in triggered:
+                if trigger in line:
+                    for index, test in tests:
+                        # Una regla con varios disparadores cuenta la línea una vez
+                        if test(line) and (not hits[index] or hits[index][-1] != line_no):
+                            hits[index].append(line_no)
+
+        # El fragmento vacío tras el último salto de línea no es una línea
+        if content.endswith('\n'):
+            line_no -= 1
+            blank_run -= 1
+        if blank_run > 0:
+            for index, min_run in blank_rules:
+                if blank_run >= min_run:
+                    hits[index].append(blank_start)
+
         issues = []
+        for rule, lines in zip(self.rules, hits):
+            if lines:
+                lines = rule.finish(lines, content)
+            if lines:
+                issues.append({
+                    'rule': rule.id,
+                    'message': rule.message,
+                    'count': len(lines),
+                    'lines': lines[:MAX_REPORTED_LINES]
+                })
+
+        return issues, line_no
+
+    def analyze_file(self, file_path: Path) -> Dict:
+        """Analiza un archivo Markdown y retorna problemas encontrados"""
+        try:
+            content = file_path.read_text(encoding='utf-8')
+            issues, line_count = self.scan(content)
+
+            return {
+                'file': str(file_path),
+                'issues': issues,
+                'line_count': line_count,
+                'size_kb': file_path.stat().st_size / 1024
+            }
+
+        except Exception as e:
+            logger.error(f"Error analizando {file_path}: {e}")
+            error = {'rule': 'error', 'message': f"Error: {e}", 'count': 1, 'lines': []}
+            return {'file': str(file_path), 'issues': [error], 'line_count': 0, 'size_kb': 0}
+
+
+def format_issue(issue: Dict) -> str:
+    """Texto de un problema con su número de apariciones y líneas"""
+    if not issue['lines']:
+        return issue['message']
+    lines = ', '.join(str(line) for line in issue['lines'])
+    if issue['count'] > len(issue['lines']):
+        lines += ', ...'
+    return f"{issue['message']} ({issue['count']}x, líneas {lines})"
+
+def iter_markdown_files(dir_path: Path) -> Iterator[Tuple[str, int, int]]:
+    """
+    Recorre el árbol una sola vez y produce (ruta, tamaño, mtime_ns) de cada .md/.mdx.
+
+    Usa os.scandir, así que cada archivo se consulta con un único stat; el orden es
+    estable (alfabético, directorio a directorio).
+    """
+    stack = [str(dir_path)]
+
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"No se pudo leer el directorio {directory}: {e}")
+            continue
+
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.endswith(MARKDOWN_EXTENSIONS) and entry.is_file():
+                stat = entry.stat()
+                yield entry.path, stat.st_size, stat.st_mtime_ns
+        stack.extend(reversed(subdirs))
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Agrupa un iterable en listas de hasta `size` elementos"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def default_cache_path(directory: str) -> str:
+    """Archivo de cache para `directory` en el directorio de cache del usuario"""
+    key = hashlib.sha1(os.path.abspath(directory).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(LINT_CACHE_DIR, f"{key}.json")
+
+
+class LintCache:
+    """
+    Resultados de analyze_file por archivo, indexados por ruta relativa.
+
+    Una entrada vale mientras no cambien el tamaño ni el mtime del archivo; el
+    cache entero se descarta si cambia la huella de las reglas. Borrar el archivo
+    fuerza un análisis completo.
+    """
+
+    def __init__(self, path: str, root: str, version: str):
+        self.path = str(path)
+        self.root = str(root)
+        self._prefix = os.path.join(self.root, '')
+        self.version = version
+        self.files: Dict[str, List] = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()
+        self._dirty = False
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == version:
+                    self.files = data.get('files', {})
+                else:
+                    self._dirty = True
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cache de análisis ilegible, se analizará todo: {e}")
+
+    def _key(self, path: str) -> str:
+        # Las rutas del recorrido cuelgan de la raíz: basta con quitar el prefijo
+        if path.startswith(self._prefix):
+            return path[len(self._prefix):]
+        return os.path.relpath(path, self.root)
+
+    def get(self, path: str, size: int, mtime_ns: int) -> Optional[Dict]:
+        """Devuelve el resultado guardado si el archivo no cambió"""
+        key = self._key(path)
+        self._seen.add(key)
+        entry = self.files.get(key)
+        if entry is None or entry[0] != size or entry[1] != mtime_ns:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {'file': path, 'issues': entry[2], 'line_count': entry[3], 'size_kb': entry[4]}
+
+    def put(self, path: str, size: int, mtime_ns: int, result: Dict):
+        # Los errores de lectura se reintentan en la siguiente ejecución
+        if any(issue['rule'] == 'error' for issue in result['issues']):
+            return
+        self.files[self._key(path)] = [size, mtime_ns, result['issues'], result['line_count'], result['size_kb']]
+        self._dirty = True
+
+    def save(self):
+        """Olvida los archivos que ya no existen y guarda el cache si cambió"""
+        # No basta comparar tamaños: los archivos con error se ven pero no se guardan
+        if not self._seen.issuperset(self.files):
+            self.files = {key: entry for key, entry in self.files.items() if key in self._seen}
+            self._dirty = True
+        if not self._dirty:
+            return
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.version, 'files': self.files}, f,
+                          ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el cache de análisis {self.path}: {e}")
 
-        # Caracteres especiales sin escapar en contextos problemáticos
-        if re.search(r'[<>&](?![a-zA-Z]+;)', content):
-            issues.append("Caracteres HTML sin escapar")
 
-        return issues
+# Analizador de cada proceso del pool (se crea en el initializer)
+_worker_analyzer = None
 
-def batch_analyze(directory: str) -> Dict:
-    """Analiza todos los archivos Markdown en un directorio"""
+
+def _init_worker(rules: Optional[List[MarkdownRule]]):
+    global _worker_analyzer
+    _worker_analyzer = MarkdownAnalyzer(rules)
+
+
+def _analyze_batch(paths: List[str]) -> List[Dict]:
+    return [_worker_analyzer.analyze_file(Path(path)) for path in paths]
+
+
+def iter_analyze(directory: str, workers: Optional[int] = None,
+                 rules: Optional[List[MarkdownRule]] = None,
+                 cache: Optional[LintCache] = None) -> Iterator[Dict]:
+    """
+    Analiza los archivos Markdown de un directorio y produce cada resultado al terminar.
+
+    Con `workers` > 1 los archivos se reparten por lotes en un pool de procesos y
+    solo hay unos pocos lotes en vuelo, así que la memoria no crece con el árbol.
+    Con varios procesos los resultados llegan en orden de finalización. Los
+    archivos sin cambios según `cache` no se vuelven a leer.
+    """
     dir_path = Path(directory)
 
     if not dir_path.exists():
         raise ValueError(f"Directorio no existe: {directory}")
 
-    analyzer = MarkdownAnalyzer()
-
-    # Encontrar archivos Markdown
-    md_files = list(dir_path.rglob("*.md"))
-    mdx_files = list(dir_path.rglob("*.mdx"))
-    all_files = md_files + mdx_files
-
-    if not all_files:
-        return {'files': [], 'summary': {'total_files': 0, 'total_issues': 0}}
+    workers = workers or os.cpu_count() or 1
+    changed = []
+
+    def iter_changed():
+        """Produce los resultados en cache y deja en `changed` los archivos a analizar"""
+        for path, size, mtime_ns in iter_markdown_files(dir_path):
+            cached = cache.get(path, size, mtime_ns) if cache else None
+            if cached is not None:
+                yield cached
+            else:
+                changed.append((path, size, mtime_ns))
+            if len(changed) >= ANALYZE_BATCH_SIZE:
+                yield list(changed)
+                changed.clear()
+        if changed:
+            yield list(changed)
+
+    def finish(batch, results):
+        if cache:
+            for (path, size, mtime_ns), result in zip(batch, results):
+                cache.put(path, size, mtime_ns, result)
+        return results
+
+    if workers == 1:
+        analyzer = MarkdownAnalyzer(rules)
+        for item in iter_changed():
+            if isinstance(item, dict):
+                yield item
+            else:
+                yield from finish(item, [analyzer.analyze_file(Path(path)) for path, _, _ in item])
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rules,)) as executor:
+        pending = {}
+
+        def collect(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                yield from finish(pending.pop(future), future.result())
+
+        for item in iter_changed():
+            if isinstance(item, dict):
+                yield item
+                continue
+            pending[executor.submit(_analyze_batch, [path for path, _, _ in item])] = item
+            if len(pending) >= workers * 2:
+                yield from collect(FIRST_COMPLETED)
+        while pending:
+            yield from collect(FIRST_COMPLETED)
+
+
+class AnalysisSummary:
+    """Agregados del análisis calculados incrementalmente, sin guardar los resultados"""
 
-    # Analizar archivos
+    def __init__(self):
+        self.total_files = 0
+        self.cached_files = 0
+        self.total_issues = 0
+        self.total_occurrences = 0
+        self.files_with_issues = 0
+        self.total_size_kb = 0.0
+        self.issues_by_rule = {}
+
+    def add(self, result: Dict):
+        """Acumula el resultado de un archivo"""
+        self.total_files += 1
+        self.total_size_kb += result['size_kb']
+        if result['issues']:
+            self.files_with_issues += 1
+        self.total_issues += len(result['issues'])
+        for issue in result['issues']:
+            self.total_occurrences += issue['count']
+            self.issues_by_rule[issue['message']] = self.issues_by_rule.get(issue['message'], 0) + issue['count']
+
+    def to_dict(self) -> Dict:
+        return {
+            'total_files': self.total_files,
+            'cached_files': self.cached_files,
+            'total_issues': self.total_issues,
+            'total_occurrences': self.total_occurrences,
+            'issues_by_rule': self.issues_by_rule,
+            'total_size_mb': self.total_size_kb / 1024,
+            'avg_size_kb': self.total_size_kb / self.total_files if self.total_files else 0.0,
+            'files_with_issues': self.files_with_issues
+        }
+
+
+class SarifWriter:
+    """
+    Escribe un reporte SARIF 2.1.0 en streaming.
+
+    Los resultados se vuelcan conforme llegan dentro del array `results`, de modo
+    que el reporte no se construye en memoria. Cada línea reportada de un problema
+    es un resultado SARIF (hasta MAX_REPORTED_LINES por problema y archivo).
+    """
+
+    def __init__(self, stream: IO[str], base_dir: str, rules: Optional[List[MarkdownRule]] = None):
+        self.stream = stream
+        self.base_dir = Path(base_dir)
+        self.count = 0
+        driver_rules = [
+            {'id': rule.id, 'shortDescription': {'text': rule.message}}
+            for rule in (DEFAULT_RULES if rules is None else rules)
+        ]
+        driver_rules.append({'id': 'error', 'shortDescription': {'text': "Error leyendo el archivo"}})
+        header = json.dumps({
+            'version': '2.1.0',
+            '$schema': SARIF_SCHEMA,
+            'runs': [{
+                'tool': {'driver': {'name': 'markdown_utils', 'rules': driver_rules}},
+                'results': []
+            }]
+        }, ensure_ascii=False)
+        # Abrir el array de resultados y cerrarlo en close()
+        self._footer = header[header.rindex('[]') + 1:]
+        self.stream.write(header[:header.rindex('[]') + 1])
+
+    def _uri(self, file_path: str) -> str:
+        try:
+            return Path(file_path).relative_to(self.base_dir).as_posix()
+        except ValueError:
+            return Path(file_path).as_posix()
+
+    def write(self, result: Dict):
+        """Añade los problemas de un archivo al reporte"""
+        uri = self._uri(result['file'])
+        for issue in result['issues']:
+            level = 'error' if issue['rule'] == 'error' else 'warning'
+            for line in issue['lines'] or [None]:
+                physical = {'artifactLocation': {'uri': uri}}
+                if line is not None:
+                    physical['region'] = {'startLine': line}
+                item = {
+                    'ruleId': issue['rule'],
+                    'level': level,
+                    'message': {'text': issue['message']},
+                    'locations': [{'physicalLocation': physical}]
+                }
+                self.stream.write((',' if self.count else '') + '\n' + json.dumps(item, ensure_ascii=False))
+                self.count += 1
+
+    def close(self):
+        self.stream.write('\n' + self._footer + '\n')
+
+
+def _open_output(path: str) -> IO[str]:
+    """Abre un archivo de salida ('-' es stdout)"""
+    if path == '-':
+        return sys.stdout
+    return open(path, 'w', encoding='utf-8')
+
+
+def batch_analyze(directory: str, workers: Optional[int] = 1, rules: Optional[List[MarkdownRule]] = None,
+                  jsonl_path: Optional[str] = None, sarif_path: Optional[str] = None,
+                  keep_results: bool = True, cache_path: Optional[str] = None) -> Dict:
+    """
+    Analiza todos los archivos Markdown en un directorio.
+
+    Los resultados se escriben según llegan en JSON-lines (`jsonl_path`) y/o SARIF
+    (`sarif_path`); con `keep_results=False` no se guardan y la memoria usada no
+    depende del número de archivos. Con `cache_path` solo se analizan los archivos
+    nuevos o modificados desde la ejecución anterior.
+    """
+    summary = AnalysisSummary()
     results = []
-    total_issues = 0
-
-    for file_path in all_files:
-        result = analyzer.analyze_file(file_path)
-        results.append(result)
-        total_issues += len(result['issues'])
-
-    # Resumen
-    summary = {
-        'total_files': len(all_files),
-        'total_issues': total_issues,
-        'total_size_mb': sum(r['size_kb'] for r in results) / 1024,
-        'avg_size_kb': sum(r['size_kb'] for r in results) / len(results),
-        'files_with_issues': len([r for r in results if r['issues']])
-    }
+    jsonl = sarif = sarif_stream = None
+    cache = LintCache(cache_path, directory, rules_fingerprint(rules)) if cache_path else None
+
+    try:
+        if jsonl_path:
+            jsonl = _open_output(jsonl_path)
+        if sarif_path:
+            sarif_stream = _open_output(sarif_path)
+            sarif = SarifWriter(sarif_stream, directory, rules)
+
+        for result in iter_analyze(directory, workers, rules, cache):
+            summary.add(result)
+            if keep_results:
+                results.append(result)
+            if jsonl:
+                jsonl.write(json.dumps(result, ensure_ascii=False) + '\n')
+            if sarif:
+                sarif.write(result)
+
+        if sarif:
+            sarif.close()
+        if cache:
+            cache.save()
+            summary.cached_files = cache.hits
+    finally:
+        for stream in (jsonl, sarif_stream):
+            if stream and stream is not sys.stdout:
+                stream.close()
 
     return {
         'files': results,
-        'summary': summary
+        'summary': summary.to_dict()
     }
 
 def print_analysis_report(analysis: Dict):
@@ -167,13 +597,22 @@ def print_analysis_report(analysis: Dict):
     print("           REPORTE DE ANÁLISIS MARKDOWN")
     print("="*60)
     print(f"📄 Total archivos:      {summary['total_files']}")
-    print(f"❌ Total problemas:     {summary['total_issues']}")
+    if summary.get('cached_files'):
+        print(f"♻️  Sin cambios:         {summary['cached_files']} (resultado en cache)")
+    print(f"❌ Total problemas:     {summary['total_issues']} ({summary.get('total_occurrences', 0)} apariciones)")
     print(f"📁 Archivos con issues: {summary['files_with_issues']}")
     print(f"💾 Tamaño total:        {summary['total_size_mb']:.2f} MB")
     print(f"📏 Tamaño promedio:     {summary['avg_size_kb']:.2f} KB")
     print("="*60)
 
     if summary['total_issues'] > 0:
+        print("\n📊 APARICIONES POR PROBLEMA:")
+        for message, count in sorted(summary.get('issues_by_rule', {}).items(), key=lambda item: -item[1]):
+            print(f"   {count:>8}  {message}")
+
+        if not files:
+            return
+
         print("\n🔍 ARCHIVOS CON PROBLEMAS:")
         print("-"*60)
 
@@ -182,7 +621,7 @@ def print_analysis_report(analysis: Dict):
                 print(f"\n📄 {file_data['file']}")
                 print(f"   Líneas: {file_data['line_count']}, Tamaño: {file_data['size_kb']:.1f} KB")
                 for issue in file_data['issues']:
-                    print(f"   ❌ {issue}")
+                    print(f"   ❌ {format_issue(issue)}")
     else:
         print("\n✅ ¡No se encontraron problemas!")
 
@@ -190,13 +629,27 @@ def main():
     parser = argparse.ArgumentParser(description="Analizador de archivos Markdown")
     parser.add_argument('directory', help='Directorio a analizar')
     parser.add_argument('--fix', action='store_true', help='Intentar corregir problemas automáticamente')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='Procesos de análisis (default: número de CPUs)')
+    parser.add_argument('--jsonl', metavar='RUTA',
+                        help="Escribir un resultado JSON por archivo según se analiza ('-' para stdout)")
+    parser.add_argument('--sarif', metavar='RUTA', help="Escribir un reporte SARIF 2.1.0 para CI ('-' para stdout)")
+    parser.add_argument('--summary-only', action='store_true',
+                        help='No guardar el detalle por archivo en memoria; solo el resumen')
+    parser.add_argument('--cache', metavar='RUTA',
+                        help=f'Archivo de cache de resultados (default: un archivo por directorio en {LINT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Analizar todos los archivos sin usar el cache')
 
     args = parser.parse_args()
 
     try:
-        # Analizar
-        analysis = batch_analyze(args.directory)
-        print_analysis_report(analysis)
+        # Analizar; con salida en streaming el detalle ya queda en el archivo
+        streaming = args.summary_only or args.jsonl or args.sarif
+        cache_path = None if args.no_cache else (args.cache or default_cache_path(args.directory))
+        analysis = batch_analyze(args.directory, workers=args.workers, jsonl_path=args.jsonl,
+                                 sarif_path=args.sarif, keep_results=not streaming, cache_path=cache_path)
+        if '-' not in (args.jsonl, args.sarif):
+            print_analysis_report(analysis)
 
         # Corregir si se solicita
         if args.fix and analysis['summary']['total_issues'] > 0:
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Métricas del rastreo: histogramas de latencia por etapa, contadores y exportación
+en JSON o formato de texto de Prometheus
+"""
+
+import json
+import time
+import bisect
+from pathlib import Path
+from typing import Dict, Optional, Union
+from datetime import datetime
+
+from storage import write_file_atomic
+
+# Cubetas logarítmicas de latencia: de 0.1 ms a ~3 min con un 20 % de resolución
+LATENCY_BUCKETS = tuple(0.0001 * 1.2 ** i for i in range(80))
+
+# Percentiles que se muestran en el reporte y se exportan
+METRIC_PERCENTILES = (0.5, 0.95, 0.99)
+
+class LatencyHistogram:
+    """Histograma de latencias en cubetas fijas: memoria constante y percentiles aproximados"""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Estima el percentil q (0-1) interpolando dentro de su cubeta"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                # Los extremos observados acotan la cubeta (exacto con pocas muestras)
+                lower = max(LATENCY_BUCKETS[index - 1] if index else 0.0, self.min)
+                upper = min(LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+
+        return self.max
+
+    def summary(self) -> Dict:
+        summary = {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'mean': round(self.total / self.count, 6) if self.count else 0.0,
+            'min': round(self.min, 6) if self.count else 0.0,
+            'max': round(self.max, 6)
+        }
+        for q in METRIC_PERCENTILES:
+            summary[f"p{q * 100:g}"] = round(self.percentile(q), 6)
+        return summary
+
+class _StageTimer:
+    """Context manager que mide una etapa y la registra solo si termina sin error"""
+
+    __slots__ = ('metrics', 'stage', 'started')
+
+    def __init__(self, metrics: 'CrawlMetrics', stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.metrics.observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+class _InFlight:
+    """Context manager que mantiene un gauge de trabajo en curso y su máximo"""
+
+    __slots__ = ('metrics', 'name')
+
+    def __init__(self, metrics: 'CrawlMetrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        gauges = self.metrics.gauges
+        value = gauges.get(self.name, 0) + 1
+        gauges[self.name] = value
+        if value > self.metrics.gauge_peaks.get(self.name, 0):
+            self.metrics.gauge_peaks[self.name] = value
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.gauges[self.name] -= 1
+        return False
+
+class CrawlMetrics:
+    """Métricas del rastreo: tiempos por etapa, contadores y trabajo en curso.
+
+    Solo se actualiza desde el event loop; los hilos de descarga y los procesos
+    de conversión devuelven sus tiempos en un dict, así que no necesita locks.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.responses: Dict[int, int] = {}
+        self.gauges: Dict[str, int] = {}
+        self.gauge_peaks: Dict[str, int] = {}
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def observe_timings(self, timings: Dict[str, float]):
+        """Registra los tiempos medidos fuera del loop (hilos, procesos, trazas HTTP)"""
+        for stage, seconds in timings.items():
+            self.observe(stage, seconds)
+
+    def timer(self, stage: str) -> _StageTimer:
+        return _StageTimer(self, stage)
+
+    def in_flight(self, name: str) -> _InFlight:
+        return _InFlight(self, name)
+
+    def increment(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_response(self, status: int, size: int = 0):
+        self.responses[status] = self.responses.get(status, 0) + 1
+        if size:
+            self.increment('bytes_downloaded', size)
+
+    def to_dict(self, totals: Optional[Dict[str, int]] = None) -> Dict:
+        """Exporta todas las métricas como un dict serializable a JSON"""
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'uptime_seconds': round(time.time() - self.started, 3),
+            'totals': totals or {},
+            'counters': dict(self.counters),
+            'responses': {str(status): count for status, count in sorted(self.responses.items())},
+            'in_flight': {
+                name: {'current': self.gauges.get(name, 0), 'max': peak}
+                for name, peak in self.gauge_peaks.items()
+            },
+            'stages': {stage: histogram.summary() for stage, histogram in self.stages.items()}
+        }
+
+    def to_prometheus(self, totals: Optional[Dict[str, int]] = None, prefix: str = 'docs_scraper') -> str:
+        """Exporta las métricas en formato de texto de Prometheus (node_exporter textfile)"""
+        lines = [
+            f"# TYPE {prefix}_uptime_seconds gauge",
+            f"{prefix}_uptime_seconds {time.time() - self.started:.3f}"
+        ]
+
+        for name, value in (totals or {}).items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+
+        if self.responses:
+            lines.append(f"# TYPE {prefix}_responses_total counter")
+            for status, count in sorted(self.responses.items()):
+                lines.append(f'{prefix}_responses_total{{status="{status}"}} {count}')
+
+        if self.gauge_peaks:
+            lines.append(f"# TYPE {prefix}_in_flight gauge")
+            for name in self.gauge_peaks:
+                lines.append(f'{prefix}_in_flight{{kind="{name}"}} {self.gauges.get(name, 0)}')
+            lines.append(f"# TYPE {prefix}_in_flight_max gauge")
+            for name, peak in self.gauge_peaks.items():
+                lines.append(f'{prefix}_in_flight_max{{kind="{name}"}} {peak}')
+
+        if self.stages:
+            lines.append(f"# TYPE {prefix}_stage_seconds summary")
+            for stage, histogram in self.stages.items():
+                for q in METRIC_PERCENTILES:
+                    lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q:g}"}} {histogram.percentile(q):.6f}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: Union[str, Path], totals: Optional[Dict[str, int]] = None):
+        """Escribe las métricas de forma atómica: JSON si la ruta termina en .json, Prometheus si no"""
+        if str(path).endswith('.json'):
+            data = json.dumps(self.to_dict(totals), indent=2).encode('utf-8')
+        else:
+            data = self.to_prometheus(totals).encode('utf-8')
+        write_file_atomic(path, data)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Limitación adaptativa del ritmo de peticiones por host (token bucket).
+
+La lógica es común a los dos scrapers; cada uno solo añade la espera
+(`time.sleep` con hilos o `asyncio.sleep` con asyncio) alrededor de `reserve`.
+"""
+
+import time
+import logging
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Códigos con los que el servidor pide bajar el ritmo
+THROTTLE_STATUSES = {429, 503}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convierte una cabecera Retry-After (segundos o fecha HTTP) en segundos"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(tz=retry_at.tzinfo)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Token bucket adaptativo para un host.
+
+    El ritmo sube de forma aditiva mientras la latencia se mantiene sana y baja de
+    forma multiplicativa cuando la latencia se degrada o el servidor responde
+    429/503. Retry-After bloquea el host durante el tiempo indicado.
+
+    No bloquea ni sincroniza: quien lo use debe serializar las llamadas y esperar
+    los segundos que devuelve `reserve`.
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1, max_rate: Optional[float] = None, min_rate: float = 0.05):
+        self.rate = rate  # None = sin límite hasta que el servidor pida frenar
+        self.burst = max(1, burst)
+        self.max_rate = max_rate or (rate * 4 if rate else None)
+        self.min_rate = min_rate
+        self.step = (rate or 1.0) * 0.05
+
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled_in_a_row = 0
+        self.latency_ewma: Optional[float] = None
+        self.latency_baseline: Optional[float] = None
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        """Toma un token si hay uno; si no, devuelve los segundos a esperar antes de reintentar"""
+        now = time.monotonic() if now is None else now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.rate is None:
+            return 0.0
+
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def on_success(self, latency: float):
+        """Ajusta el ritmo según la latencia observada"""
+        self.throttled_in_a_row = 0
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        self.latency_baseline = (
+            self.latency_ewma if self.latency_baseline is None
+            else min(self.latency_baseline, self.latency_ewma)
+        )
+
+        if self.rate is None:
+            return
+
+        if self.latency_ewma > 2 * self.latency_baseline:
+            # El servidor empieza a saturarse: frenar un poco
+            self.rate = max(self.min_rate, self.rate * 0.9)
+        else:
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+    def on_throttled(self, retry_after: Optional[float] = None, now: Optional[float] = None) -> float:
+        """Reacciona a un 429/503: reduce el ritmo, bloquea el host y devuelve la pausa aplicada"""
+        now = time.monotonic() if now is None else now
+        self.throttled_in_a_row += 1
+        if self.rate is None:
+            self.rate = float(self.burst)
+            self.max_rate = self.rate * 4
+        self.rate = max(self.min_rate, self.rate * 0.5)
+        self.tokens = 0.0
+
+        backoff = retry_after if retry_after is not None else min(60.0, 2.0 ** self.throttled_in_a_row)
+        self.blocked_until = max(self.blocked_until, now + backoff)
+        logger.warning(f"Servidor saturado, esperando {backoff:.1f}s (nuevo ritmo: {self.rate:.2f} req/s)")
+        return backoff
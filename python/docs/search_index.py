@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Índice de búsqueda de texto completo (SQLite FTS5) sobre las páginas guardadas
+"""
+
+import os
+import hashlib
+import sqlite3
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from datetime import datetime
+
+from markdown_processing import MarkdownProcessor
+from sinks import FileSink
+from storage import connect_sqlite, scan_markdown_files
+
+logger = logging.getLogger('advanced_scraper.search_index')
+
+# Índice de búsqueda de texto completo sobre la salida
+SEARCH_INDEX_FILE = '.search_index.sqlite'
+
+# Campos indexados (frontmatter de extract_metadata + cuerpo) y su peso en el ranking bm25
+SEARCH_FIELDS = ('title', 'description', 'keywords', 'author', 'url', 'body')
+SEARCH_WEIGHTS = (10.0, 4.0, 4.0, 1.0, 2.0, 1.0)
+
+def _sqlite_has_fts5() -> bool:
+    """Indica si el SQLite enlazado incluye el módulo FTS5"""
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE probe USING fts5(text)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+FTS5_AVAILABLE = _sqlite_has_fts5()
+
+class SearchIndex:
+    """Índice invertido de texto completo (SQLite FTS5) sobre las páginas guardadas.
+
+    Cada página se indexa por su ruta de salida con los campos del
+    frontmatter y el cuerpo; el hash del contenido evita reindexar páginas
+    sin cambios. `source` distingue las páginas de archivos .md (que
+    `sync_directory` puede podar) de las escritas en salidas de archivo único.
+    """
+
+    def __init__(self, path: Union[str, Path], shared: bool = False):
+        self.path = str(path)
+        self.updated = 0
+        self.unchanged = 0
+        self.removed = 0
+
+        # El escritor en segundo plano indexa desde su propio hilo (nunca a la vez que otro)
+        self._conn = connect_sqlite(self.path, shared, check_same_thread=False)
+        try:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                'id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, content_hash TEXT, '
+                'size INTEGER, mtime_ns INTEGER, source TEXT, indexed_at TEXT)'
+            )
+            self._conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5("
+                f"{', '.join(SEARCH_FIELDS)}, tokenize='unicode61 remove_diacritics 2')"
+            )
+            self._conn.commit()
+        except sqlite3.OperationalError as e:
+            self._conn.close()
+            raise RuntimeError(f"SQLite sin soporte FTS5 ({sqlite3.sqlite_version}): {e}")
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa varias actualizaciones en una sola transacción"""
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def update(self, name: str, content: str, source: str, size: Optional[int] = None, mtime_ns: Optional[int] = None):
+        """Indexa (o reindexa) una página si su contenido cambió"""
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        row = self._conn.execute('SELECT id, content_hash FROM pages WHERE path = ?', (name,)).fetchone()
+
+        if row is not None and row[1] == content_hash:
+            # Mismo contenido: solo se refresca el stat para el siguiente sync
+            self._conn.execute('UPDATE pages SET size = ?, mtime_ns = ? WHERE id = ?', (size, mtime_ns, row[0]))
+            self.unchanged += 1
+            return
+
+        metadata, body = MarkdownProcessor.parse_frontmatter(content)
+        values = [metadata.get(key, '') for key in SEARCH_FIELDS[:-1]] + [body]
+        values = [', '.join(value) if isinstance(value, list) else value for value in values]
+        now = datetime.now().isoformat()
+
+        if row is None:
+            page_id = self._conn.execute(
+                'INSERT INTO pages (path, content_hash, size, mtime_ns, source, indexed_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (name, content_hash, size, mtime_ns, source, now)
+            ).lastrowid
+        else:
+            page_id = row[0]
+            self._conn.execute(
+                'UPDATE pages SET content_hash = ?, size = ?, mtime_ns = ?, source = ?, indexed_at = ? WHERE id = ?',
+                (content_hash, size, mtime_ns, source, now, page_id)
+            )
+            self._conn.execute('DELETE FROM pages_fts WHERE rowid = ?', (page_id,))
+
+        placeholders = ', '.join('?' * len(SEARCH_FIELDS))
+        self._conn.execute(
+            f"INSERT INTO pages_fts (rowid, {', '.join(SEARCH_FIELDS)}) VALUES (?, {placeholders})",
+            [page_id] + values
+        )
+        self.updated += 1
+
+    def update_many(self, pages: List[tuple], source: str):
+        """Indexa un lote de páginas (nombre, contenido) en una transacción"""
+        with self.transaction():
+            for name, content in pages:
+                self.update(name, content, source)
+
+    def remove(self, name: str):
+        """Quita una página del índice"""
+        row = self._conn.execute('SELECT id FROM pages WHERE path = ?', (name,)).fetchone()
+        if row is not None:
+            self._conn.execute('DELETE FROM pages_fts WHERE rowid = ?', (row[0],))
+            self._conn.execute('DELETE FROM pages WHERE id = ?', (row[0],))
+            self.removed += 1
+
+    def sync_directory(self, output_dir: Union[str, Path]):
+        """Pone al día el índice con los .md/.mdx de un directorio.
+
+        Solo se leen los archivos cuyo tamaño o mtime cambió desde el último
+        sync, y se quitan las páginas de archivos que ya no existen.
+        """
+        root = Path(output_dir)
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self._conn.execute(
+                'SELECT path, size, mtime_ns FROM pages WHERE source = ?', (FileSink.format,)
+            )
+        }
+
+        seen = set()
+        with self.transaction():
+            for path, size, mtime_ns in scan_markdown_files(root):
+                name = Path(os.path.relpath(path, root)).as_posix()
+                seen.add(name)
+                if known.get(name) == (size, mtime_ns):
+                    self.unchanged += 1
+                    continue
+                try:
+                    content = Path(path).read_text(encoding='utf-8')
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.warning(f"No se pudo indexar {path}: {e}")
+                    continue
+                self.update(name, content, FileSink.format, size, mtime_ns)
+
+            for name in known.keys() - seen:
+                self.remove(name)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Busca páginas (sintaxis FTS5) ordenadas por relevancia bm25"""
+        sql = (
+            "SELECT pages.path, pages_fts.url, pages_fts.title, "
+            "snippet(pages_fts, 5, '[', ']', '…', 16), "
+            f"bm25(pages_fts, {', '.join(map(str, SEARCH_WEIGHTS))}) AS rank "
+            "FROM pages_fts JOIN pages ON pages.id = pages_fts.rowid "
+            "WHERE pages_fts MATCH ? ORDER BY rank LIMIT ?"
+        )
+        try:
+            rows = self._conn.execute(sql, (query, limit)).fetchall()
+        except sqlite3.OperationalError:
+            # Sintaxis FTS5 inválida (guiones, comillas sueltas...): buscar los términos literales
+            literal = ' '.join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+            rows = self._conn.execute(sql, (literal, limit)).fetchall() if literal else []
+
+        return [
+            {'path': path, 'url': url, 'title': title, 'snippet': ' '.join(snippet.split()), 'score': -rank}
+            for path, url, title, snippet, rank in rows
+        ]
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
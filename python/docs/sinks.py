@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Salida de páginas: un archivo por página o un único JSONL/tar/zip, escrita por lotes
+desde un hilo en segundo plano
+"""
+
+import io
+import os
+import gzip
+import json
+import tarfile
+import zipfile
+import warnings
+import threading
+import time
+import asyncio
+import itertools
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Set, Dict, List, Optional
+
+from markdown_processing import MarkdownProcessor
+
+if TYPE_CHECKING:
+    # search_index importa FileSink de este módulo
+    from search_index import SearchIndex
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger('advanced_scraper.sinks')
+
+# Formatos de salida: un archivo por página o un único archivo secuencial
+OUTPUT_FORMATS = ('files', 'jsonl', 'tar', 'zip')
+
+# Contenido pendiente de escribir (caracteres) a partir del cual el rastreo espera al disco
+OUTPUT_MAX_PENDING = 32 * 1024 * 1024
+
+def _fsync_directory(path: Path):
+    """Persiste las entradas nuevas de un directorio (no disponible en Windows)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _next_free_path(path: Path) -> Path:
+    """Primera ruta libre de la serie pages.tar.zst, pages.2.tar.zst, pages.3.tar.zst..."""
+    if not path.exists():
+        return path
+
+    stem, _, suffix = path.name.partition('.')
+    part = 2
+    while (path.parent / f"{stem}.{part}.{suffix}").exists():
+        part += 1
+    return path.parent / f"{stem}.{part}.{suffix}"
+
+class FileSink:
+    """Un archivo Markdown por página bajo output_dir.
+
+    Con `fsync` los archivos de un lote quedan abiertos hasta el flush, que
+    los sincroniza juntos (y sus directorios) en lugar de uno por página.
+    """
+
+    format = 'files'
+
+    def __init__(self, output_dir: Path, fsync: bool = True):
+        self.path = output_dir
+        self.index_path = None
+        self.fsync = fsync
+        self._created_dirs: Set[Path] = set()
+        self._open_files = []
+        self._touched_dirs: Set[Path] = set()
+
+    def write(self, name: str, content: str):
+        path = self.path / name
+        if path.parent not in self._created_dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(path.parent)
+
+        f = open(path, 'w', encoding='utf-8')
+        f.write(content)
+        if self.fsync:
+            self._open_files.append(f)
+            self._touched_dirs.add(path.parent)
+        else:
+            f.close()
+
+    def flush(self):
+        try:
+            for f in self._open_files:
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            for f in self._open_files:
+                f.close()
+            self._open_files.clear()
+
+        for directory in self._touched_dirs:
+            _fsync_directory(directory)
+        self._touched_dirs.clear()
+
+    def close(self):
+        self.flush()
+
+class JsonlSink:
+    """Corpus JSON Lines: un objeto por página con los campos del frontmatter como claves.
+
+    Se abre en modo append; si una página se reescribe (--refresh), la línea
+    más reciente prevalece.
+    """
+
+    format = 'jsonl'
+
+    def __init__(self, path: Path, fsync: bool = True):
+        self.path = path
+        self.index_path = Path(f"{path}.paths")
+        self.fsync = fsync
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, name: str, content: str):
+        metadata, body = MarkdownProcessor.parse_frontmatter(content)
+        record = {'path': name, **metadata, 'content': body}
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def flush(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+class TarSink:
+    """Archivo tar escrito en streaming, comprimido con zstd (o gzip sin zstandard).
+
+    Un tar comprimido no admite append: cada ejecución escribe una parte
+    nueva (pages.tar.zst, pages.2.tar.zst...) y la más reciente prevalece.
+    El tar escribe directamente en el compresor (sin el búfer del modo 'w|'),
+    así que tras cada flush todo lo escrito está en disco y, si el proceso
+    muere, el archivo se puede leer hasta el último lote.
+    """
+
+    format = 'tar'
+
+    def __init__(self, path: Path, fsync: bool = True):
+        self.index_path = Path(f"{path}.paths")
+        self.path = _next_free_path(path)
+        self.fsync = fsync
+        self._raw = open(self.path, 'wb')
+        if ZSTD_AVAILABLE:
+            self._compressor = zstandard.ZstdCompressor(level=10).stream_writer(self._raw)
+        else:
+            self._compressor = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        self._tar = tarfile.open(fileobj=self._compressor, mode='w')
+
+    def write(self, name: str, content: str):
+        data = content.encode('utf-8')
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def flush(self):
+        # Cerrar el bloque zstd (o hacer un sync flush de gzip) saca del
+        # compresor todo lo escrito hasta ahora
+        if ZSTD_AVAILABLE:
+            self._compressor.flush(zstandard.FLUSH_BLOCK)
+        else:
+            self._compressor.flush()
+        self._raw.flush()
+        if self.fsync:
+            os.fsync(self._raw.fileno())
+
+    def close(self):
+        self._tar.close()
+        self._compressor.close()
+        self._raw.close()
+
+class ZipSink:
+    """Archivo zip en modo append (el índice central se escribe al cerrar)"""
+
+    format = 'zip'
+
+    def __init__(self, path: Path, fsync: bool = True):
+        self.path = path
+        self.index_path = Path(f"{path}.paths")
+        self.fsync = fsync
+        self._zip = zipfile.ZipFile(path, 'a', compression=zipfile.ZIP_DEFLATED, compresslevel=6)
+
+    def write(self, name: str, content: str):
+        with warnings.catch_warnings():
+            # Una página reescrita se añade de nuevo: la última entrada prevalece
+            warnings.simplefilter('ignore', UserWarning)
+            self._zip.writestr(name, content)
+
+    def flush(self):
+        self._zip.fp.flush()
+        if self.fsync:
+            os.fsync(self._zip.fp.fileno())
+
+    def close(self):
+        self._zip.close()
+
+def create_output_sink(output_dir: Path, output_format: str, suffix: str = '', fsync: bool = True):
+    """Crea el sink de un formato de salida (`suffix` distingue workers en los de archivo único)"""
+    if output_format == 'files':
+        return FileSink(output_dir, fsync)
+    if output_format == 'jsonl':
+        return JsonlSink(output_dir / f"corpus{suffix}.jsonl", fsync)
+    if output_format == 'tar':
+        return TarSink(output_dir / f"pages{suffix}.tar.{'zst' if ZSTD_AVAILABLE else 'gz'}", fsync)
+    if output_format == 'zip':
+        return ZipSink(output_dir / f"pages{suffix}.zip", fsync)
+    raise ValueError(f"Formato de salida desconocido: {output_format} (opciones: {', '.join(OUTPUT_FORMATS)})")
+
+class OutputWriter:
+    """Escritor write-behind: un único hilo vuelca las páginas al sink por lotes.
+
+    El event loop solo encola; el hilo toma lo pendiente (hasta `batch_size`
+    páginas), lo escribe de forma secuencial y sincroniza el lote con un
+    único flush/fsync. Una página encolada de nuevo antes de escribirse se
+    escribe una sola vez, con su última versión. Si lo pendiente supera
+    `max_pending` caracteres, `put` espera a que el disco avance en lugar de
+    acumular memoria sin límite. En las salidas de archivo único los nombres
+    escritos se añaden a `<archivo>.paths` para que un rastreo reanudado
+    sepa qué páginas ya están en la salida. Con `search_index` cada lote
+    escrito se indexa también desde el mismo hilo.
+
+    `put` acepta un callback `on_written(error)` que se llama (en el event
+    loop) cuando el lote de la página está sincronizado, con error None, o
+    cuando su escritura falla, con la excepción: así el rastreo solo da una
+    URL por visitada cuando su salida está en disco.
+    """
+
+    def __init__(
+        self,
+        sink,
+        batch_size: int = 64,
+        max_pending: int = OUTPUT_MAX_PENDING,
+        search_index: Optional['SearchIndex'] = None
+    ):
+        self.sink = sink
+        self.search_index = search_index
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.names: Set[str] = set()
+        if sink.index_path is not None and sink.index_path.exists():
+            self.names.update(sink.index_path.read_text(encoding='utf-8').splitlines())
+
+        self.written = 0
+        self.batches = 0
+        self.coalesced = 0
+        self.stalls = 0
+        self._error: Optional[Exception] = None
+        self._index = open(sink.index_path, 'a', encoding='utf-8') if sink.index_path is not None else None
+
+        # Páginas pendientes por nombre (en orden de llegada) con sus callbacks, y su tamaño total
+        self._pending: Dict[str, tuple] = {}
+        self._pending_size = 0
+        self._closing = False
+        self._condition = threading.Condition()
+
+        # Aviso al event loop cuando el hilo libera espacio (backpressure)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._drained: Optional[asyncio.Event] = None
+
+        self._thread = threading.Thread(target=self._run, name='output-writer', daemon=True)
+        self._thread.start()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def _enqueue(self, name: str, content: str, on_written: Optional[Callable] = None):
+        """Añade una página a lo pendiente (con el lock tomado)"""
+        callbacks = []
+        previous = self._pending.pop(name, None)
+        if previous is not None:
+            # La versión anterior no llega a escribirse: sus callbacks esperan a la nueva
+            self._pending_size -= len(previous[0])
+            callbacks = previous[1]
+            self.coalesced += 1
+        if on_written is not None:
+            callbacks.append(on_written)
+        self._pending[name] = (content, callbacks)
+        self._pending_size += len(content)
+        self.names.add(name)
+        self._condition.notify()
+
+    def submit(self, name: str, content: str):
+        """Encola una página sin esperar (para código síncrono)"""
+        if self._error is not None:
+            raise self._error
+        with self._condition:
+            self._enqueue(name, content)
+
+    async def put(self, name: str, content: str, on_written: Optional[Callable] = None):
+        """Encola una página; espera si el disco va por detrás de `max_pending`"""
+        if self._drained is None:
+            self._loop = asyncio.get_running_loop()
+            self._drained = asyncio.Event()
+
+        while True:
+            if self._error is not None:
+                raise self._error
+            with self._condition:
+                if self._pending_size < self.max_pending or not self._pending:
+                    self._enqueue(name, content, on_written)
+                    return
+                self._drained.clear()
+            self.stalls += 1
+            await self._drained.wait()
+
+    def _notify_drained(self):
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._drained.set)
+            except RuntimeError:
+                # El event loop ya terminó: nadie espera
+                pass
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closing:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                names = list(itertools.islice(self._pending, self.batch_size))
+                batch = [(name, *self._pending.pop(name)) for name in names]
+            pages = [(name, content) for name, content, _ in batch]
+
+            if self._error is None:
+                try:
+                    for name, content in pages:
+                        self.sink.write(name, content)
+                    self.sink.flush()
+                    if self._index is not None:
+                        self._index.write(''.join(f"{name}\n" for name, _ in pages))
+                        self._index.flush()
+                    self.written += len(pages)
+                    self.batches += 1
+                except Exception as e:
+                    logger.error(f"Error escribiendo en {self.sink.path}: {e}")
+                    self._error = e
+
+            if self.search_index is not None and self._error is None:
+                try:
+                    self.search_index.update_many(pages, self.sink.format)
+                except Exception as e:
+                    # La salida sigue; el índice se puede reconstruir con --build-index
+                    logger.error(f"Error indexando en {self.search_index.path}, se desactiva el índice: {e}")
+                    self.search_index = None
+
+            with self._condition:
+                self._pending_size -= sum(len(content) for _, content in pages)
+                if self._error is not None:
+                    # Las páginas del lote no están en la salida
+                    self.names.difference_update(name for name, _ in pages if name not in self._pending)
+            self._notify_written([callback for _, _, callbacks in batch for callback in callbacks], self._error)
+            self._notify_drained()
+
+    def _notify_written(self, callbacks: List[Callable], error: Optional[Exception]):
+        """Avisa del resultado de un lote a los callbacks de sus páginas"""
+        for callback in callbacks:
+            if self._loop is None:
+                self._call(callback, error)
+                continue
+            try:
+                self._loop.call_soon_threadsafe(self._call, callback, error)
+            except RuntimeError:
+                # El event loop ya terminó
+                self._call(callback, error)
+
+    @staticmethod
+    def _call(callback: Callable, error: Optional[Exception]):
+        try:
+            callback(error)
+        except Exception as e:
+            logger.error(f"Error en el aviso de página escrita: {e}")
+
+    def close(self):
+        """Vacía lo pendiente, cierra el sink y propaga cualquier error de escritura"""
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join()
+        self.sink.close()
+        if self._index is not None:
+            self._index.close()
+        logger.info(
+            f"Salida: {self.written} páginas en {self.batches} lotes "
+            f"({self.coalesced} reescrituras fusionadas, {self.stalls} esperas por disco) -> {self.sink.path}"
+        )
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Utilidades para descubrir URLs de documentación a partir de robots.txt y sitemaps
+"""
+
+import gzip
+import argparse
+import logging
+import xml.etree.ElementTree as ET
+from typing import Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse, urljoin
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Firma de un archivo gzip
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _local_name(tag: str) -> str:
+    """Quita el namespace de una etiqueta XML ({ns}loc -> loc)"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def find_sitemaps(base_url: str, session: Optional[requests.Session] = None, timeout: float = 10) -> List[str]:
+    """Obtiene las URLs de sitemap declaradas en robots.txt (o /sitemap.xml por defecto)"""
+    session = session or requests.Session()
+    parsed = urlparse(base_url)
+    root = f"{parsed.scheme}://{parsed.netloc}"
+    sitemaps = []
+
+    try:
+        response = session.get(f"{root}/robots.txt", timeout=timeout)
+        if response.status_code == 200:
+            for line in response.text.splitlines():
+                key, _, value = line.partition(':')
+                if key.strip().lower() == 'sitemap' and value.strip():
+                    sitemaps.append(urljoin(root, value.strip()))
+    except requests.RequestException as e:
+        logger.warning(f"No se pudo leer robots.txt de {root}: {e}")
+
+    if not sitemaps:
+        sitemaps.append(f"{root}/sitemap.xml")
+
+    return sitemaps
+
+
+class _PrefixedReader:
+    """Lector mínimo que antepone los bytes ya leídos al resto del stream"""
+
+    def __init__(self, head: bytes, stream):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if self.head:
+            if size is None or size < 0:
+                data, self.head = self.head + self.stream.read(), b''
+            else:
+                data, self.head = self.head[:size], self.head[size:]
+            return data
+        return self.stream.read(size)
+
+
+def _open_stream(response: requests.Response, url: str):
+    """Devuelve un stream de bytes descomprimido del cuerpo de la respuesta"""
+    # Content-Encoding: gzip lo resuelve urllib3 al leer
+    response.raw.decode_content = True
+    head = response.raw.read(2)
+    stream = _PrefixedReader(head, response.raw)
+
+    # Sitemaps .xml.gz servidos como archivo comprimido
+    if url.endswith('.gz') or head == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream)
+
+    return stream
+
+
+def iter_sitemap(
+    url: str,
+    session: Optional[requests.Session] = None,
+    timeout: float = 30,
+    max_depth: int = 3,
+    _seen: Optional[Set[str]] = None
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Recorre un sitemap (o índice de sitemaps) de forma incremental.
+
+    Produce tuplas (url, lastmod) sin cargar el documento completo en memoria;
+    los índices se siguen recursivamente hasta `max_depth` niveles.
+    """
+    session = session or requests.Session()
+    seen = _seen if _seen is not None else set()
+    if url in seen or max_depth < 0:
+        return
+    seen.add(url)
+
+    child_sitemaps = []
+
+    try:
+        with session.get(url, timeout=timeout, stream=True) as response:
+            if response.status_code != 200:
+                logger.warning(f"Sitemap no disponible {url}: código {response.status_code}")
+                return
+
+            root = None
+            loc = lastmod = None
+            for event, elem in ET.iterparse(_open_stream(response, url), events=('start', 'end')):
+                if root is None:
+                    root = elem
+                    continue
+                if event != 'end':
+                    continue
+
+                name = _local_name(elem.tag)
+                if name == 'loc':
+                    loc = (elem.text or '').strip()
+                elif name == 'lastmod':
+                    lastmod = (elem.text or '').strip() or None
+                elif name in ('url', 'sitemap'):
+                    if loc:
+                        if name == 'url':
+                            yield loc, lastmod
+                        else:
+                            child_sitemaps.append(loc)
+                    loc = lastmod = None
+                    # Liberar los nodos ya procesados
+                    root.clear()
+
+    except (requests.RequestException, ET.ParseError, OSError, ValueError) as e:
+        logger.warning(f"Error leyendo sitemap {url}: {e}")
+
+    for child in child_sitemaps:
+        yield from iter_sitemap(child, session, timeout, max_depth - 1, seen)
+
+
+def site_prefix(base_url: str) -> str:
+    """
+    Prefijo que delimita las URLs del sitio bajo la ruta de base_url.
+
+    https://x.com/docs -> https://x.com/docs/ y https://x.com -> https://x.com
+    (todas las rutas del host, pero no otros hosts ni puertos). Un último
+    segmento con extensión (https://x.com/docs/index.html) es una página y
+    no forma parte del ámbito.
+    """
+    parsed = urlparse(base_url)
+    path = parsed.path
+    if not path.endswith('/') and '.' in path.rsplit('/', 1)[-1]:
+        path = path.rsplit('/', 1)[0]
+    path = path.rstrip('/')
+    if path:
+        return f"{parsed.scheme}://{parsed.netloc}{path}/"
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def _in_scope(url: str, prefix: str) -> bool:
+    """Indica si url cae bajo el prefijo (la raíz del prefijo incluida)"""
+    if prefix.endswith('/'):
+        return url.startswith(prefix) or url == prefix[:-1]
+    # Prefijo de host: tras él solo puede venir fin, ruta, query o fragmento
+    return url.startswith(prefix) and url[len(prefix):len(prefix) + 1] in ('', '/', '?', '#')
+
+
+def iter_site_urls(
+    base_url: str,
+    session: Optional[requests.Session] = None,
+    sitemap_url: Optional[str] = None
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Produce (url, lastmod) de todos los sitemaps del sitio bajo la ruta de base_url.
+
+    Si no se indica `sitemap_url` se usan los declarados en robots.txt.
+    """
+    session = session or requests.Session()
+    prefix = site_prefix(base_url)
+    sitemaps = [sitemap_url] if sitemap_url else find_sitemaps(base_url, session)
+    seen: Set[str] = set()
+
+    for sitemap in sitemaps:
+        logger.info(f"Leyendo sitemap: {sitemap}")
+        for url, lastmod in iter_sitemap(sitemap, session, _seen=seen):
+            if _in_scope(url, prefix):
+                yield url, lastmod
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lista las URLs de los sitemaps de un sitio")
+    parser.add_argument('url', help='URL base de la documentación')
+    parser.add_argument('--sitemap', help='URL de sitemap concreta (default: desde robots.txt)')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    count = 0
+    for url, lastmod in iter_site_urls(args.url, sitemap_url=args.sitemap):
+        print(f"{url}\t{lastmod or ''}")
+        count += 1
+
+    logger.info(f"{count} URLs encontradas")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Utilidades de persistencia compartidas: escritura atómica, conexiones SQLite y
+recorrido de archivos Markdown
+"""
+
+import os
+import sqlite3
+import logging
+from pathlib import Path
+from typing import List, Union
+
+logger = logging.getLogger('advanced_scraper.storage')
+
+def write_file_atomic(path: Union[str, Path], data: bytes):
+    """Escribe un archivo de forma atómica (temporal + fsync + rename)"""
+    path = str(path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def connect_sqlite(path: str, shared: bool = False, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Abre una base SQLite local (WAL) o compartida entre procesos y hosts.
+
+    Las bases compartidas usan el journal clásico (WAL no funciona sobre
+    sistemas de archivos de red), esperan hasta 60 s por el lock y van en
+    autocommit para no retener el lock de escritura entre peticiones.
+    """
+    if shared:
+        conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=check_same_thread)
+        conn.execute('PRAGMA journal_mode=DELETE')
+    else:
+        conn = sqlite3.connect(path, check_same_thread=check_same_thread)
+        conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+def scan_markdown_files(root: Union[str, Path]) -> List[tuple]:
+    """Recorre el directorio una vez y devuelve (ruta, tamaño, mtime_ns) de cada .md/.mdx.
+
+    Usa os.scandir, así que cada archivo se consulta con un único stat.
+    """
+    files = []
+    stack = [str(root)]
+
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(('.md', '.mdx')) and entry.is_file():
+                        stat = entry.stat()
+                        files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        except OSError as e:
+            logger.warning(f"No se pudo leer el directorio {directory}: {e}")
+
+    return files
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los módulos de python/docs son scripts sueltos: se importan desde su directorio
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
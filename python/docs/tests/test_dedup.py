@@ -0,0 +1,68 @@
+import pytest
+
+from dedup import SIMHASH_MIN_TOKENS, ContentIndex, content_fingerprint, simhash
+from frontier import normalize_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTPS://X.com:443/docs/', 'https://x.com/docs'),
+    ('http://x.com:80/a', 'http://x.com/a'),
+    ('https://x.com:8443/a', 'https://x.com:8443/a'),
+    ('https://x.com', 'https://x.com/'),
+    ('https://x.com/', 'https://x.com/'),
+    ('https://x.com/a//', 'https://x.com/a'),
+    ('https://x.com/a?b=2&a=1&', 'https://x.com/a?a=1&b=2'),
+    ('https://x.com/a#intro', 'https://x.com/a'),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def words(count, offset=0):
+    return ' '.join(f'palabra{i}' for i in range(offset, offset + count))
+
+
+def test_fingerprint_ignores_markup_and_whitespace():
+    assert content_fingerprint('<p>Hola   <b>mundo</b></p>') == content_fingerprint('Hola mundo')
+    assert content_fingerprint('Hola mundo')[1] is None
+
+
+def test_near_duplicates_have_close_simhash():
+    base = words(200)
+    edited = base.replace('palabra100', 'otra')
+    _, a = content_fingerprint(base)
+    _, b = content_fingerprint(edited)
+    _, c = content_fingerprint(words(200, offset=1000))
+
+    assert bin(a ^ b).count('1') <= 3
+    assert bin(a ^ c).count('1') > 3
+    assert simhash(['x'] * SIMHASH_MIN_TOKENS) == simhash(['x'])
+
+
+def test_content_index_finds_exact_and_near_duplicates():
+    index = ContentIndex(max_distance=3)
+    index.add('https://x.com/a', 'h1', 0)
+
+    assert index.find_duplicate('https://x.com/b', 'h1', None) == 'https://x.com/a'
+    assert index.find_duplicate('https://x.com/b', 'h2', 0b101) == 'https://x.com/a'
+    assert index.find_duplicate('https://x.com/b', 'h2', 0b1111) is None
+    # Una página no es duplicada de sí misma
+    assert index.find_duplicate('https://x.com/a', 'h1', 0) is None
+
+
+def test_content_index_replaces_and_removes():
+    index = ContentIndex(max_distance=3)
+    index.add('https://x.com/a', 'h1', 0)
+    index.add('https://x.com/a', 'h2', (1 << 64) - 1)
+
+    assert len(index) == 1
+    assert index.find_duplicate('https://x.com/b', 'h1', 0) is None
+    index.remove('https://x.com/a')
+    assert index.find_duplicate('https://x.com/b', 'h2', (1 << 64) - 1) is None
+    assert len(index) == 0
+
+
+def test_exact_only_index():
+    index = ContentIndex(max_distance=0)
+    index.add('https://x.com/a', 'h1', 0)
+    assert index.find_duplicate('https://x.com/b', 'h2', 0) is None
@@ -0,0 +1,73 @@
+import importlib
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def UrlFrontier(tmp_path, monkeypatch):
+    # Al importarse, docs_scraper crea docs_scraper.log en el directorio actual
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module('docs_scraper').UrlFrontier
+
+
+def test_urls_are_added_once(UrlFrontier):
+    frontier = UrlFrontier(['https://x.com/a', 'https://x.com/a'])
+
+    assert len(frontier) == 1
+    assert frontier.add('https://x.com/a') is False
+    assert frontier.add('https://x.com/b') is True
+    assert frontier.add_many(['https://x.com/b', 'https://x.com/c', 'https://x.com/c']) == ['https://x.com/c']
+    assert 'https://x.com/c' in frontier
+
+
+def test_claimed_urls_stay_seen(UrlFrontier):
+    frontier = UrlFrontier(['https://x.com/a', 'https://x.com/b'])
+
+    assert frontier.claim() == 'https://x.com/a'
+    assert frontier.in_progress == {'https://x.com/a'}
+    frontier.mark_done('https://x.com/a')
+
+    assert frontier.in_progress == set()
+    assert frontier.done_count == 1
+    assert frontier.add('https://x.com/a') is False
+    assert frontier.claim() == 'https://x.com/b'
+    assert frontier.claim() is None
+
+
+def test_concurrent_adds_and_claims_hand_out_each_url_once(UrlFrontier):
+    frontier = UrlFrontier()
+    urls = [f'https://x.com/{i}' for i in range(2000)]
+    claimed = []
+    claimed_lock = threading.Lock()
+
+    def producer():
+        for url in urls:
+            frontier.add(url)
+
+    def consumer():
+        mine = []
+        while len(mine) + len(claimed) < len(urls):
+            url = frontier.claim()
+            if url is None:
+                if not any(thread.is_alive() for thread in producers):
+                    break
+                continue
+            mine.append(url)
+            frontier.mark_done(url)
+        with claimed_lock:
+            claimed.extend(mine)
+
+    producers = [threading.Thread(target=producer) for _ in range(4)]
+    consumers = [threading.Thread(target=consumer) for _ in range(4)]
+    for thread in producers + consumers:
+        thread.start()
+    for thread in producers + consumers:
+        thread.join()
+
+    while (url := frontier.claim()) is not None:
+        claimed.append(url)
+        frontier.mark_done(url)
+
+    assert sorted(claimed) == sorted(urls)
+    assert frontier.done_count == len(urls)
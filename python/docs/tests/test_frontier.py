@@ -0,0 +1,162 @@
+from array import array
+
+import pytest
+
+from frontier import CrawlFrontier, pagerank
+from link_tracker import LinkTracker
+
+
+def test_pop_removes_urls_in_priority_order():
+    frontier = CrawlFrontier('depth')
+    frontier.push('https://x.com/a/b', {'depth': 2})
+    frontier.push('https://x.com/a', {'depth': 1})
+    frontier.push('https://x.com/', {'depth': 0})
+
+    assert frontier.pop(2) == ['https://x.com/', 'https://x.com/a']
+    assert len(frontier) == 1
+    assert 'https://x.com/a' not in frontier
+    assert frontier.pop() == ['https://x.com/a/b']
+    assert frontier.pop() == []
+
+
+def test_peek_keeps_urls_queued():
+    frontier = CrawlFrontier('depth')
+    frontier.push('https://x.com/a', {'depth': 1})
+    assert frontier.peek(1) == ['https://x.com/a']
+    assert frontier.peek(1) == ['https://x.com/a']
+    assert len(frontier) == 1
+
+
+def test_handed_out_urls_are_not_handed_out_again(tmp_path):
+    tracker = LinkTracker('https://x.com/', cache_file=str(tmp_path / 'link_cache.pkl'))
+    tracker.add_discovered_urls({'https://x.com/a', 'https://x.com/b'})
+
+    first = tracker.get_next_urls(10)
+    assert sorted(first) == ['https://x.com/a', 'https://x.com/b']
+    assert tracker.get_next_urls(10) == []
+
+    # Sin marcar siguen pendientes en el almacén: una nueva ejecución las retoma
+    tracker.mark_visited('https://x.com/a')
+    tracker.save_cache()
+    tracker.close()
+
+    resumed = LinkTracker('https://x.com/', cache_file=str(tmp_path / 'link_cache.pkl'))
+    assert resumed.get_next_urls(10) == ['https://x.com/b']
+    resumed.close()
+
+
+def order(policy, entries):
+    frontier = CrawlFrontier(policy)
+    frontier.rebuild(entries)
+    return frontier.pop()
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        CrawlFrontier('random')
+
+
+def test_depth_policy_puts_unknown_depth_last():
+    assert order('depth', [
+        ('https://x.com/c', {}),
+        ('https://x.com/b', {'depth': 2}),
+        ('https://x.com/a', {'depth': 0}),
+    ]) == ['https://x.com/a', 'https://x.com/b', 'https://x.com/c']
+
+
+def test_locality_policy_groups_sections():
+    assert order('locality', [
+        ('https://x.com/guide/b', {}),
+        ('https://x.com/api/a', {}),
+        ('https://x.com/guide/a', {}),
+    ]) == ['https://x.com/api/a', 'https://x.com/guide/a', 'https://x.com/guide/b']
+
+
+def test_freshness_policy_prefers_recent_lastmod():
+    assert order('freshness', [
+        ('https://x.com/old', {'lastmod': '2020-01-01'}),
+        ('https://x.com/new', {'lastmod': '2024-01-01'}),
+        ('https://x.com/found', {'discovered_at': 1.0}),
+    ]) == ['https://x.com/new', 'https://x.com/old', 'https://x.com/found']
+
+
+def test_update_reorders_queued_url():
+    frontier = CrawlFrontier('indegree')
+    frontier.push('https://x.com/a', {'in_degree': 1})
+    frontier.push('https://x.com/b', {'in_degree': 0})
+    frontier.update('https://x.com/b', {'in_degree': 5})
+    # update no encola URLs que ya no están en el frontier
+    frontier.update('https://x.com/c', {'in_degree': 9})
+
+    assert frontier.peek() == ['https://x.com/b', 'https://x.com/a']
+    assert frontier.pop() == ['https://x.com/b', 'https://x.com/a']
+
+
+def test_discard_skips_stale_heap_entries():
+    frontier = CrawlFrontier('depth')
+    frontier.push('https://x.com/a', {'depth': 0})
+    frontier.push('https://x.com/b', {'depth': 1})
+    frontier.discard('https://x.com/a')
+    frontier.push('https://x.com/b', {'depth': 0})  # ya encolada: se ignora
+
+    assert len(frontier) == 1
+    assert frontier.peek(5) == ['https://x.com/b']
+
+
+def test_pagerank_ranks_the_most_linked_page_first():
+    # 0 -> 2, 1 -> 2, 2 -> 0; 3 no enlaza a nadie
+    links = [(0, array('q', [2])), (1, array('q', [2])), (2, array('q', [0]))]
+    ranks = pagerank(4, links)
+
+    assert sum(ranks) == pytest.approx(1.0)
+    assert max(range(4), key=ranks.__getitem__) == 2
+    assert ranks[0] > ranks[1]
+    assert pagerank(0, []) == array('d')
+
+
+def test_pagerank_warm_start_converges_to_the_same_ranks():
+    links = [(0, array('q', [1])), (1, array('q', [2])), (2, array('q', [0, 1]))]
+    previous = pagerank(2, [(0, array('q', [1])), (1, array('q', [0]))])
+    cold = pagerank(3, links, iterations=200, tolerance=1e-12)
+    warm = pagerank(3, links, ranks=previous, iterations=200, tolerance=1e-12)
+
+    assert list(warm) == pytest.approx(list(cold))
+
+
+def test_pagerank_policy_orders_by_rank():
+    assert order('pagerank', [
+        ('https://x.com/a', {'rank': 0.1, 'in_degree': 9}),
+        ('https://x.com/b', {'rank': 0.5}),
+        ('https://x.com/c', {'rank': 0.1, 'in_degree': 1}),
+    ]) == ['https://x.com/b', 'https://x.com/a', 'https://x.com/c']
+
+
+def test_priority_returning_to_an_old_key_is_not_duplicated():
+    frontier = CrawlFrontier('indegree')
+    frontier.push('https://x.com/a', {'in_degree': 1})
+    frontier.push('https://x.com/b', {'in_degree': 0})
+    frontier.update('https://x.com/a', {'in_degree': 2})
+    frontier.update('https://x.com/a', {'in_degree': 1})
+
+    assert frontier.peek() == ['https://x.com/a', 'https://x.com/b']
+    assert frontier.peek(5) == ['https://x.com/a', 'https://x.com/b']
+    assert frontier.pop() == ['https://x.com/a', 'https://x.com/b']
+
+
+def test_in_flight_urls_survive_a_frontier_rebuild_and_can_be_requeued(tmp_path):
+    tracker = LinkTracker('https://x.com/', cache_file=str(tmp_path / 'link_cache.pkl'), priority_policy='pagerank')
+    tracker.add_discovered_urls({'https://x.com/a', 'https://x.com/b'})
+
+    handed_out = tracker.get_next_urls(1)
+    tracker.update_ranks()
+    assert handed_out[0] not in tracker.frontier
+    assert tracker.get_next_urls(10) != handed_out
+
+    tracker.requeue(handed_out[0])
+    assert tracker.get_next_urls(10) == handed_out
+
+    tracker.mark_visited(handed_out[0])
+    assert tracker.in_flight == {url for url in ('https://x.com/a', 'https://x.com/b') if url != handed_out[0]}
+    tracker.requeue(handed_out[0])  # ya marcada: no vuelve a la cola
+    assert handed_out[0] not in tracker.frontier
+    tracker.close()
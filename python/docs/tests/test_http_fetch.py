@@ -0,0 +1,70 @@
+import codecs
+
+import pytest
+
+from http_fetch import SNIFF_BYTES, BodyReader, ContentRejectedError, detect_encoding, sniff_html
+
+HTML = b'<!DOCTYPE html><html><head><title>T</title></head><body>' + b'x' * SNIFF_BYTES + b'</body></html>'
+
+
+def read(headers, body, max_bytes=1024 * 1024, chunk=1000):
+    reader = BodyReader('https://x.com/a', headers, max_bytes)
+    for start in range(0, len(body), chunk):
+        reader.feed(body[start:start + chunk])
+    return reader.finish()
+
+
+def test_html_body_is_read_with_declared_charset():
+    body, encoding = read({'Content-Type': 'text/html; charset="ISO-8859-1"'}, HTML)
+    assert body == HTML
+    assert encoding == 'iso8859-1'
+
+
+def test_non_html_content_type_is_rejected_before_the_body():
+    with pytest.raises(ContentRejectedError, match='no HTML'):
+        BodyReader('https://x.com/a.json', {'content-type': 'application/json'})
+
+
+def test_content_length_over_limit_is_rejected_before_the_body():
+    with pytest.raises(ContentRejectedError, match='supera el máximo'):
+        BodyReader('https://x.com/a', {'Content-Type': 'text/html', 'Content-Length': '2048'}, max_bytes=1024)
+
+
+def test_streamed_body_over_limit_is_rejected():
+    with pytest.raises(ContentRejectedError, match='Cuerpo de más de'):
+        read({'Content-Type': 'text/html'}, HTML, max_bytes=SNIFF_BYTES)
+
+
+def test_generic_type_is_sniffed_from_the_first_bytes():
+    body, _ = read({'Content-Type': 'application/octet-stream'}, HTML)
+    assert body == HTML
+
+    with pytest.raises(ContentRejectedError, match='binario'):
+        read({}, b'%PDF-1.7' + b'\x00' * SNIFF_BYTES)
+    with pytest.raises(ContentRejectedError, match='No parece HTML'):
+        read({'Content-Type': 'text/plain'}, b'solo texto')
+
+
+@pytest.mark.parametrize('media_type, head, rejected', [
+    ('text/html', b'<p>hola</p>', False),
+    ('text/html', b'\x89PNG\r\n', True),
+    ('', b'\xef\xbb\xbf  <html>', False),
+    ('text/html', codecs.BOM_UTF16_LE + '<html>'.encode('utf-16-le'), False),
+    ('text/plain', b'{"a": 1}', True),
+    ('application/pdf', b'<html>', True),
+])
+def test_sniff_html(media_type, head, rejected):
+    assert (sniff_html(media_type, head) is not None) == rejected
+
+
+def test_detect_encoding_order():
+    # Cabecera, luego BOM, luego <meta charset>
+    assert detect_encoding('utf-8', b'<meta charset="latin-1">') == 'utf-8'
+    assert detect_encoding('no-existe', codecs.BOM_UTF8 + b'<html>') == 'utf-8-sig'
+    assert detect_encoding(None, b'<meta http-equiv="Content-Type" content="text/html; charset=shift_jis">') == 'shift_jis'
+
+
+def test_detect_encoding_without_declaration():
+    # Un carácter multibyte cortado al final del prefijo sigue siendo UTF-8
+    assert detect_encoding(None, 'año ñ'.encode('utf-8')[:-1]) == 'utf-8'
+    assert detect_encoding(None, 'canción'.encode('cp1252')) == 'cp1252'
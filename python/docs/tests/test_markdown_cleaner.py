@@ -0,0 +1,57 @@
+from markdown_processing import MarkdownCleaner
+
+
+def clean(content):
+    return MarkdownCleaner().clean(content)
+
+
+def test_fence_after_lone_heading_is_kept_as_code():
+    content = '#\n```python\nx = ` a `  *  b\n```\n'
+    assert clean(content) == '#\n```python\nx = ` a `  *  b\n```'
+
+
+def test_fence_after_lone_bullet_is_kept_as_code():
+    content = 'texto\n*\n~~~\n[ a ]( b )\n~~~\n'
+    assert clean(content) == 'texto\n\n*\n~~~\n[ a ]( b )\n~~~'
+
+
+def test_inline_code_is_stripped_when_either_side_has_a_space():
+    assert clean('usa ` x` y `y ` y ` z `') == 'usa `x` y `y` y `z`'
+
+
+def test_inline_code_spans_are_matched_whole():
+    # El espacio entre dos spans correctos no es un span mal formado
+    assert clean('`a` `b`') == '`a` `b`'
+    assert clean('` `') == '` `'
+
+
+def test_link_spaces_are_removed():
+    assert clean('[ texto ](  http://a.com )') == '[texto](http://a.com)'
+
+
+def test_empty_table_cells_are_collapsed():
+    assert clean('| a |  | | b |') == '| a | | b |'
+
+
+def test_trailing_spaces_and_blank_runs():
+    assert clean('a  \n\n\n\n\nb') == 'a\n\n\nb'
+
+
+def test_lone_heading_and_bullet_join_the_next_line():
+    assert clean('#\nTítulo') == '# Título'
+    assert clean('-\nelemento') == '* elemento'
+
+
+def test_code_blocks_are_left_untouched():
+    assert clean('[ a ]( b )\n```\n[ a ]( b )  \n\n\n\n```') == '[a](b)\n```\n[ a ]( b )  \n\n\n\n```'
+    # Un bloque sin cerrar también se conserva
+    assert clean('```\n[ a ]( b )\n') == '```\n[ a ]( b )'
+
+
+def test_added_rule_runs_outside_code_and_changes_fingerprint():
+    cleaner = MarkdownCleaner()
+    default = cleaner.fingerprint()
+    cleaner.add_rule('tm', r'\(tm\)', '™')
+
+    assert cleaner.clean('Marca(tm) y `(tm)`\n```\n(tm)\n```') == 'Marca™ y `(tm)`\n```\n(tm)\n```'
+    assert cleaner.fingerprint() != default
@@ -0,0 +1,238 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+import markdown_utils
+from markdown_utils import MAX_REPORTED_LINES, batch_analyze, default_cache_path
+
+
+def test_default_cache_path_is_outside_the_analyzed_tree(tmp_path):
+    docs = tmp_path / 'docs'
+    path = default_cache_path(str(docs))
+    assert not os.path.abspath(path).startswith(str(docs))
+    assert path == default_cache_path(str(docs) + os.sep)
+    assert path != default_cache_path(str(tmp_path / 'otros'))
+
+
+def test_main_does_not_write_into_the_docs_tree(tmp_path, monkeypatch, capsys):
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    (docs / 'a.md').write_text('# Título\n\ntexto\n', encoding='utf-8')
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(markdown_utils, 'LINT_CACHE_DIR', str(cache_dir))
+    monkeypatch.setattr(sys, 'argv', ['markdown_utils.py', str(docs), '-j', '1'])
+
+    markdown_utils.main()
+
+    assert sorted(p.name for p in docs.iterdir()) == ['a.md']
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def scan(content):
+    issues, line_count = markdown_utils.MarkdownAnalyzer().scan(content)
+    return {issue['rule']: issue['lines'] for issue in issues}, line_count
+
+
+def test_empty_file_has_no_lines():
+    assert scan('') == ({}, 0)
+
+
+def test_line_count_ignores_final_newline():
+    assert scan('a\nb\n')[1] == 2
+    assert scan('a\nb')[1] == 2
+    assert scan('\n')[1] == 1
+
+
+def test_link_rules_do_not_match_across_lines():
+    rules, _ = scan('[ a\nb ]\n[\n](\n)\n')
+    assert 'link-spaces' not in rules
+    assert 'empty-link' not in rules
+
+    rules, _ = scan('texto\n[ a ] y [](  )\n')
+    assert rules['link-spaces'] == [2]
+    assert rules['empty-link'] == [2]
+
+
+def test_header_rules():
+    rules, _ = scan('#Título\n##  Otro\n# Bien\n')
+    assert rules['header-no-space'] == [1]
+    assert rules['header-multi-space'] == [2]
+
+
+def test_blank_runs_report_first_line_once():
+    rules, _ = scan('a\n\n\n\nb\n\n\n')
+    assert rules['blank-lines'] == [2]
+    rules, _ = scan('a\n\n\n\n\n')
+    assert rules['blank-lines'] == [2]
+
+
+def test_trailing_spaces_and_table_pipes():
+    rules, _ = scan('a \n| b\n| c | d |\n')
+    assert rules['trailing-spaces'] == [1]
+    assert rules['table-pipes'] == [2]
+
+
+def test_mixed_indent_needs_both_styles():
+    assert 'mixed-indent' not in scan('\ta\n\tb\n')[0]
+    assert scan('\ta\n    b\n')[0]['mixed-indent'] == [1]
+
+
+def test_rule_with_several_triggers_counts_line_once():
+    rules, _ = scan('a < b > c & d\n')
+    assert rules['unescaped-html'] == [1]
+    assert 'unescaped-html' not in scan('a &amp; b\n')[0]
+
+
+SAMPLES = [
+    '# Bien\n\ntexto\n',
+    '#Mal\n\n\n\n[ a ]( b )\n',
+    'fila | uno\ntexto \n' * 30,
+    '',
+    '\tcon tab\n    con espacios\n',
+]
+
+
+@pytest.fixture
+def docs_tree(tmp_path):
+    """Árbol con más archivos que un lote del pool y uno ilegible"""
+    root = tmp_path / 'docs'
+    for index in range(150):
+        folder = root / f"seccion{index % 4}"
+        folder.mkdir(parents=True, exist_ok=True)
+        suffix = '.mdx' if index % 10 == 0 else '.md'
+        (folder / f"pagina{index}{suffix}").write_text(SAMPLES[index % len(SAMPLES)], encoding='utf-8')
+    (root / 'roto.md').write_bytes(b'\xff\xfe no es utf-8')
+    (root / 'notas.txt').write_text('no es markdown', encoding='utf-8')
+    return root
+
+
+def by_file(results):
+    return sorted(results, key=lambda result: result['file'])
+
+
+def test_process_pool_matches_single_process(docs_tree):
+    single = batch_analyze(str(docs_tree), workers=1)
+    pooled = batch_analyze(str(docs_tree), workers=3)
+
+    assert len(single['files']) == 151
+    assert by_file(pooled['files']) == by_file(single['files'])
+    assert pooled['summary'] == single['summary']
+    errors = [result for result in single['files'] if result['issues'] and result['issues'][0]['rule'] == 'error']
+    assert [result['file'] for result in errors] == [str(docs_tree / 'roto.md')]
+
+
+def test_jsonl_stream_has_one_record_per_file(docs_tree, tmp_path):
+    jsonl_path = tmp_path / 'resultados.jsonl'
+    analysis = batch_analyze(str(docs_tree), workers=2, jsonl_path=str(jsonl_path), keep_results=False)
+
+    records = [json.loads(line) for line in jsonl_path.read_text(encoding='utf-8').splitlines()]
+    assert analysis['files'] == []
+    assert len(records) == analysis['summary']['total_files'] == 151
+    assert by_file(records) == by_file(batch_analyze(str(docs_tree), workers=1)['files'])
+
+
+def test_sarif_has_one_result_per_reported_line(docs_tree, tmp_path):
+    sarif_path = tmp_path / 'reporte.sarif'
+    analysis = batch_analyze(str(docs_tree), workers=2, sarif_path=str(sarif_path))
+
+    sarif = json.loads(sarif_path.read_text(encoding='utf-8'))
+    assert sarif['version'] == '2.1.0'
+    run = sarif['runs'][0]
+    rule_ids = {rule['id'] for rule in run['tool']['driver']['rules']}
+
+    expected = []
+    for result in analysis['files']:
+        uri = Path(result['file']).relative_to(docs_tree).as_posix()
+        for issue in result['issues']:
+            for line in issue['lines'] or [None]:
+                expected.append((uri, issue['rule'], line))
+
+    found = []
+    for item in run['results']:
+        assert item['ruleId'] in rule_ids
+        location = item['locations'][0]['physicalLocation']
+        found.append((location['artifactLocation']['uri'], item['ruleId'], location.get('region', {}).get('startLine')))
+
+    assert expected and sorted(found, key=repr) == sorted(expected, key=repr)
+    # Los problemas repetidos solo listan las primeras líneas
+    assert max(len(issue['lines']) for result in analysis['files'] for issue in result['issues']) == MAX_REPORTED_LINES
+
+
+@pytest.fixture
+def lint_tree(tmp_path):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    (root / 'a.md').write_text('#Mal\n', encoding='utf-8')
+    (root / 'b.md').write_text('texto \n', encoding='utf-8')
+    (root / 'roto.md').write_bytes(b'\xff\xfe')
+    return root
+
+
+@pytest.fixture
+def analyzed(monkeypatch):
+    """Nombres de los archivos que se leen en cada análisis (workers=1)"""
+    names = []
+    analyze_file = markdown_utils.MarkdownAnalyzer.analyze_file
+
+    def counting(self, file_path):
+        names.append(file_path.name)
+        return analyze_file(self, file_path)
+
+    monkeypatch.setattr(markdown_utils.MarkdownAnalyzer, 'analyze_file', counting)
+    return names
+
+
+def run_cached(root, cache_path, analyzed, rules=None):
+    analyzed.clear()
+    analysis = batch_analyze(str(root), workers=1, cache_path=str(cache_path), rules=rules)
+    return sorted(analyzed), analysis
+
+
+def test_unchanged_files_are_cache_hits_and_not_reread(lint_tree, tmp_path, analyzed):
+    cache_path = tmp_path / 'cache.json'
+    read, first = run_cached(lint_tree, cache_path, analyzed)
+    assert read == ['a.md', 'b.md', 'roto.md']
+
+    read, second = run_cached(lint_tree, cache_path, analyzed)
+    # Los errores de lectura no se guardan: se reintentan
+    assert read == ['roto.md']
+    assert second['summary']['cached_files'] == 2
+    assert by_file(second['files']) == by_file(first['files'])
+    assert 'roto.md' not in json.loads(cache_path.read_text(encoding='utf-8'))['files']
+
+
+def test_size_or_mtime_change_invalidates_the_entry(lint_tree, tmp_path, analyzed):
+    cache_path = tmp_path / 'cache.json'
+    run_cached(lint_tree, cache_path, analyzed)
+
+    (lint_tree / 'a.md').write_text('# Bien y más largo\n', encoding='utf-8')
+    stat = (lint_tree / 'b.md').stat()
+    os.utime(lint_tree / 'b.md', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    read, analysis = run_cached(lint_tree, cache_path, analyzed)
+    assert read == ['a.md', 'b.md', 'roto.md']
+    assert [result['issues'] for result in analysis['files'] if result['file'].endswith('a.md')] == [[]]
+
+
+def test_new_rules_fingerprint_invalidates_the_cache(lint_tree, tmp_path, analyzed):
+    cache_path = tmp_path / 'cache.json'
+    run_cached(lint_tree, cache_path, analyzed)
+
+    rules = [rule for rule in markdown_utils.DEFAULT_RULES if rule.id != 'trailing-spaces']
+    read, analysis = run_cached(lint_tree, cache_path, analyzed, rules=rules)
+    assert read == ['a.md', 'b.md', 'roto.md']
+    assert analysis['summary']['cached_files'] == 0
+    assert [result['issues'] for result in analysis['files'] if result['file'].endswith('b.md')] == [[]]
+
+
+def test_deleted_files_are_pruned_on_save(lint_tree, tmp_path, analyzed):
+    cache_path = tmp_path / 'cache.json'
+    run_cached(lint_tree, cache_path, analyzed)
+    assert set(json.loads(cache_path.read_text(encoding='utf-8'))['files']) == {'a.md', 'b.md'}
+
+    (lint_tree / 'a.md').unlink()
+    run_cached(lint_tree, cache_path, analyzed)
+    assert set(json.loads(cache_path.read_text(encoding='utf-8'))['files']) == {'b.md'}
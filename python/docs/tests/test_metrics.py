@@ -0,0 +1,65 @@
+import pytest
+
+from metrics import CrawlMetrics, LatencyHistogram
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(0.5) == 0.0
+    assert histogram.summary()['min'] == 0.0
+
+
+def test_single_sample_is_exact():
+    histogram = LatencyHistogram()
+    histogram.observe(0.25)
+    for q in (0.0, 0.5, 0.99, 1.0):
+        assert histogram.percentile(q) == pytest.approx(0.25)
+
+
+def test_percentiles_are_within_bucket_error():
+    histogram = LatencyHistogram()
+    samples = [i / 1000 for i in range(1, 1001)]
+    for seconds in samples:
+        histogram.observe(seconds)
+
+    # Cubetas geométricas de razón 1.2: error relativo < 20 %
+    for q, expected in ((0.5, 0.5), (0.95, 0.95), (0.99, 0.99)):
+        assert histogram.percentile(q) == pytest.approx(expected, rel=0.2)
+    assert histogram.percentile(1.0) == pytest.approx(1.0)
+    summary = histogram.summary()
+    assert summary['count'] == 1000
+    assert summary['min'] == 0.001 and summary['max'] == 1.0
+    assert set(summary) >= {'p50', 'p95', 'p99'}
+
+
+def test_samples_beyond_last_bucket_are_bounded_by_max():
+    histogram = LatencyHistogram()
+    histogram.observe(1e6)
+    histogram.observe(2e6)
+    assert 1e6 <= histogram.percentile(0.5) <= 2e6
+    assert histogram.percentile(1.0) == pytest.approx(2e6)
+
+
+def test_timer_only_records_successful_stages():
+    metrics = CrawlMetrics()
+    with metrics.timer('parse'):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.timer('write'):
+            raise RuntimeError
+
+    assert metrics.stages['parse'].count == 1
+    assert 'write' not in metrics.stages
+
+
+def test_in_flight_tracks_peak_and_export():
+    metrics = CrawlMetrics()
+    with metrics.in_flight('fetch'):
+        with metrics.in_flight('fetch'):
+            pass
+    metrics.record_response(200, 1024)
+
+    data = metrics.to_dict()
+    assert data['in_flight'] == {'fetch': {'current': 0, 'max': 2}}
+    assert data['counters']['bytes_downloaded'] == 1024
+    assert 'docs_scraper_in_flight_max{kind="fetch"} 2' in metrics.to_prometheus()
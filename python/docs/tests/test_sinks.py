@@ -0,0 +1,259 @@
+import asyncio
+import gzip
+import io
+import json
+import tarfile
+import threading
+import zipfile
+
+import pytest
+
+import sinks
+from sinks import FileSink, JsonlSink, OutputWriter, TarSink, ZipSink, create_output_sink
+
+
+class MemorySink:
+    """Sink de prueba: guarda cada lote sincronizado; `fail_on` hace fallar esa página"""
+
+    format = 'files'
+    index_path = None
+
+    def __init__(self, path, fail_on=None):
+        self.path = path
+        self.fail_on = fail_on
+        self.batch = []
+        self.flushed = []
+        self.closed = False
+
+    def write(self, name, content):
+        if name == self.fail_on:
+            raise OSError(f"Disco lleno escribiendo {name}")
+        self.batch.append((name, content))
+
+    def flush(self):
+        self.flushed.append(self.batch)
+        self.batch = []
+
+    def close(self):
+        self.closed = True
+
+
+def run_writer(sink, pages, **kwargs):
+    """Encola las páginas desde un event loop y devuelve (resultados por nombre, error de close)"""
+    results = {}
+
+    async def main():
+        writer = OutputWriter(sink, **kwargs)
+        for name, content in pages:
+            try:
+                await writer.put(name, content, on_written=lambda error, name=name: results.setdefault(name, error))
+            except OSError as e:
+                results.setdefault(name, e)
+        try:
+            await asyncio.to_thread(writer.close)
+        except OSError as e:
+            return e
+
+    return results, asyncio.run(main())
+
+
+def test_pages_are_reported_after_their_batch_is_flushed(tmp_path):
+    sink = MemorySink(tmp_path)
+    results, error = run_writer(sink, [('a.md', 'a'), ('b.md', 'b')], batch_size=1)
+
+    assert error is None
+    assert results == {'a.md': None, 'b.md': None}
+    assert [page for batch in sink.flushed for page in batch] == [('a.md', 'a'), ('b.md', 'b')]
+
+
+def test_failed_batch_reports_the_error_and_forgets_its_names(tmp_path):
+    sink = MemorySink(tmp_path, fail_on='b.md')
+    writer_names = {}
+
+    async def main():
+        writer = OutputWriter(sink, batch_size=10)
+        results = {}
+        for name in ('a.md', 'b.md'):
+            await writer.put(name, name, on_written=lambda error, name=name: results.setdefault(name, error))
+        with pytest.raises(OSError):
+            await asyncio.to_thread(writer.close)
+        writer_names['names'] = set(writer.names)
+        return results
+
+    results = asyncio.run(main())
+    assert isinstance(results['a.md'], OSError) and isinstance(results['b.md'], OSError)
+    assert writer_names['names'] == set()
+    assert sink.closed
+
+
+def test_coalesced_page_reports_every_caller(tmp_path):
+    sink = MemorySink(tmp_path)
+    calls = []
+
+    async def main():
+        writer = OutputWriter(sink)
+        # Sin event loop ocupado el hilo podría escribir la primera versión antes:
+        # se bloquea con el lock para que ambas coincidan en lo pendiente
+        with writer._condition:
+            writer._enqueue('a.md', 'v1', lambda error: calls.append(('v1', error)))
+            writer._enqueue('a.md', 'v2', lambda error: calls.append(('v2', error)))
+        await asyncio.to_thread(writer.close)
+
+    asyncio.run(main())
+    assert sink.flushed == [[('a.md', 'v2')]]
+    assert sorted(calls) == [('v1', None), ('v2', None)]
+
+
+def read_tar_prefix(path):
+    """Lee un tar comprimido sin cerrar (como lo deja un proceso que muere)"""
+    data = path.read_bytes()
+    if path.suffix == '.zst':
+        data = sinks.zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    else:
+        data = gzip.GzipFile(fileobj=io.BytesIO(data)).read1(1 << 20)
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r:') as tar:
+        return {member.name: tar.extractfile(member).read().decode('utf-8') for member in tar}
+
+
+@pytest.mark.parametrize('zstd', [True, False])
+def test_tar_flush_leaves_a_readable_prefix(tmp_path, monkeypatch, zstd):
+    if zstd and not sinks.ZSTD_AVAILABLE:
+        pytest.skip('zstandard no instalado')
+    monkeypatch.setattr(sinks, 'ZSTD_AVAILABLE', zstd)
+    sink = TarSink(tmp_path / f"pages.tar.{'zst' if zstd else 'gz'}", fsync=False)
+    sink.write('a.md', 'uno')
+    sink.write('b/c.md', 'dos')
+    sink.flush()
+
+    assert read_tar_prefix(sink.path) == {'a.md': 'uno', 'b/c.md': 'dos'}
+    sink.close()
+
+
+PAGE = '---\ntitle: "Inicio"\ntags:\n  - a\n  - b\n---\n# Inicio\n\ntexto\n'
+
+
+def write_pages(sink, pages):
+    writer = OutputWriter(sink, batch_size=2)
+    for name, content in pages:
+        writer.submit(name, content)
+    writer.close()
+    return writer
+
+
+def read_tar(path):
+    with open(path, 'rb') as f:
+        if path.suffix == '.zst':
+            f = sinks.zstandard.ZstdDecompressor().stream_reader(f)
+        with tarfile.open(fileobj=f, mode='r|*') as tar:
+            return {member.name: tar.extractfile(member).read().decode('utf-8') for member in tar}
+
+
+def test_file_sink_round_trip(tmp_path):
+    write_pages(FileSink(tmp_path), [('index.md', PAGE), ('guia/a.md', 'a'), ('guia/a.md', 'a2')])
+    assert (tmp_path / 'index.md').read_text(encoding='utf-8') == PAGE
+    assert (tmp_path / 'guia' / 'a.md').read_text(encoding='utf-8') == 'a2'
+
+
+def test_jsonl_sink_round_trip_and_resume(tmp_path):
+    sink = create_output_sink(tmp_path, 'jsonl')
+    assert isinstance(sink, JsonlSink)
+    write_pages(sink, [('index.md', PAGE), ('a.md', 'sin frontmatter')])
+
+    records = [json.loads(line) for line in (tmp_path / 'corpus.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert records == [
+        {'path': 'index.md', 'title': 'Inicio', 'tags': ['a', 'b'], 'content': '# Inicio\n\ntexto\n'},
+        {'path': 'a.md', 'content': 'sin frontmatter'},
+    ]
+
+    # Un rastreo reanudado sabe qué páginas ya están en el corpus
+    writer = OutputWriter(create_output_sink(tmp_path, 'jsonl'))
+    assert 'index.md' in writer and 'a.md' in writer and 'b.md' not in writer
+    writer.close()
+
+
+@pytest.mark.parametrize('zstd', [True, False])
+def test_tar_sink_round_trip_writes_a_new_part_per_run(tmp_path, monkeypatch, zstd):
+    if zstd and not sinks.ZSTD_AVAILABLE:
+        pytest.skip('zstandard no instalado')
+    monkeypatch.setattr(sinks, 'ZSTD_AVAILABLE', zstd)
+
+    first = create_output_sink(tmp_path, 'tar')
+    write_pages(first, [('index.md', PAGE), ('guia/a.md', 'a')])
+    second = create_output_sink(tmp_path, 'tar')
+    write_pages(second, [('guia/a.md', 'a2')])
+
+    assert second.path != first.path
+    assert read_tar(first.path) == {'index.md': PAGE, 'guia/a.md': 'a'}
+    assert read_tar(second.path) == {'guia/a.md': 'a2'}
+
+
+def test_zip_sink_round_trip_appends(tmp_path):
+    write_pages(ZipSink(tmp_path / 'pages.zip'), [('index.md', PAGE), ('a.md', 'a')])
+    write_pages(ZipSink(tmp_path / 'pages.zip'), [('a.md', 'a2')])
+
+    with zipfile.ZipFile(tmp_path / 'pages.zip') as archive:
+        assert archive.read('index.md').decode('utf-8') == PAGE
+        # La última entrada con el mismo nombre prevalece
+        assert archive.read('a.md').decode('utf-8') == 'a2'
+
+
+def test_unknown_output_format(tmp_path):
+    with pytest.raises(ValueError):
+        create_output_sink(tmp_path, 'parquet')
+
+
+class GatedSink(MemorySink):
+    """Sink que no escribe hasta que se abre `gate` (disco lento)"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.gate = threading.Event()
+
+    def write(self, name, content):
+        self.gate.wait(5)
+        super().write(name, content)
+
+
+def test_put_waits_while_the_disk_is_behind(tmp_path):
+    sink = GatedSink(tmp_path)
+
+    async def main():
+        writer = OutputWriter(sink, batch_size=1, max_pending=5)
+        # La primera la toma el hilo (y se bloquea); la segunda queda pendiente
+        await writer.put('a.md', 'x' * 10)
+        while writer._pending:
+            await asyncio.sleep(0.01)
+        await writer.put('b.md', 'x' * 10)
+        third = asyncio.create_task(writer.put('c.md', 'x' * 10))
+        await asyncio.sleep(0.05)
+        assert not third.done()
+
+        sink.gate.set()
+        await asyncio.wait_for(third, 5)
+        await asyncio.to_thread(writer.close)
+        return writer
+
+    writer = asyncio.run(main())
+    assert writer.stalls >= 1
+    assert [name for batch in sink.flushed for name, _ in batch] == ['a.md', 'b.md', 'c.md']
+
+
+def test_sink_error_reaches_put_and_close(tmp_path):
+    sink = MemorySink(tmp_path, fail_on='a.md')
+
+    async def main():
+        writer = OutputWriter(sink)
+        await writer.put('a.md', 'a')
+        while writer._error is None:
+            await asyncio.sleep(0.01)
+
+        with pytest.raises(OSError, match='a.md'):
+            await writer.put('b.md', 'b')
+        with pytest.raises(OSError, match='a.md'):
+            writer.submit('b.md', 'b')
+        with pytest.raises(OSError, match='a.md'):
+            await asyncio.to_thread(writer.close)
+
+    asyncio.run(main())
+    assert sink.closed
+    assert sink.flushed == []
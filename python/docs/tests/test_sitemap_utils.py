@@ -0,0 +1,44 @@
+from sitemap_utils import _in_scope, iter_site_urls, site_prefix
+
+
+def test_prefix_keeps_the_path_as_scope():
+    assert site_prefix('https://x.com/docs') == 'https://x.com/docs/'
+    assert site_prefix('https://x.com/docs/') == 'https://x.com/docs/'
+    assert site_prefix('https://x.com/docs/index.html') == 'https://x.com/docs/'
+
+
+def test_prefix_for_host_root_is_the_host():
+    assert site_prefix('https://x.com') == 'https://x.com'
+    assert site_prefix('https://x.com/') == 'https://x.com'
+
+
+def test_scope_under_path():
+    prefix = site_prefix('https://x.com/docs')
+    assert _in_scope('https://x.com/docs/intro', prefix)
+    assert _in_scope('https://x.com/docs', prefix)
+    assert not _in_scope('https://x.com/blog/post', prefix)
+    assert not _in_scope('https://x.com/docsearch', prefix)
+
+
+def test_scope_for_host_root():
+    prefix = site_prefix('https://x.com')
+    assert _in_scope('https://x.com/', prefix)
+    assert _in_scope('https://x.com/blog/post', prefix)
+    assert not _in_scope('https://y.com/docs', prefix)
+    assert not _in_scope('https://x.com.evil.org/', prefix)
+    assert not _in_scope('https://x.com:8443/docs', prefix)
+
+
+def test_iter_site_urls_filters_by_scope(monkeypatch):
+    urls = [
+        ('https://x.com/docs/a', None),
+        ('https://x.com/blog/b', '2024-01-01'),
+        ('https://other.com/docs/c', None),
+    ]
+    monkeypatch.setattr('sitemap_utils.iter_sitemap', lambda *args, **kwargs: iter(urls))
+
+    found = list(iter_site_urls('https://x.com/docs', sitemap_url='https://x.com/sitemap.xml'))
+    assert found == [('https://x.com/docs/a', None)]
+
+    found = list(iter_site_urls('https://x.com', sitemap_url='https://x.com/sitemap.xml'))
+    assert found == urls[:2]
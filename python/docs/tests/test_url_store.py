@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from link_tracker import CrawlJournal, LinkTracker
+from url_store import URL_FAILED, URL_PENDING, URL_SKIPPED, URL_VISITED, MemoryUrlStore, SqliteUrlStore
+
+HASH = '00112233445566778899aabbccddeeff'
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        store = MemoryUrlStore()
+    else:
+        store = SqliteUrlStore(tmp_path / 'urls.sqlite', commit_every=2)
+    yield store
+    store.close()
+
+
+def counts(store):
+    return [store.count(state) for state in (URL_PENDING, URL_VISITED, URL_FAILED, URL_SKIPPED)]
+
+
+def test_add_is_idempotent(store):
+    assert store.add('https://x.com/', 0) is True
+    assert store.add('https://x.com/a', 1, 'https://x.com/', 10.0, 20.0) is True
+    assert store.add('https://x.com/a', 5) is False
+
+    meta = store.get('https://x.com/a')
+    assert (meta['state'], meta['depth'], meta['source_url']) == (URL_PENDING, 1, 'https://x.com/')
+    assert (meta['discovered_at'], meta['lastmod']) == (10.0, 20.0)
+    assert len(store) == 2 and 'https://x.com/a' in store
+    assert store.get('https://x.com/b') is None
+
+
+def test_state_transitions_keep_one_state_and_counts(store):
+    for url in ('https://x.com/a', 'https://x.com/b', 'https://x.com/c'):
+        store.add(url)
+
+    store.set_state('https://x.com/a', URL_VISITED, 100.0)
+    store.set_state('https://x.com/b', URL_FAILED, 101.0, 'HTTP 500')
+    store.set_state('https://x.com/c', URL_SKIPPED, 102.0, 'no HTML')
+    assert counts(store) == [0, 1, 1, 1]
+    assert store.get('https://x.com/a')['processed_at'] == 100.0
+    assert store.get('https://x.com/b')['note'] == 'HTTP 500'
+
+    # Un reintento con éxito sustituye el estado y borra el error
+    store.set_state('https://x.com/b', URL_VISITED, 103.0)
+    assert store.state('https://x.com/b') == URL_VISITED
+    assert store.get('https://x.com/b')['note'] is None
+    assert counts(store) == [0, 2, 0, 1]
+    assert sorted(store.iter_state(URL_VISITED)) == ['https://x.com/a', 'https://x.com/b']
+
+    # URLs desconocidas se ignoran
+    store.set_state('https://x.com/z', URL_VISITED)
+    assert counts(store) == [0, 2, 0, 1]
+
+    store.reset_states()
+    assert counts(store) == [3, 0, 0, 0]
+    assert store.get('https://x.com/c')['note'] is None
+
+
+def test_fingerprints_aliases_and_links(store):
+    for url in ('https://x.com/a', 'https://x.com/b', 'https://x.com/c'):
+        store.add(url)
+
+    store.set_fingerprint('https://x.com/a', HASH, (1 << 64) - 1)
+    store.set_alias('https://x.com/b', 'https://x.com/a')
+    assert list(store.iter_fingerprints()) == [('https://x.com/a', HASH, (1 << 64) - 1)]
+    assert list(store.iter_aliases()) == [('https://x.com/b', 'https://x.com/a')]
+    assert store.alias_count() == 1
+
+    store.set_links('https://x.com/a', ['https://x.com/b', 'https://x.com/c'])
+    store.set_links('https://x.com/b', ['https://x.com/c'])
+    store.set_links('https://x.com/a', ['https://x.com/c'])
+    assert store.get('https://x.com/b')['in_degree'] == 0
+    assert store.get('https://x.com/c')['in_degree'] == 2
+    assert sorted(store.iter_links()) == [('https://x.com/a', 'https://x.com/c'), ('https://x.com/b', 'https://x.com/c')]
+
+
+def test_memory_snapshot_round_trip():
+    store = MemoryUrlStore()
+    store.add('https://x.com/a')
+    store.add('https://x.com/b')
+    store.set_state('https://x.com/a', URL_VISITED, 5.0)
+    store.set_links('https://x.com/a', ['https://x.com/b'])
+
+    loaded = MemoryUrlStore()
+    loaded.load_snapshot(store.to_snapshot(copy=True))
+    assert loaded.get('https://x.com/a') == store.get('https://x.com/a')
+    assert loaded.get('https://x.com/b')['in_degree'] == 1
+    assert counts(loaded) == counts(store)
+
+
+def test_sqlite_store_persists_across_reopen(tmp_path):
+    store = SqliteUrlStore(tmp_path / 'urls.sqlite')
+    store.add('https://x.com/a')
+    store.add('https://x.com/b')
+    store.set_state('https://x.com/a', URL_VISITED, 5.0)
+    store.close()
+
+    reopened = SqliteUrlStore(tmp_path / 'urls.sqlite')
+    assert counts(reopened) == [1, 1, 0, 0]
+    assert reopened.get('https://x.com/a')['processed_at'] == 5.0
+    reopened.close()
+
+
+def test_journal_replay_skips_corrupt_and_truncated_lines(tmp_path):
+    path = tmp_path / 'link_cache.journal'
+    journal = CrawlJournal(str(path))
+    journal.append({'op': 'discovered', 'url': 'https://x.com/a'})
+    journal.append({'op': 'visited', 'url': 'https://x.com/a'})
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('no es json\n')
+        f.write(json.dumps({'op': 'failed', 'url': 'https://x.com/b'})[:-5])
+
+    records = list(CrawlJournal(str(path)).replay())
+    assert [record['op'] for record in records] == ['discovered', 'visited']
+
+
+def test_tracker_state_survives_a_crash_through_the_journal(tmp_path):
+    cache_file = str(tmp_path / 'link_cache.pkl')
+    tracker = LinkTracker('https://x.com/', cache_file=cache_file)
+    tracker.add_discovered_urls({'https://x.com/'})
+    tracker.mark_visited('https://x.com/')
+    tracker.add_discovered_urls({'https://x.com/a', 'https://x.com/b', 'https://x.com/c'}, 'https://x.com/')
+    tracker.mark_visited('https://x.com/a')
+    tracker.mark_failed('https://x.com/b', 'HTTP 500')
+    # Caída: sin save_cache; solo queda lo escrito en el diario
+    tracker.journal.sync()
+
+    resumed = LinkTracker('https://x.com/', cache_file=cache_file)
+    assert 'https://x.com/a' in resumed.visited_urls
+    assert 'https://x.com/b' in resumed.failed_urls
+    assert resumed.get_metadata('https://x.com/b')['note'] == 'HTTP 500'
+    assert resumed.get_next_urls(10) == ['https://x.com/c']
+    assert resumed.get_metadata('https://x.com/c')['in_degree'] == 1
+    resumed.close()
+
+    # Al reanudar se compactó: el diario queda vacío y el snapshot basta
+    again = LinkTracker('https://x.com/', cache_file=cache_file)
+    assert sorted(again.visited_urls) == ['https://x.com/', 'https://x.com/a']
+    again.close()
+    tracker.close()
@@ -0,0 +1,747 @@
+#!/usr/bin/env python3
+"""
+Almacenes del estado de las URLs del rastreo: en memoria (arrays compactos), en
+SQLite y como cola SQLite compartida entre workers
+"""
+
+import sys
+import time
+import sqlite3
+from array import array
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from storage import connect_sqlite
+
+# Estados de una URL en el almacén
+URL_PENDING, URL_VISITED, URL_FAILED, URL_SKIPPED = 0, 1, 2, 3
+URL_STATE_NAMES = ('pending', 'visited', 'failed', 'skipped')
+URL_STORES = ('memory', 'sqlite')
+
+class MemoryUrlStore:
+    """Almacén compacto de URLs en memoria.
+
+    Cada URL recibe un ID entero y sus datos viven en arrays de ancho fijo
+    indexados por ese ID: estado como byte, fechas como epoch, profundidad
+    como entero corto y la URL de origen como ID. Solo los errores y motivos
+    de omisión van aparte, en un dict disperso. El grafo de enlaces se guarda
+    como un array de IDs destino por página procesada, con el grado de
+    entrada de cada URL mantenido de forma incremental.
+    """
+
+    HASH_BYTES = 16
+
+    def __init__(self):
+        self.urls: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.states = bytearray()
+        self.depths = array('h')
+        self.sources = array('l')
+        self.discovered_at = array('d')
+        self.lastmod = array('d')
+        self.processed_at = array('d')
+        self.alias_of = array('l')
+        self.simhashes = array('Q')
+        self.content_hashes = bytearray()
+        self.notes: Dict[int, str] = {}
+        self.in_degree = array('l')
+        self.out_links: Dict[int, array] = {}
+        self.link_count = 0
+        self.counts = [0, 0, 0, 0]
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.ids
+
+    def add(
+        self,
+        url: str,
+        depth: Optional[int] = None,
+        source_url: Optional[str] = None,
+        discovered_at: float = 0.0,
+        lastmod: float = 0.0
+    ) -> bool:
+        """Añade una URL pendiente; False si ya existía"""
+        if url in self.ids:
+            return False
+
+        self.ids[url] = len(self.urls)
+        self.urls.append(url)
+        self.states.append(URL_PENDING)
+        self.depths.append(-1 if depth is None else max(-1, min(depth, 32767)))
+        self.sources.append(self.ids.get(source_url, -1) if source_url else -1)
+        self.discovered_at.append(discovered_at)
+        self.lastmod.append(lastmod)
+        self.processed_at.append(0.0)
+        self.alias_of.append(-1)
+        self.simhashes.append(0)
+        self.content_hashes.extend(bytes(self.HASH_BYTES))
+        self.in_degree.append(0)
+        self.counts[URL_PENDING] += 1
+        return True
+
+    def state(self, url: str) -> Optional[int]:
+        url_id = self.ids.get(url)
+        return None if url_id is None else self.states[url_id]
+
+    def set_state(self, url: str, state: int, at: float = 0.0, note: Optional[str] = None):
+        url_id = self.ids.get(url)
+        if url_id is None:
+            return
+
+        self.counts[self.states[url_id]] -= 1
+        self.counts[state] += 1
+        self.states[url_id] = state
+
+        if state == URL_VISITED:
+            self.processed_at[url_id] = at
+        if note:
+            self.notes[url_id] = sys.intern(note) if len(note) < 64 else note
+        else:
+            self.notes.pop(url_id, None)
+
+    def set_lastmod(self, url: str, lastmod: float):
+        url_id = self.ids.get(url)
+        if url_id is not None:
+            self.lastmod[url_id] = lastmod
+
+    def set_fingerprint(self, url: str, content_hash: str, simhash_value: Optional[int]):
+        url_id = self.ids.get(url)
+        if url_id is None:
+            return
+        offset = url_id * self.HASH_BYTES
+        self.content_hashes[offset:offset + self.HASH_BYTES] = bytes.fromhex(content_hash)[:self.HASH_BYTES]
+        self.simhashes[url_id] = simhash_value or 0
+        self.alias_of[url_id] = -1
+
+    def set_alias(self, url: str, canonical: str):
+        url_id = self.ids.get(url)
+        if url_id is None:
+            return
+        offset = url_id * self.HASH_BYTES
+        self.content_hashes[offset:offset + self.HASH_BYTES] = bytes(self.HASH_BYTES)
+        self.simhashes[url_id] = 0
+        self.alias_of[url_id] = self.ids.get(canonical, -1)
+
+    def set_links(self, url: str, targets: List[str]) -> tuple[int, List[tuple]]:
+        """Sustituye los enlaces salientes de una página.
+
+        Devuelve el ID de la página y las tuplas (url, id, grado de entrada)
+        de los destinos que ganan un enlace entrante.
+        """
+        source_id = self.ids.get(url)
+        if source_id is None:
+            return -1, []
+
+        new_ids = {self.ids[target] for target in targets if target in self.ids} - {source_id}
+        old_ids = set(self.out_links.get(source_id, ()))
+
+        for target_id in old_ids - new_ids:
+            self.in_degree[target_id] -= 1
+        added = []
+        for target_id in new_ids - old_ids:
+            self.in_degree[target_id] += 1
+            added.append((self.urls[target_id], target_id, self.in_degree[target_id]))
+
+        self.link_count += len(new_ids) - len(old_ids)
+        if new_ids:
+            self.out_links[source_id] = array('l', sorted(new_ids))
+        else:
+            self.out_links.pop(source_id, None)
+        return source_id, added
+
+    def iter_out_links(self):
+        """Tuplas (id origen, array de ids destino) del grafo de enlaces"""
+        return iter(self.out_links.items())
+
+    def iter_links(self):
+        """Aristas del grafo como tuplas (url origen, url destino), agrupadas por origen"""
+        for source_id, targets in self.out_links.items():
+            source = self.urls[source_id]
+            for target_id in targets:
+                yield source, self.urls[target_id]
+
+    def iter_nodes(self):
+        """Tuplas (id, url, estado, profundidad, grado de entrada) de todas las URLs"""
+        for url_id, url in enumerate(self.urls):
+            depth = self.depths[url_id]
+            yield url_id, url, self.states[url_id], None if depth < 0 else depth, self.in_degree[url_id]
+
+    def id_limit(self) -> int:
+        """Cota superior (exclusiva) de los IDs de URL"""
+        return len(self.urls)
+
+    def _content_hash(self, url_id: int) -> Optional[str]:
+        offset = url_id * self.HASH_BYTES
+        digest = self.content_hashes[offset:offset + self.HASH_BYTES]
+        return digest.hex() if any(digest) else None
+
+    def get(self, url: str, default: Optional[Dict] = None) -> Optional[Dict]:
+        """Metadata de una URL como dict (fechas en epoch, 0 = desconocida)"""
+        url_id = self.ids.get(url)
+        if url_id is None:
+            return default
+
+        depth = self.depths[url_id]
+        source = self.sources[url_id]
+        alias = self.alias_of[url_id]
+        return {
+            'state': self.states[url_id],
+            'depth': None if depth < 0 else depth,
+            'source_url': self.urls[source] if source >= 0 else None,
+            'discovered_at': self.discovered_at[url_id],
+            'lastmod': self.lastmod[url_id],
+            'processed_at': self.processed_at[url_id],
+            'content_hash': self._content_hash(url_id),
+            'simhash': self.simhashes[url_id] or None,
+            'alias_of': self.urls[alias] if alias >= 0 else None,
+            'note': self.notes.get(url_id),
+            'id': url_id,
+            'in_degree': self.in_degree[url_id]
+        }
+
+    def iter_state(self, state: Optional[int] = None):
+        """URLs en un estado (o todas)"""
+        if state is None:
+            return iter(self.urls)
+        return (url for url, current in zip(self.urls, self.states) if current == state)
+
+    def iter_frontier_entries(self, state: Optional[int] = None):
+        """Tuplas (url, metadata mínima para priorizar) de un estado (o de todas)"""
+        for url_id, url in enumerate(self.urls):
+            if state is None or self.states[url_id] == state:
+                depth = self.depths[url_id]
+                yield url, {
+                    'depth': None if depth < 0 else depth,
+                    'discovered_at': self.discovered_at[url_id],
+                    'lastmod': self.lastmod[url_id],
+                    'id': url_id,
+                    'in_degree': self.in_degree[url_id]
+                }
+
+    def iter_fingerprints(self):
+        """Tuplas (url, hash, simhash) de las páginas canónicas"""
+        for url_id, url in enumerate(self.urls):
+            content_hash = self._content_hash(url_id)
+            if content_hash:
+                yield url, content_hash, self.simhashes[url_id] or None
+
+    def iter_aliases(self):
+        """Tuplas (alias, url canónica)"""
+        for url_id, alias in enumerate(self.alias_of):
+            if alias >= 0:
+                yield self.urls[url_id], self.urls[alias]
+
+    def count(self, state: int) -> int:
+        return self.counts[state]
+
+    def alias_count(self) -> int:
+        return len(self.alias_of) - self.alias_of.count(-1)
+
+    def reset_states(self):
+        """Devuelve todas las URLs a pendiente (re-rastreo completo)"""
+        self.states = bytearray(len(self.urls))
+        self.counts = [len(self.urls), 0, 0, 0]
+        self.notes.clear()
+
+    def to_snapshot(self, copy: bool = False) -> Dict:
+        """Estado completo para serializar; `copy` lo desacopla de cambios posteriores"""
+        snapshot = {
+            'urls': self.urls,
+            'states': bytes(self.states),
+            'depths': self.depths,
+            'sources': self.sources,
+            'discovered_at': self.discovered_at,
+            'lastmod': self.lastmod,
+            'processed_at': self.processed_at,
+            'alias_of': self.alias_of,
+            'simhashes': self.simhashes,
+            'content_hashes': bytes(self.content_hashes),
+            'notes': self.notes,
+            'in_degree': self.in_degree,
+            'out_links': self.out_links
+        }
+        if copy:
+            # Copias planas de arrays y listas: memcpy, sin recorrer las URLs
+            for key, value in snapshot.items():
+                if isinstance(value, (list, array)):
+                    snapshot[key] = value[:]
+            snapshot['notes'] = dict(self.notes)
+            # set_links sustituye los arrays, no los modifica: basta copiar el dict
+            snapshot['out_links'] = dict(self.out_links)
+        return snapshot
+
+    def load_snapshot(self, data: Dict):
+        self.urls = data['urls']
+        self.ids = {url: url_id for url_id, url in enumerate(self.urls)}
+        self.states = bytearray(data['states'])
+        self.depths = data['depths']
+        self.sources = data['sources']
+        self.discovered_at = data['discovered_at']
+        self.lastmod = data['lastmod']
+        self.processed_at = data['processed_at']
+        self.alias_of = data['alias_of']
+        self.simhashes = data['simhashes']
+        self.content_hashes = bytearray(data['content_hashes'])
+        self.notes = data['notes']
+        # Snapshots anteriores al grafo de enlaces
+        self.in_degree = data.get('in_degree') or array('l', [0]) * len(self.urls)
+        self.out_links = data.get('out_links', {})
+        self.link_count = sum(len(targets) for targets in self.out_links.values())
+        self.counts = [self.states.count(state) for state in range(4)]
+
+    def transaction(self):
+        return nullcontext()
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+class SqliteUrlStore:
+    """Almacén de URLs en disco (SQLite) con la misma interfaz que MemoryUrlStore.
+
+    Abrirlo es instantáneo y la memoria no crece con el número de URLs; las
+    escrituras se agrupan en transacciones de `commit_every` operaciones. Las
+    aristas del grafo de enlaces van en una tabla aparte y el grado de
+    entrada se mantiene como columna de `urls`.
+    """
+
+    # Variables por sentencia: por debajo del límite de SQLite antiguos (999)
+    QUERY_CHUNK = 500
+
+    def __init__(self, path: Union[str, Path], commit_every: int = 500, shared: bool = False):
+        self.path = str(path)
+        self.commit_every = commit_every
+        self._pending = 0
+        self._conn = connect_sqlite(self.path, shared)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS urls ('
+            'id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL, state INTEGER NOT NULL DEFAULT 0, '
+            'depth INTEGER, source_id INTEGER, discovered_at REAL, lastmod REAL, processed_at REAL, '
+            'alias_of INTEGER, simhash INTEGER, content_hash BLOB, note TEXT, '
+            'in_degree INTEGER NOT NULL DEFAULT 0)'
+        )
+        if 'in_degree' not in {row[1] for row in self._conn.execute('PRAGMA table_info(urls)')}:
+            try:
+                self._conn.execute('ALTER TABLE urls ADD COLUMN in_degree INTEGER NOT NULL DEFAULT 0')
+            except sqlite3.OperationalError:
+                # Otro worker de la cola compartida la añadió a la vez
+                pass
+        self._conn.execute('CREATE INDEX IF NOT EXISTS urls_state ON urls (state)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS links ('
+            'source_id INTEGER NOT NULL, target_id INTEGER NOT NULL, '
+            'PRIMARY KEY (source_id, target_id)) WITHOUT ROWID'
+        )
+        self._conn.commit()
+
+        self.counts = [0, 0, 0, 0]
+        for state, count in self._conn.execute('SELECT state, COUNT(*) FROM urls GROUP BY state'):
+            self.counts[state] = count
+
+    def _written(self):
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+
+    def __len__(self) -> int:
+        return sum(self.counts)
+
+    def __contains__(self, url: str) -> bool:
+        return self._conn.execute('SELECT 1 FROM urls WHERE url = ?', (url,)).fetchone() is not None
+
+    def add(
+        self,
+        url: str,
+        depth: Optional[int] = None,
+        source_url: Optional[str] = None,
+        discovered_at: float = 0.0,
+        lastmod: float = 0.0
+    ) -> bool:
+        """Añade una URL pendiente; False si ya existía"""
+        cursor = self._conn.execute(
+            'INSERT OR IGNORE INTO urls (url, state, depth, source_id, discovered_at, lastmod, processed_at) '
+            'VALUES (?, 0, ?, (SELECT id FROM urls WHERE url = ?), ?, ?, 0)',
+            (url, depth, source_url, discovered_at, lastmod)
+        )
+        if not cursor.rowcount:
+            return False
+
+        self.counts[URL_PENDING] += 1
+        self._written()
+        return True
+
+    def state(self, url: str) -> Optional[int]:
+        row = self._conn.execute('SELECT state FROM urls WHERE url = ?', (url,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_state(self, url: str, state: int, at: float = 0.0, note: Optional[str] = None):
+        previous = self.state(url)
+        if previous is None:
+            return
+
+        if state == URL_VISITED:
+            self._conn.execute('UPDATE urls SET state = ?, processed_at = ?, note = ? WHERE url = ?', (state, at, note, url))
+        else:
+            self._conn.execute('UPDATE urls SET state = ?, note = ? WHERE url = ?', (state, note, url))
+        self.counts[previous] -= 1
+        self.counts[state] += 1
+        self._written()
+
+    def set_lastmod(self, url: str, lastmod: float):
+        self._conn.execute('UPDATE urls SET lastmod = ? WHERE url = ?', (lastmod, url))
+        self._written()
+
+    def set_fingerprint(self, url: str, content_hash: str, simhash_value: Optional[int]):
+        # SQLite guarda enteros con signo de 64 bits
+        signed = None if simhash_value is None else simhash_value - (1 << 64) if simhash_value >= (1 << 63) else simhash_value
+        self._conn.execute(
+            'UPDATE urls SET content_hash = ?, simhash = ?, alias_of = NULL WHERE url = ?',
+            (bytes.fromhex(content_hash)[:MemoryUrlStore.HASH_BYTES], signed, url)
+        )
+        self._written()
+
+    def set_alias(self, url: str, canonical: str):
+        self._conn.execute(
+            'UPDATE urls SET content_hash = NULL, simhash = NULL, '
+            'alias_of = (SELECT id FROM urls WHERE url = ?) WHERE url = ?',
+            (canonical, url)
+        )
+        self._written()
+
+    def set_links(self, url: str, targets: List[str]) -> tuple[int, List[tuple]]:
+        """Sustituye los enlaces salientes de una página.
+
+        Devuelve el ID de la página y las tuplas (url, id, grado de entrada)
+        de los destinos que ganan un enlace entrante.
+        """
+        with self.transaction():
+            row = self._conn.execute('SELECT id FROM urls WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return -1, []
+            source_id = row[0]
+
+            new_ids: Dict[int, str] = {}
+            targets = list(targets)
+            for start in range(0, len(targets), self.QUERY_CHUNK):
+                chunk = targets[start:start + self.QUERY_CHUNK]
+                new_ids.update(self._conn.execute(
+                    f"SELECT id, url FROM urls WHERE url IN ({', '.join('?' * len(chunk))})", chunk
+                ))
+            new_ids.pop(source_id, None)
+            old_ids = {target_id for (target_id,) in self._conn.execute(
+                'SELECT target_id FROM links WHERE source_id = ?', (source_id,)
+            )}
+
+            removed = [(source_id, target_id) for target_id in old_ids - new_ids.keys()]
+            added = [(source_id, target_id) for target_id in new_ids.keys() - old_ids]
+            self._conn.executemany('DELETE FROM links WHERE source_id = ? AND target_id = ?', removed)
+            self._conn.executemany('UPDATE urls SET in_degree = in_degree - 1 WHERE id = ?', [(t,) for _, t in removed])
+            self._conn.executemany('INSERT INTO links VALUES (?, ?)', added)
+            self._conn.executemany('UPDATE urls SET in_degree = in_degree + 1 WHERE id = ?', [(t,) for _, t in added])
+
+            degrees = {}
+            added_ids = [target_id for _, target_id in added]
+            for start in range(0, len(added_ids), self.QUERY_CHUNK):
+                chunk = added_ids[start:start + self.QUERY_CHUNK]
+                degrees.update(self._conn.execute(
+                    f"SELECT id, in_degree FROM urls WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ))
+        self._written()
+        return source_id, [(new_ids[target_id], target_id, degrees.get(target_id, 0)) for target_id in added_ids]
+
+    def iter_out_links(self):
+        """Tuplas (id origen, array de ids destino) del grafo de enlaces"""
+        source_id, targets = None, array('l')
+        for source, target in self._conn.execute('SELECT source_id, target_id FROM links ORDER BY source_id'):
+            if source != source_id:
+                if targets:
+                    yield source_id, targets
+                source_id, targets = source, array('l')
+            targets.append(target)
+        if targets:
+            yield source_id, targets
+
+    def iter_links(self):
+        """Aristas del grafo como tuplas (url origen, url destino), agrupadas por origen"""
+        yield from self._conn.execute(
+            'SELECT s.url, t.url FROM links l JOIN urls s ON s.id = l.source_id '
+            'JOIN urls t ON t.id = l.target_id ORDER BY l.source_id'
+        )
+
+    def iter_nodes(self):
+        """Tuplas (id, url, estado, profundidad, grado de entrada) de todas las URLs"""
+        yield from self._conn.execute('SELECT id, url, state, depth, in_degree FROM urls ORDER BY id')
+
+    def id_limit(self) -> int:
+        """Cota superior (exclusiva) de los IDs de URL"""
+        return self._conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM urls').fetchone()[0]
+
+    @property
+    def link_count(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM links').fetchone()[0]
+
+    @staticmethod
+    def _unsigned(value: Optional[int]) -> Optional[int]:
+        return None if value is None else value & ((1 << 64) - 1)
+
+    def get(self, url: str, default: Optional[Dict] = None) -> Optional[Dict]:
+        """Metadata de una URL como dict (fechas en epoch, 0 = desconocida)"""
+        row = self._conn.execute(
+            'SELECT u.state, u.depth, s.url, u.discovered_at, u.lastmod, u.processed_at, '
+            'u.content_hash, u.simhash, a.url, u.note, u.id, u.in_degree FROM urls u '
+            'LEFT JOIN urls s ON s.id = u.source_id LEFT JOIN urls a ON a.id = u.alias_of '
+            'WHERE u.url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            return default
+
+        return {
+            'state': row[0],
+            'depth': row[1],
+            'source_url': row[2],
+            'discovered_at': row[3] or 0.0,
+            'lastmod': row[4] or 0.0,
+            'processed_at': row[5] or 0.0,
+            'content_hash': row[6].hex() if row[6] else None,
+            'simhash': self._unsigned(row[7]),
+            'alias_of': row[8],
+            'note': row[9],
+            'id': row[10],
+            'in_degree': row[11]
+        }
+
+    def iter_state(self, state: Optional[int] = None):
+        """URLs en un estado (o todas)"""
+        if state is None:
+            cursor = self._conn.execute('SELECT url FROM urls ORDER BY id')
+        else:
+            cursor = self._conn.execute('SELECT url FROM urls WHERE state = ? ORDER BY id', (state,))
+        return (row[0] for row in cursor)
+
+    def iter_frontier_entries(self, state: Optional[int] = None):
+        """Tuplas (url, metadata mínima para priorizar) de un estado (o de todas)"""
+        query = 'SELECT url, depth, discovered_at, lastmod, id, in_degree FROM urls'
+        params = ()
+        if state is not None:
+            query += ' WHERE state = ?'
+            params = (state,)
+        for url, depth, discovered_at, lastmod, url_id, in_degree in self._conn.execute(query + ' ORDER BY id', params):
+            yield url, {
+                'depth': depth,
+                'discovered_at': discovered_at or 0.0,
+                'lastmod': lastmod or 0.0,
+                'id': url_id,
+                'in_degree': in_degree
+            }
+
+    def iter_fingerprints(self):
+        """Tuplas (url, hash, simhash) de las páginas canónicas"""
+        for url, content_hash, simhash_value in self._conn.execute(
+            'SELECT url, content_hash, simhash FROM urls WHERE content_hash IS NOT NULL'
+        ):
+            yield url, content_hash.hex(), self._unsigned(simhash_value)
+
+    def iter_aliases(self):
+        """Tuplas (alias, url canónica)"""
+        yield from self._conn.execute(
+            'SELECT u.url, a.url FROM urls u JOIN urls a ON a.id = u.alias_of'
+        )
+
+    def count(self, state: int) -> int:
+        return self.counts[state]
+
+    def alias_count(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM urls WHERE alias_of IS NOT NULL').fetchone()[0]
+
+    def reset_states(self):
+        """Devuelve todas las URLs a pendiente (re-rastreo completo)"""
+        self._conn.execute('UPDATE urls SET state = 0, note = NULL')
+        self.counts = [len(self), 0, 0, 0]
+        self.commit()
+
+    def transaction(self):
+        return nullcontext()
+
+    def commit(self):
+        self._conn.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self._conn.close()
+
+# Espera de un worker sin URLs mientras otros workers siguen procesando
+QUEUE_POLL_SECONDS = 1.0
+
+# Orden de reparto de la cola compartida para cada política de prioridad
+SHARED_QUEUE_ORDER = {
+    'depth': 'depth, id',
+    'locality': 'url',
+    'freshness': 'COALESCE(NULLIF(lastmod, 0), discovered_at) DESC, id',
+    # Sin PageRank global entre workers: se aproxima con el grado de entrada
+    'indegree': 'in_degree DESC, depth, id',
+    'pagerank': 'in_degree DESC, depth, id',
+}
+
+class SharedUrlStore(SqliteUrlStore):
+    """Cola de URLs compartida por varios workers (procesos o hosts) sobre SQLite.
+
+    Cada worker reserva lotes de URLs pendientes con un lease que caduca: si
+    el worker muere, sus URLs vuelven a repartirse al expirar el lease (o en
+    cuanto el coordinador las libera). Una URL cuyo lease expira
+    `max_attempts` veces se marca como fallida. Los contadores se leen de la
+    base porque otros procesos la modifican.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        owner: str,
+        lease_seconds: float = 300,
+        max_attempts: int = 3,
+        policy: str = 'depth'
+    ):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(path, shared=True)
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.order = SHARED_QUEUE_ORDER[policy]
+
+        with self.transaction():
+            # Bases creadas por --url-store sqlite: añadir las columnas del lease
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(urls)')}
+            for name, definition in (
+                ('lease_owner', 'TEXT'),
+                ('lease_expires', 'REAL'),
+                ('attempts', 'INTEGER NOT NULL DEFAULT 0')
+            ):
+                if name not in columns:
+                    self._conn.execute(f'ALTER TABLE urls ADD COLUMN {name} {definition}')
+
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS urls_queue_{policy} ON urls (state, {self.order})')
+            # Solo las URLs en curso tienen lease: índices parciales pequeños
+            self._conn.execute('CREATE INDEX IF NOT EXISTS urls_lease_expires ON urls (lease_expires) WHERE lease_expires IS NOT NULL')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS urls_lease_owner ON urls (lease_owner) WHERE lease_owner IS NOT NULL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS fingerprint_log (seq INTEGER PRIMARY KEY, url_id INTEGER NOT NULL)')
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa escrituras en una transacción (BEGIN IMMEDIATE toma el lock al empezar)"""
+        if self._conn.in_transaction:
+            yield
+            return
+
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+
+    def count(self, state: int) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM urls WHERE state = ?', (state,)).fetchone()[0]
+
+    def set_state(self, url: str, state: int, at: float = 0.0, note: Optional[str] = None):
+        # Un estado final libera el lease
+        if state == URL_VISITED:
+            self._conn.execute(
+                'UPDATE urls SET state = ?, processed_at = ?, note = ?, lease_owner = NULL, lease_expires = NULL '
+                'WHERE url = ?', (state, at, note, url)
+            )
+        else:
+            self._conn.execute(
+                'UPDATE urls SET state = ?, note = ?, lease_owner = NULL, lease_expires = NULL WHERE url = ?',
+                (state, note, url)
+            )
+
+    def set_fingerprint(self, url: str, content_hash: str, simhash_value: Optional[int]):
+        with self.transaction():
+            super().set_fingerprint(url, content_hash, simhash_value)
+            self._conn.execute('INSERT INTO fingerprint_log (url_id) SELECT id FROM urls WHERE url = ?', (url,))
+
+    def last_fingerprint_seq(self) -> int:
+        return self._conn.execute('SELECT COALESCE(MAX(seq), 0) FROM fingerprint_log').fetchone()[0]
+
+    def iter_fingerprints_since(self, seq: int):
+        """Tuplas (seq, url, hash, simhash) de las huellas registradas después de `seq`"""
+        for seq, url, content_hash, simhash_value in self._conn.execute(
+            'SELECT f.seq, u.url, u.content_hash, u.simhash FROM fingerprint_log f '
+            'JOIN urls u ON u.id = f.url_id WHERE f.seq > ? AND u.content_hash IS NOT NULL ORDER BY f.seq',
+            (seq,)
+        ).fetchall():
+            yield seq, url, content_hash.hex(), self._unsigned(simhash_value)
+
+    def lease(self, limit: int) -> List[str]:
+        """Reserva para este worker hasta `limit` URLs pendientes sin lease vigente"""
+        now = time.time()
+        with self.transaction():
+            # URLs cuyo lease ha caducado demasiadas veces (tumban a los workers)
+            self._conn.execute(
+                'UPDATE urls SET state = ?, note = ?, lease_owner = NULL, lease_expires = NULL '
+                'WHERE lease_expires < ? AND state = ? AND attempts >= ?',
+                (URL_FAILED, f"Lease expirado {self.max_attempts} veces", now, URL_PENDING, self.max_attempts)
+            )
+            rows = self._conn.execute(
+                f'SELECT id, url FROM urls WHERE state = ? AND (lease_expires IS NULL OR lease_expires < ?) '
+                f'ORDER BY {self.order} LIMIT ?',
+                (URL_PENDING, now, limit)
+            ).fetchall()
+            self._conn.executemany(
+                'UPDATE urls SET lease_owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?',
+                [(self.owner, now + self.lease_seconds, url_id) for url_id, _ in rows]
+            )
+        return [url for _, url in rows]
+
+    def renew(self) -> int:
+        """Prolonga los leases de este worker (latido mientras procesa un lote)"""
+        return self._conn.execute(
+            'UPDATE urls SET lease_expires = ? WHERE lease_owner = ? AND state = ?',
+            (time.time() + self.lease_seconds, self.owner, URL_PENDING)
+        ).rowcount
+
+    def release(self, owner: Optional[str] = None) -> int:
+        """Devuelve a la cola las URLs reservadas por un worker (por defecto, este)"""
+        return self._conn.execute(
+            'UPDATE urls SET lease_owner = NULL, lease_expires = NULL WHERE lease_owner = ? AND state = ?',
+            (owner or self.owner, URL_PENDING)
+        ).rowcount
+
+    def release_url(self, url: str) -> bool:
+        """Devuelve a la cola una URL reservada por este worker"""
+        return bool(self._conn.execute(
+            'UPDATE urls SET lease_owner = NULL, lease_expires = NULL WHERE url = ? AND lease_owner = ? AND state = ?',
+            (url, self.owner, URL_PENDING)
+        ).rowcount)
+
+    def leased_count(self, exclude_owner: Optional[str] = None) -> int:
+        """URLs con lease vigente (opcionalmente sin contar las de un worker)"""
+        return self._conn.execute(
+            'SELECT COUNT(*) FROM urls WHERE lease_expires >= ? AND state = ? AND lease_owner != ?',
+            (time.time(), URL_PENDING, exclude_owner or '')
+        ).fetchone()[0]
+
+    def expired_count(self) -> int:
+        """URLs pendientes cuyo lease ha caducado (se repartirán de nuevo)"""
+        return self._conn.execute(
+            'SELECT COUNT(*) FROM urls WHERE lease_expires < ? AND state = ?',
+            (time.time(), URL_PENDING)
+        ).fetchone()[0]
+
+    def reset_states(self):
+        """Devuelve todas las URLs a pendiente y olvida leases e intentos"""
+        self._conn.execute('UPDATE urls SET state = 0, note = NULL, lease_owner = NULL, lease_expires = NULL, attempts = 0')
+
+    def close(self):
+        self.release()
+        self._conn.close()